@@ -0,0 +1,138 @@
+"""
+列形式の処理結果をバイナリ（型付き配列）としてエンコード・デコードする
+
+レイアウト（すべてリトルエンディアン）:
+
+    0   magic        b'GPXC'
+    4   uint32       フォーマットのバージョン
+    8   uint32       ヘッダー（JSON, UTF-8）のバイト長
+    12  header       JSON。count, columns（name, dtype, offset の一覧）と
+                     summary などの列以外の項目
+    ... 各列の値     offset（バッファ先頭からのバイト位置, 8バイト境界）から count 個
+
+列は8バイト境界に揃えているため、ブラウザでは
+new Float32Array(buffer, offset, count) のようにコピーせずに参照できる。
+"""
+import json
+import struct
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+MEDIA_TYPE = "application/vnd.gpx-columns"
+MAGIC = b"GPXC"
+FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGNMENT = 8
+
+# ヘッダーの dtype 名と NumPy の型
+DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float64": np.dtype("<f8"),
+    "int64": np.dtype("<i8"),
+}
+
+# float32 では精度が足りない列（timestamp はエポックミリ秒、緯度・経度は度）
+FLOAT64_COLUMNS = ("timestamp", "lat_a", "lon_a", "lat_b", "lon_b")
+
+
+def column_dtype(name: str, values: np.ndarray) -> str:
+    """列のエンコードに使う dtype 名"""
+    if np.issubdtype(values.dtype, np.integer):
+        return "int64"
+    if name in FLOAT64_COLUMNS:
+        return "float64"
+    return "float32"
+
+
+def _padding(length: int) -> int:
+    return -length % _ALIGNMENT
+
+
+def encode_columns(result: Mapping[str, Any]) -> bytes:
+    """
+    列形式の処理結果をバイナリにエンコードする
+
+    Parameters:
+    -----------
+    result : dict
+        'columns'（列名 -> 配列）を含む辞書。'columns' 以外の項目
+        （count, summary, projection など）はヘッダーのJSONにそのまま入れる
+
+    Returns:
+    --------
+    bytes
+        エンコードしたバイト列
+    """
+    columns = {name: np.asarray(values) for name, values in result["columns"].items()}
+    count = len(next(iter(columns.values()))) if columns else 0
+
+    descriptors = []
+    for name, values in columns.items():
+        if len(values) != count:
+            raise ValueError(f"列 {name} の長さ {len(values)} が {count} と一致しません")
+        descriptors.append({"name": name, "dtype": column_dtype(name, values)})
+
+    header = {key: value for key, value in result.items() if key != "columns"}
+    header["count"] = count
+
+    # オフセットはヘッダーの長さに依存するため、桁数が収まるまで計算し直す
+    offset = 0
+    while True:
+        position = offset
+        for descriptor in descriptors:
+            descriptor["offset"] = position
+            position += count * DTYPES[descriptor["dtype"]].itemsize
+            position += _padding(position)
+        header["columns"] = descriptors
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = _PREAMBLE.size + len(header_bytes)
+        data_start += _padding(data_start)
+        if data_start == offset:
+            break
+        offset = data_start
+
+    header_bytes += b" " * (data_start - _PREAMBLE.size - len(header_bytes))
+    chunks = [_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)), header_bytes]
+    for descriptor in descriptors:
+        data = columns[descriptor["name"]].astype(DTYPES[descriptor["dtype"]], copy=False).tobytes()
+        chunks.append(data)
+        chunks.append(b"\0" * _padding(len(data)))
+    return b"".join(chunks)
+
+
+def decode_columns(data: bytes) -> Dict[str, Any]:
+    """
+    encode_columns でエンコードしたバイト列をデコードする
+
+    Returns:
+    --------
+    dict
+        ヘッダーの項目と、'columns'（列名 -> NumPy配列）の辞書
+
+    Raises:
+    -------
+    ValueError
+        マジックナンバーやバージョンが一致しない、またはデータが途中で切れている場合
+    """
+    if len(data) < _PREAMBLE.size:
+        raise ValueError("データが短すぎます")
+    magic, version, header_length = _PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"マジックナンバーが一致しません: {magic!r}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"未対応のフォーマットバージョンです: {version}")
+
+    header = json.loads(data[_PREAMBLE.size:_PREAMBLE.size + header_length].decode("utf-8"))
+    count = header["count"]
+    columns = {}
+    for descriptor in header["columns"]:
+        dtype = DTYPES[descriptor["dtype"]]
+        end = descriptor["offset"] + count * dtype.itemsize
+        if end > len(data):
+            raise ValueError(f"列 {descriptor['name']} のデータが途中で切れています")
+        columns[descriptor["name"]] = np.frombuffer(data, dtype=dtype, count=count, offset=descriptor["offset"])
+
+    header["columns"] = columns
+    return header
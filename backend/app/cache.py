@@ -0,0 +1,260 @@
+"""メモリ使用量（バイト数）で上限を管理するLRUキャッシュ"""
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """キャッシュする値のおおよそのメモリ使用量（バイト）を推定"""
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, np.ndarray):
+            total += item.nbytes
+        elif isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(deep=True).sum())
+        elif isinstance(item, pd.Series):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            total += sys.getsizeof(item)
+            stack.extend(item)
+        else:
+            total += sys.getsizeof(item)
+    return total
+
+
+class ByteLRUCache:
+    """
+    合計バイト数で上限を設けたスレッドセーフなLRUキャッシュ
+
+    上限を超えた場合は最も長く使われていないエントリから削除する。
+    ttl（秒）を指定すると、期限切れのエントリは取得時に破棄される。
+    ヒット・ミス・削除の回数は stats() で取得できる。
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None, name: str = "cache"):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def _is_expired(self, entry: tuple) -> bool:
+        expires_at = entry[2]
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def _remove(self, key: Hashable) -> int:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        return size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """値を取得（ヒットしたエントリは最新として扱う）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if self._is_expired(entry):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        値を保存し、上限を超えた分を古い順に削除する
+
+        size を省略した場合は estimate_size で推定する。
+        1エントリで上限を超える値は保存せず False を返す。
+        """
+        if size is None:
+            size = estimate_size(value)
+
+        if size > self.max_bytes:
+            logger.warning(f"{self.name}: エントリが上限を超えるためキャッシュしません "
+                           f"({size} > {self.max_bytes} bytes)")
+            return False
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                freed = self._remove(oldest_key)
+                self.evictions += 1
+                logger.debug(f"{self.name}: LRUエントリを削除 ({freed} bytes)")
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """エントリを削除して値を返す"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def clear(self) -> Dict[str, int]:
+        """すべてのエントリを削除し、削除した件数とバイト数を返す"""
+        with self._lock:
+            cleared = {"items": len(self._entries), "bytes": self._bytes}
+            self._entries.clear()
+            self._bytes = 0
+        return cleared
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# 時間範囲（両端を含む (start, end)）。None は全範囲
+TimeRange = Optional[Tuple[int, int]]
+
+
+def range_contains(outer: TimeRange, inner: TimeRange) -> bool:
+    """範囲 outer が範囲 inner を含むかどうか"""
+    if outer is None:
+        return True
+    if inner is None:
+        return False
+    return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+
+class RangeCache:
+    """
+    グループ（対象データ）と時間範囲ごとの値を保存する、範囲の包含を考慮したキャッシュ
+
+    値は (group, time_range) をキーとして ByteLRUCache に保存する。get で範囲が一致する
+    エントリがない場合は、同じグループで要求範囲を含む最も狭い範囲のエントリから
+    slicer で切り出し、その結果も保存して返す。
+    完全一致（hits）・切り出し（slices）・どちらもない（misses）の回数は stats() で取得できる。
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None, name: str = "range_cache"):
+        self.name = name
+        self._cache = ByteLRUCache(max_bytes, ttl=ttl, name=name)
+        self._ranges: Dict[Hashable, set] = {}  # group -> 保存した範囲
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.slices = 0
+        self.misses = 0
+
+    def _containing(self, group: Hashable, time_range: TimeRange) -> List[TimeRange]:
+        """要求範囲を含む保存済みの範囲（狭い順）。削除済みのエントリは取り除く"""
+        with self._lock:
+            ranges = self._ranges.get(group, set())
+            for stale in [r for r in ranges if (group, r) not in self._cache]:
+                ranges.discard(stale)
+            candidates = [r for r in ranges if r != time_range and range_contains(r, time_range)]
+        return sorted(candidates, key=lambda r: float("inf") if r is None else r[1] - r[0])
+
+    def get(self, group: Hashable, time_range: TimeRange,
+            slicer: Optional[Callable[[Any, TimeRange], Any]] = None) -> Any:
+        """
+        値を取得する
+
+        Parameters:
+        -----------
+        group : hashable
+            対象データを識別するキー（範囲以外のキー）
+        time_range : tuple or None
+            要求する範囲
+        slicer : callable, optional
+            slicer(value, time_range) で、範囲を含むエントリの値から要求範囲の値を切り出す。
+            None の場合は範囲が一致するエントリのみ使う
+
+        Returns:
+        --------
+        値。該当するエントリがない場合は None
+        """
+        value = self._cache.get((group, time_range))
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        if slicer is not None:
+            for candidate in self._containing(group, time_range):
+                superset = self._cache.get((group, candidate))
+                if superset is None:
+                    continue
+                value = slicer(superset, time_range)
+                with self._lock:
+                    self.slices += 1
+                logger.debug(f"{self.name}: 範囲 {candidate} のエントリから {time_range} を切り出し")
+                self.set(group, time_range, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, group: Hashable, time_range: TimeRange, value: Any) -> bool:
+        """値を保存する（ByteLRUCache.set を参照）"""
+        stored = self._cache.set((group, time_range), value)
+        if stored:
+            with self._lock:
+                self._ranges.setdefault(group, set()).add(time_range)
+        return stored
+
+    def clear(self) -> Dict[str, int]:
+        """すべてのエントリを削除し、削除した件数とバイト数を返す"""
+        with self._lock:
+            self._ranges.clear()
+        return self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報（hits / misses は範囲の包含を考慮した回数）"""
+        stats = self._cache.stats()
+        with self._lock:
+            stats.update(hits=self.hits, slices=self.slices, misses=self.misses)
+        return stats
@@ -10,6 +10,21 @@ import gpxpy
 from datetime import timedelta
 import logging
 import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.gpx_reader import read_gpx_bounds, read_gpx_arrays, UnsupportedGPXError
+from app.track_store import TrackStore, file_digest
+from app.time_index import TrackTimeIndex
+from app.track_join import join_indices, JOIN_EXACT, JOIN_NEAREST
+from app.resample import resample_track, DEFAULT_MAX_GAP_MS
+from app.projection import geodetic_to_enu, track_bounds, bounds_center
+from app.simplify import simplify_indices
+from app.pyramid import build_pyramid, query_pyramid
+from app.range_index import build_range_index, query_range
+from app.cache import ByteLRUCache, RangeCache
+from app.utils.time_utils import parse_timestamps_ns
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +32,52 @@ logger = logging.getLogger(__name__)
 M_TO_FT = 3.28084
 EARTH_RADIUS = 6371000  # 地球の半径（メートル）
 
-# データキャッシュ
-_gpx_cache = {}
+# エポックナノ秒の単位
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# 解析・タイムスタンプ修正処理のバージョン
+# (出力が変わる変更を行った場合は更新し、ディスクキャッシュを無効化する)
+TRACK_CACHE_VERSION = 2
+
+# データキャッシュ（バイト数で上限を管理するLRU）
+_gpx_cache = ByteLRUCache(
+    max_bytes=int(os.environ.get("GPX_TRACK_CACHE_MB", "256")) * 1024 * 1024,
+    name="track_cache"
+)
+
+# 再起動後・他ワーカーとも共有するディスクキャッシュ
+_track_store = TrackStore()
+
+# 結合済みトラックのキャッシュ（/api/table などが /api/process と同じ結合結果を再利用する）
+# 時間範囲を狭めたリクエストには、その範囲を含む結合結果から切り出して返す
+_merged_cache = RangeCache(
+    max_bytes=int(os.environ.get("GPX_MERGED_CACHE_MB", "128")) * 1024 * 1024,
+    name="merged_cache"
+)
+
+# トラックA/Bを並列処理するプロセスプールのワーカー数（0 の場合は逐次処理）
+PROCESS_POOL_WORKERS = int(os.environ.get("GPX_PROCESS_WORKERS", "0"))
+# トラックA/Bを同時に処理できるよう、プールのワーカー数は2以上にする
+MIN_PROCESS_POOL_WORKERS = 2
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# 進捗通知のステージ名（ジョブAPIで使用）
+PROCESSING_STAGES = ('parse', 'fix_timestamps', 'metrics', 'merge', 'format')
+
+# ENU座標の列名
+ENU_COLUMNS = ['east', 'north', 'up']
+
+# トラックごとの処理結果として返す列
+TRACK_RESULT_COLUMNS = [
+    'lat', 'lon', 'ele', 'time_utc',
+    'vertical_speed', 'horizontal_speed', 'speed_3d',
+    'vertical_accel', 'horizontal_accel', 'accel_3d',
+    'avg_10sec_vertical_speed', 'avg_10sec_horizontal_speed', 'avg_10sec_speed_3d',
+    'east', 'north', 'up'
+]
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
@@ -54,165 +113,368 @@ def calculate_3d_distance(lat1, lon1, ele1, lat2, lon2, ele2):
     
     return distance_3d
 
+def haversine_distance_array(lat1, lon1, lat2, lon2):
+    """
+    haversine_distance の配列版。各要素ごとの距離（メートル）を返す
+    """
+    R = 6371000.0
+    
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    dlon = np.radians(lon2) - np.radians(lon1)
+    dlat = lat2_rad - lat1_rad
+    a = np.sin(dlat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return R * c
+
+# 連続するポイント間の指標として compute_step_metrics が返す列
+STEP_METRIC_COLUMNS = [
+    'time_diff', 'ele_diff', 'lat_diff', 'lon_diff',
+    'horizontal_distance', 'distance_3d',
+    'vertical_speed', 'horizontal_speed', 'speed_3d',
+    'vertical_speed_diff', 'horizontal_speed_diff', 'speed_3d_diff',
+    'vertical_accel', 'horizontal_accel', 'accel_3d',
+]
+
+def compute_step_metrics(time_ns, lat, lon, ele, east=None, north=None):
+    """
+    時刻順に並んだトラックの配列から、連続するポイント間の距離・速度・加速度を計算する
+    
+    Parameters:
+    -----------
+    time_ns : numpy.ndarray
+        UTCエポックナノ秒 (int64) の配列
+    lat, lon, ele : numpy.ndarray
+        緯度・経度・標高（メートル）の配列
+    east, north : numpy.ndarray, optional
+        ENU座標（メートル）。指定した場合、水平距離をハーバーサイン公式ではなく
+        平面上のユークリッド距離として計算する
+    
+    Returns:
+    --------
+    dict
+        STEP_METRIC_COLUMNS をキーとする float64 配列の辞書。
+        差分列の先頭要素は NaN、距離・速度・加速度の先頭要素は0となる。
+        時間差が0以下（重複・逆転したタイムスタンプ）の区間の速度・加速度は0とする。
+    """
+    n = len(time_ns)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ele = np.asarray(ele, dtype=np.float64)
+    
+    def step_diff(values):
+        diff = np.empty(n, dtype=np.float64)
+        diff[:1] = np.nan
+        diff[1:] = np.diff(values)
+        return diff
+    
+    def per_second(values):
+        # time_diff が正の区間のみ割り算し、それ以外（先頭を含む）は0
+        result = np.zeros(n, dtype=np.float64)
+        np.divide(values, time_diff, out=result, where=valid)
+        return result
+    
+    time_diff = step_diff(np.asarray(time_ns, dtype=np.int64)) / NS_PER_SECOND
+    valid = time_diff > 0  # NaN（先頭）は False
+    
+    horizontal_distance = np.zeros(n, dtype=np.float64)
+    if east is not None and north is not None:
+        horizontal_distance[1:] = np.hypot(np.diff(east), np.diff(north))
+    else:
+        horizontal_distance[1:] = haversine_distance_array(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    ele_diff = step_diff(ele)
+    distance_3d = np.zeros(n, dtype=np.float64)
+    distance_3d[1:] = np.sqrt(horizontal_distance[1:]**2 + ele_diff[1:]**2)
+    
+    metrics = {
+        'time_diff': time_diff,
+        'ele_diff': ele_diff,
+        'lat_diff': step_diff(lat),
+        'lon_diff': step_diff(lon),
+        'horizontal_distance': horizontal_distance,
+        'distance_3d': distance_3d,
+        'vertical_speed': per_second(ele_diff),
+        'horizontal_speed': per_second(horizontal_distance),
+        'speed_3d': per_second(distance_3d),
+    }
+    for name, accel in (('vertical_speed', 'vertical_accel'),
+                        ('horizontal_speed', 'horizontal_accel'),
+                        ('speed_3d', 'accel_3d')):
+        speed_diff = step_diff(metrics[name])
+        metrics[f'{name}_diff'] = speed_diff
+        metrics[accel] = per_second(speed_diff)
+    
+    return {column: metrics[column] for column in STEP_METRIC_COLUMNS}
+
+# 2トラック間の位置関係として compute_separation が返す列
+SEPARATION_COLUMNS = ['horizontal_distance', 'height_diff', 'distance_3d', 'bearing']
+
+def compute_separation(lat_a, lon_a, ele_a, lat_b, lon_b, ele_b, enu_a=None, enu_b=None):
+    """
+    同じ時刻に対応付けたトラックA/Bの点同士の位置関係をまとめて計算する
+    
+    Parameters:
+    -----------
+    lat_a, lon_a, ele_a : numpy.ndarray
+        トラックAの緯度・経度・標高（メートル）
+    lat_b, lon_b, ele_b : numpy.ndarray
+        トラックBの緯度・経度・標高（メートル）
+    enu_a, enu_b : tuple of numpy.ndarray, optional
+        共通の原点による (east, north, up) 座標。指定した場合、距離と方位角を
+        ENU座標のユークリッド距離・平面上の角度として計算する
+    
+    Returns:
+    --------
+    dict
+        SEPARATION_COLUMNS をキーとする float64 配列の辞書
+        - horizontal_distance: 水平距離（メートル、ハーバーサイン公式）
+        - height_diff: 高度差 A - B（メートル）
+        - distance_3d: 3D距離（メートル）
+        - bearing: AからBへの方位角（度、北を0として時計回り 0-360）
+    """
+    lat_a = np.asarray(lat_a, dtype=np.float64)
+    lon_a = np.asarray(lon_a, dtype=np.float64)
+    lat_b = np.asarray(lat_b, dtype=np.float64)
+    lon_b = np.asarray(lon_b, dtype=np.float64)
+    
+    height_diff = np.asarray(ele_a, dtype=np.float64) - np.asarray(ele_b, dtype=np.float64)
+    
+    if enu_a is not None and enu_b is not None:
+        d_east, d_north, d_up = (b - a for a, b in zip(enu_a, enu_b))
+        horizontal_distance = np.hypot(d_east, d_north)
+        return {
+            'horizontal_distance': horizontal_distance,
+            'height_diff': height_diff,
+            'distance_3d': np.sqrt(horizontal_distance**2 + d_up**2),
+            'bearing': np.degrees(np.arctan2(d_east, d_north)) % 360.0,
+        }
+    
+    horizontal_distance = haversine_distance_array(lat_a, lon_a, lat_b, lon_b)
+    distance_3d = np.sqrt(horizontal_distance**2 + height_diff**2)
+    
+    # 大円航路の初期方位角
+    lat_a_rad = np.radians(lat_a)
+    lat_b_rad = np.radians(lat_b)
+    dlon = np.radians(lon_b) - np.radians(lon_a)
+    y = np.sin(dlon) * np.cos(lat_b_rad)
+    x = np.cos(lat_a_rad) * np.sin(lat_b_rad) - np.sin(lat_a_rad) * np.cos(lat_b_rad) * np.cos(dlon)
+    bearing = np.degrees(np.arctan2(y, x)) % 360.0
+    
+    return {
+        'horizontal_distance': horizontal_distance,
+        'height_diff': height_diff,
+        'distance_3d': distance_3d,
+        'bearing': bearing,
+    }
+
+def _hour_of(time_ns):
+    """エポックナノ秒からUTCの時(0-23)を取得"""
+    return (time_ns // NS_PER_HOUR) % 24
+
+def _format_ns(time_ns, fmt='%Y-%m-%d %H:%M:%S%z'):
+    """エポックナノ秒をログ出力用の文字列に変換"""
+    return pd.Timestamp(int(time_ns), tz='UTC').strftime(fmt)
+
 # ★ 新しい堅牢な日付跨ぎ修正関数を追加 ★
-def fix_datetime_sequence_robust(points):
+def fix_datetime_sequence_robust(times):
     """
     時系列データが連続するように日付跨ぎを修正する（より堅牢な方法）。
     大きな時間の巻き戻りが発生するたびに日付オフセットを増やす。
+    
+    times はUTCエポックナノ秒 (int64) の配列で、修正後の新しい配列を返す。
+    
+    各点に適用済みのオフセットは日単位なので、隣接点の時間差と時(0-23)は
+    オフセットの影響を受けない。そのため巻き戻りの判定は元の時刻の差分で
+    まとめて行い、オフセットは判定結果の累積和として求められる。
     """
-    if len(points) < 2:
-        return points
-
-    logger.debug(f"fix_datetime_sequence_robust: 開始 - {len(points)} ポイント")
-    modified_points = [p.copy() for p in points] # Deep copy for modification
-    
-    date_offset_days = 0
-    # Ensure prev_time is timezone-aware if points are
-    prev_time = modified_points[0]['time_utc']
-    if prev_time.tzinfo is None:
-        logger.warning("Initial point lacks timezone info, assuming UTC.")
-        prev_time = pytz.UTC.localize(prev_time)
-    modified_points[0]['time_utc'] = prev_time # Store potentially localized time back
-
-    # 時間の巻き戻りが検出された回数
-    time_reversals_detected = 0
-    time_reversals_fixed = 0
-
-    # 日付オフセットを追跡する辞書 (時間帯ごとに異なるオフセットを適用できるように)
-    hour_offsets = {}
-
-    for i in range(1, len(modified_points)):
-        current_time = modified_points[i]['time_utc']
-        # Ensure current_time is timezone-aware
-        if current_time.tzinfo is None:
-            logger.warning(f"Point {i} lacks timezone info, assuming UTC.")
-            current_time = pytz.UTC.localize(current_time)
-
-        # 現在の日付オフセットを適用
-        current_time_adjusted = current_time + timedelta(days=date_offset_days)
-        
-        # Make sure comparison happens between aware datetimes
-        time_diff_seconds = (current_time_adjusted - prev_time).total_seconds()
+    if len(times) < 2:
+        return times
 
-        # 異常な時間の巻き戻り（例: -1時間以上）を検出
-        if time_diff_seconds < -1800:  # 30分以上の巻き戻りは異常と判断
-            time_reversals_detected += 1
-            
-            # 明らかな日付跨ぎパターン: 23時台から0-4時台への変化
-            if prev_time.hour >= 21 and current_time.hour <= 4:
-                logger.info(f"典型的な日付跨ぎを検出: {prev_time.hour}時 -> {current_time.hour}時")
-                date_offset_days += 1
-                time_reversals_fixed += 1
-            # その他の大きな時間逆転
-            else:
-                logger.warning(f"非典型的な時間逆転を検出: {prev_time.hour}時 -> {current_time.hour}時")
-                # 時間逆転が3時間以上なら日付跨ぎとして扱う
-                if abs(time_diff_seconds) > 10800:  # 3時間 = 10800秒
-                    date_offset_days += 1
-                    time_reversals_fixed += 1
-            
-            current_time_adjusted = current_time + timedelta(days=date_offset_days) # 再度オフセット適用
-            logger.info(f"日付跨ぎ/巻き戻りを検出しオフセット適用: "
-                        f"Index={i}, "
-                        f"Prev={prev_time.strftime('%Y-%m-%d %H:%M:%S%z')}, "
-                        f"Original Curr={current_time.strftime('%Y-%m-%d %H:%M:%S%z')}, "
-                        f"Offset Days={date_offset_days}, "
-                        f"Adjusted Curr={current_time_adjusted.strftime('%Y-%m-%d %H:%M:%S%z')}")
-
-        # 修正後の時刻をリストに反映 (タイムゾーン情報を保持)
-        modified_points[i]['time_utc'] = current_time_adjusted
-        
-        # 次の比較のために前の時刻を更新 (修正後の時刻を使う)
-        prev_time = current_time_adjusted
+    logger.debug(f"fix_datetime_sequence_robust: 開始 - {len(times)} ポイント")
+    diffs = np.diff(times)
+    hours = _hour_of(times)
+    prev_hours = hours[:-1]
+    current_hours = hours[1:]
+
+    # 異常な時間の巻き戻り（30分以上）を検出
+    reversals = diffs < -1800 * NS_PER_SECOND
+    time_reversals_detected = int(np.count_nonzero(reversals))
+    if time_reversals_detected == 0:
+        logger.debug(f"シーケンス内の時間巻き戻りなし: 修正不要")
+        return times
+
+    # 明らかな日付跨ぎパターン: 21-23時台から0-4時台への変化
+    typical = reversals & (prev_hours >= 21) & (current_hours <= 4)
+    # その他の大きな時間逆転は3時間以上なら日付跨ぎとして扱う
+    atypical = reversals & ~typical
+    fixed = typical | (atypical & (diffs < -10800 * NS_PER_SECOND))
+    time_reversals_fixed = int(np.count_nonzero(fixed))
+
+    if atypical.any():
+        first = int(np.argmax(atypical))
+        logger.warning(f"非典型的な時間逆転を検出: {int(np.count_nonzero(atypical))}回 "
+                       f"(最初: Index={first + 1}, {prev_hours[first]}時 -> {current_hours[first]}時)")
+
+    # 巻き戻りごとに1日ずつ増えるオフセットを累積和で求めて適用
+    offset_days = np.concatenate(([0], np.cumsum(fixed, dtype=np.int64)))
+    modified_times = times + offset_days * NS_PER_DAY
+    date_offset_days = int(offset_days[-1])
 
     if date_offset_days > 0:
          logger.info(f"タイムスタンプ修正完了. Total Offset Applied: {date_offset_days} days, 検出された巻き戻り: {time_reversals_detected}回, 修正された巻き戻り: {time_reversals_fixed}回")
          # Log first and last adjusted times
-         first_ts = modified_points[0]['time_utc'].strftime('%Y-%m-%d %H:%M:%S%z') if modified_points else 'N/A'
-         last_ts = modified_points[-1]['time_utc'].strftime('%Y-%m-%d %H:%M:%S%z') if modified_points else 'N/A'
-         logger.info(f"修正後の時間範囲: {first_ts} - {last_ts}")
+         logger.info(f"修正後の時間範囲: {_format_ns(modified_times[0])} - {_format_ns(modified_times[-1])}")
     else:
-         logger.debug(f"シーケンス内の時間巻き戻りなし: 修正不要")
+         logger.debug(f"大きな巻き戻りなし: 修正不要")
 
-    return modified_points
+    return modified_times
 
 # 新しい関数: ファイル全体の時間順序を考慮した日付跨ぎ修正
-def fix_datetime_for_file(points):
-    """ファイル全体の時間順序を見て日付跨ぎを修正する"""
-    if len(points) < 2:
-        return points
-        
-    # ポイントをコピー (元の順序を維持)
-    modified_points = [p.copy() for p in points]
+def fix_datetime_for_file(times):
+    """
+    ファイル全体の時間順序を見て日付跨ぎを修正する
+    
+    times はUTCエポックナノ秒 (int64) の配列で、修正後の新しい配列を返す。
+    """
+    if len(times) < 2:
+        return times
     
     # ソートなしで最初と最後のポイントの時間を取得
-    first_time = modified_points[0]['time_utc']
-    last_time = modified_points[-1]['time_utc']
+    hours = _hour_of(times)
     
-    logger.debug(f"日付跨ぎチェック (元の順序): 最初={first_time.strftime('%Y-%m-%d %H:%M:%S%z')}, 最後={last_time.strftime('%Y-%m-%d %H:%M:%S%z')}")
+    logger.debug(f"日付跨ぎチェック (元の順序): 最初={_format_ns(times[0])}, 最後={_format_ns(times[-1])}")
     
     # 夜から朝への変化を検出するために時間帯を分析
-    late_night_points = []  # 21時〜23時台のポイント
-    early_morning_points = []  # 0時〜4時台のポイント
-    
-    for i, p in enumerate(modified_points):
-        hour = p['time_utc'].hour
-        if 21 <= hour <= 23:
-            late_night_points.append((i, p))
-        elif 0 <= hour <= 4:
-            early_morning_points.append((i, p))
+    late_night = (hours >= 21) & (hours <= 23)  # 21時〜23時台のポイント
+    early_morning = hours <= 4  # 0時〜4時台のポイント
     
     # 夜間のポイントと早朝のポイントがあり、夜間のポイントが先に来る場合は日付跨ぎと判断
     needs_fix = False
-    if late_night_points and early_morning_points:
-        first_late_night_idx = late_night_points[0][0]
-        first_early_morning_idx = early_morning_points[0][0]
+    if late_night.any() and early_morning.any():
+        first_late_night_idx = int(np.argmax(late_night))
+        first_early_morning_idx = int(np.argmax(early_morning))
         
         # 夜のポイントが早朝のポイントより前に来ている場合
         if first_late_night_idx < first_early_morning_idx:
-            logger.warning(f"日付跨ぎを検出: 夜間ポイント({late_night_points[0][1]['time_utc'].strftime('%H:%M:%S')})が早朝ポイント({early_morning_points[0][1]['time_utc'].strftime('%H:%M:%S')})より前にあります")
+            logger.warning(f"日付跨ぎを検出: 夜間ポイント({_format_ns(times[first_late_night_idx], '%H:%M:%S')})が早朝ポイント({_format_ns(times[first_early_morning_idx], '%H:%M:%S')})より前にあります")
             needs_fix = True
     
     # 最後のポイントと最初のポイントの時間差を確認
     # 23時→0時の変化なら日付跨ぎの可能性
-    if not needs_fix and modified_points[0]['time_utc'].hour >= 21 and modified_points[-1]['time_utc'].hour <= 4:
-        logger.warning(f"日付跨ぎの可能性: 最初={modified_points[0]['time_utc'].hour}時台, 最後={modified_points[-1]['time_utc'].hour}時台")
+    if not needs_fix and hours[0] >= 21 and hours[-1] <= 4:
+        logger.warning(f"日付跨ぎの可能性: 最初={hours[0]}時台, 最後={hours[-1]}時台")
         needs_fix = True
     
     # 時間の逆転も検出 (例: 23:30 -> 00:15)
-    for i in range(1, len(modified_points)):
-        time_diff = (modified_points[i]['time_utc'] - modified_points[i-1]['time_utc']).total_seconds()
-        if time_diff < -3600:  # 1時間以上の時間逆転は日付跨ぎの可能性
-            logger.warning(f"大きな時間逆転を検出: ポイント{i-1}({modified_points[i-1]['time_utc'].strftime('%H:%M:%S')}) -> ポイント{i}({modified_points[i]['time_utc'].strftime('%H:%M:%S')})")
+    if not needs_fix:
+        # 1時間以上の時間逆転は日付跨ぎの可能性
+        reversals = np.flatnonzero(np.diff(times) < -3600 * NS_PER_SECOND)
+        if len(reversals):
+            i = int(reversals[0]) + 1
+            logger.warning(f"大きな時間逆転を検出: ポイント{i-1}({_format_ns(times[i-1], '%H:%M:%S')}) -> ポイント{i}({_format_ns(times[i], '%H:%M:%S')})")
             needs_fix = True
-            break
     
-    if needs_fix:
-        logger.info("日付跨ぎ修正を適用します")
-        modified_count = 0
-        
-        # 0-4時のポイントを「翌日」として扱う
-        for i in range(len(modified_points)):
-            point_time = modified_points[i]['time_utc']
-            if point_time.hour <= 4:
-                # 早朝のポイントは翌日として扱う
-                modified_points[i]['time_utc'] = point_time + timedelta(days=1)
-                modified_count += 1
-                logger.debug(f"ポイント {i} の日付を1日進めました: {point_time.strftime('%Y-%m-%d %H:%M:%S%z')} -> {modified_points[i]['time_utc'].strftime('%Y-%m-%d %H:%M:%S%z')}")
-        
-        # 修正後の最初と最後のポイントの時間
-        first_time_after = modified_points[0]['time_utc']
-        last_time_after = modified_points[-1]['time_utc']
-        logger.info(f"日付跨ぎ修正後の時間範囲: {first_time_after.strftime('%Y-%m-%d %H:%M:%S%z')} - {last_time_after.strftime('%Y-%m-%d %H:%M:%S%z')}, 修正ポイント数: {modified_count}")
-    else:
+    if not needs_fix:
         logger.debug(f"日付跨ぎなし: 時間順序が適切です")
+        return times
+    
+    logger.info("日付跨ぎ修正を適用します")
+    
+    # 0-4時のポイントを「翌日」として扱う
+    modified_times = times + early_morning * np.int64(NS_PER_DAY)
+    modified_count = int(np.count_nonzero(early_morning))
+    
+    # 修正後の最初と最後のポイントの時間
+    logger.info(f"日付跨ぎ修正後の時間範囲: {_format_ns(modified_times[0])} - {_format_ns(modified_times[-1])}, 修正ポイント数: {modified_count}")
+    
+    return modified_times
+
+def _read_track_gpxpy(gpx_file):
+    """gpxpyでGPXファイルを解析してトラックの列配列を抽出する（フォールバック用）"""
+    with open(gpx_file, 'r', encoding='utf-8') as f:
+        gpx = gpxpy.parse(f)
+    
+    # メタデータ時間があれば記録
+    metadata_time = gpx.time
+    if metadata_time:
+        logger.info(f"GPXファイルのメタデータ時間: {metadata_time}")
+    
+    lats, lons, eles, times = [], [], [], []
+    
+    # すべてのトラックポイントを抽出 - ファイルの順序を維持
+    for track in gpx.tracks:
+        for segment in track.segments:
+            for point in segment.points:
+                # 時間と標高情報があるポイントのみ処理
+                if point.time and point.elevation is not None:
+                    # タイムゾーン情報がない場合はUTCとして扱う
+                    time_utc = point.time
+                    if time_utc.tzinfo is None:
+                        time_utc = pytz.UTC.localize(time_utc)
+                    else:
+                        # すでにタイムゾーンがある場合はUTCに変換
+                        time_utc = time_utc.astimezone(pytz.UTC)
+                    
+                    lats.append(point.latitude)
+                    lons.append(point.longitude)
+                    eles.append(point.elevation)
+                    times.append(time_utc)
+                else:
+                    logger.debug(f"時間または標高がないポイントをスキップ: {point}")
     
-    return modified_points
+    return {
+        'lat': np.array(lats, dtype=np.float64),
+        'lon': np.array(lons, dtype=np.float64),
+        'ele': np.array(eles, dtype=np.float64),
+        'time_utc': pd.DatetimeIndex(times).asi8 if times else np.empty(0, dtype=np.int64),
+    }
+
+def _read_track_fast(gpx_file):
+    """iterparseベースの高速リーダーでトラックの列配列を抽出する"""
+    columns = read_gpx_arrays(gpx_file)
+    
+    try:
+        # 全ポイントのタイムスタンプを一括でエポックナノ秒に変換
+        time_utc = parse_timestamps_ns(columns['time'])
+    except ValueError as e:
+        raise UnsupportedGPXError(f"タイムスタンプを変換できません: {e}") from e
+    
+    return {
+        'lat': columns['lat'],
+        'lon': columns['lon'],
+        'ele': columns['ele'],
+        'time_utc': time_utc,
+    }
+
+def arrays_to_dataframe(track):
+    """トラックの列配列をDataFrameに変換（time_utcはUTCのdatetime64列に変換）"""
+    return pd.DataFrame({
+        name: pd.to_datetime(values, unit='ns', utc=True) if name == 'time_utc' else values
+        for name, values in track.items()
+    })
+
+def dataframe_to_arrays(df, columns=None):
+    """DataFrameを列配列の辞書に変換（time_utcはUTCエポックナノ秒のint64配列に変換）"""
+    columns = list(df.columns) if columns is None else columns
+    return {
+        name: _time_ns(df) if name == 'time_utc' else df[name].to_numpy()
+        for name in columns
+    }
+
+def _time_ns(df, column='time_utc'):
+    """DataFrameの時刻列（既定は time_utc）をUTCエポックナノ秒 (int64) の配列として取得"""
+    return pd.to_datetime(df[column], utc=True).values.view(np.int64)
+
+def _range_time_to_ns(time_str):
+    """'%Y-%m-%d %H:%M:%S' 形式のUTC時刻文字列をエポックナノ秒に変換"""
+    dt = datetime.datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
+    return int(pytz.UTC.localize(dt).timestamp()) * NS_PER_SECOND
 
 # キャッシュ付きのGPXパーサー
-def parse_gpx(gpx_file, fix_timestamps=True):
+def parse_gpx(gpx_file, fix_timestamps=True, fast=True, digest=None, progress=None):
     """
-    GPXファイルを解析してポイントデータを抽出する
+    GPXファイルを解析してトラックの列配列を抽出する
     
     Parameters:
     ----------
@@ -220,11 +482,19 @@ def parse_gpx(gpx_file, fix_timestamps=True):
         GPXファイルのパス
     fix_timestamps : bool
         タイムスタンプ修正を適用するかどうか
+    fast : bool
+        iterparseベースの高速リーダーを使用するかどうか
+        (扱えないファイルの場合はgpxpyにフォールバック)
+    digest : str, optional
+        ファイル内容のSHA-256 (計算済みの場合。省略時はファイルから計算)
+    progress : callable, optional
+        処理ステージ名 ('parse', 'fix_timestamps') を受け取る進捗通知関数
         
     Returns:
     -------
-    list
-        ポイントデータのリスト
+    dict
+        'lat', 'lon', 'ele' (float64) と 'time_utc' (UTCエポックナノ秒, int64) の配列。
+        解析に失敗した場合は空の辞書
     """
     logger.info(f"GPXファイルの解析開始: {gpx_file} (Fix Timestamps: {fix_timestamps})")
     
@@ -233,165 +503,122 @@ def parse_gpx(gpx_file, fix_timestamps=True):
     cache_key = f"{gpx_file}_{file_stats.st_mtime}_{file_stats.st_size}_{fix_timestamps}"
     
     # 修正済みデータがキャッシュにある場合はそれを使用
-    if cache_key in _gpx_cache:
+    track = _gpx_cache.get(cache_key)
+    if track is not None:
         logger.info(f"キャッシュされた{'修正済み' if fix_timestamps else '未修正'}データを使用: {gpx_file}")
-        return _gpx_cache[cache_key]
+        return track
+    
+    # ディスクキャッシュを確認 (ファイル内容のハッシュ + 処理バージョンで識別)
+    if digest is None:
+        digest = file_digest(gpx_file)
+    disk_key = f"{digest}_v{TRACK_CACHE_VERSION}_{'fixed' if fix_timestamps else 'raw'}"
+    track = _track_store.load(disk_key)
+    if track is not None:
+        logger.info(f"ディスクキャッシュのデータを使用: {gpx_file} ({disk_key})")
+        _gpx_cache.set(cache_key, track)
+        return track
+    
+    if progress:
+        progress('parse')
     
-    points = []
     try:
-        with open(gpx_file, 'r', encoding='utf-8') as f:
-            gpx = gpxpy.parse(f)
-        
-        # メタデータ時間があれば記録
-        metadata_time = gpx.time
-        if metadata_time:
-            logger.info(f"GPXファイルのメタデータ時間: {metadata_time}")
-        
-        # すべてのトラックポイントを抽出 - ファイルの順序を維持
-        for track in gpx.tracks:
-            for segment in track.segments:
-                for point in segment.points:
-                    # 時間と標高情報があるポイントのみ処理
-                    if point.time and point.elevation is not None:
-                        # タイムゾーン情報がない場合はUTCとして扱う
-                        time_utc = point.time
-                        if time_utc.tzinfo is None:
-                            time_utc = pytz.UTC.localize(time_utc)
-                        else:
-                            # すでにタイムゾーンがある場合はUTCに変換
-                            time_utc = time_utc.astimezone(pytz.UTC)
-                        
-                        # ポイントデータを登録
-                        points.append({
-                            'lat': point.latitude,
-                            'lon': point.longitude,
-                            'ele': point.elevation,
-                            'time_utc': time_utc,
-                            'original_time': time_utc  # オリジナルの時刻も保存
-                        })
-                    else:
-                        logger.debug(f"時間または標高がないポイントをスキップ: {point}")
+        if fast:
+            try:
+                track = _read_track_fast(gpx_file)
+            except UnsupportedGPXError as e:
+                logger.warning(f"高速リーダーで解析できないためgpxpyを使用します ({gpx_file}): {e}")
+                track = _read_track_gpxpy(gpx_file)
+        else:
+            track = _read_track_gpxpy(gpx_file)
     
     except Exception as e:
         logger.error(f"GPXファイル解析エラー ({gpx_file}): {e}", exc_info=True)
-        return []
+        return {}
     
-    if not points:
+    times = track['time_utc']
+    if len(times) == 0:
         logger.warning(f"有効なポイントが見つかりませんでした: {gpx_file}")
-        return []
+        return {}
     
     # 元のファイル順序でログ出力
-    if points:
-        first_ts = points[0]['time_utc'].strftime('%Y-%m-%d %H:%M:%S.%f%z')
-        last_ts = points[-1]['time_utc'].strftime('%Y-%m-%d %H:%M:%S.%f%z')
-        logger.info(f"解析したGPXデータの時間範囲 (元の順序): {first_ts} - {last_ts} (ポイント数: {len(points)})")
-        
-        # 連続するポイント間の逆転があるかチェック
-        time_reversals = 0
-        for i in range(1, len(points)):
-            if points[i]['time_utc'] < points[i-1]['time_utc']:
-                time_diff = (points[i-1]['time_utc'] - points[i]['time_utc']).total_seconds()
-                if time_diff > 3600:  # 1時間以上の逆転のみ報告
-                    logger.warning(f"ポイント間の時間逆転を検出: ポイント{i-1}({points[i-1]['time_utc'].strftime('%H:%M:%S')}) -> ポイント{i}({points[i]['time_utc'].strftime('%H:%M:%S')}), 差: {time_diff:.1f}秒")
-                    time_reversals += 1
-        
-        if time_reversals > 0:
-            logger.warning(f"合計 {time_reversals} 回の時間逆転を検出")
+    first_ts = _format_ns(times[0], '%Y-%m-%d %H:%M:%S.%f%z')
+    last_ts = _format_ns(times[-1], '%Y-%m-%d %H:%M:%S.%f%z')
+    logger.info(f"解析したGPXデータの時間範囲 (元の順序): {first_ts} - {last_ts} (ポイント数: {len(times)})")
+    
+    # 連続するポイント間の逆転があるかチェック (1時間以上の逆転のみ報告)
+    reversal_indices = np.flatnonzero(np.diff(times) < -3600 * NS_PER_SECOND) + 1
+    for i in reversal_indices:
+        time_diff = (times[i-1] - times[i]) / NS_PER_SECOND
+        logger.warning(f"ポイント間の時間逆転を検出: ポイント{i-1}({_format_ns(times[i-1], '%H:%M:%S')}) -> ポイント{i}({_format_ns(times[i], '%H:%M:%S')}), 差: {time_diff:.1f}秒")
+    
+    if len(reversal_indices) > 0:
+        logger.warning(f"合計 {len(reversal_indices)} 回の時間逆転を検出")
     
     # タイムスタンプ修正処理
     if fix_timestamps:
+        if progress:
+            progress('fix_timestamps')
+        
         # ファイル全体での日付跨ぎを修正 (ソートなしで元の順序を維持)
-        points = fix_datetime_for_file(points)
+        times = fix_datetime_for_file(times)
         
         # ポイント間の時間順序を修正
-        points = fix_datetime_sequence_robust(points)
+        times = fix_datetime_sequence_robust(times)
         
         # 修正後の時間範囲をログに出力
-        if points:
-            fixed_first = points[0]['time_utc'].strftime('%Y-%m-%d %H:%M:%S.%f%z')
-            fixed_last = points[-1]['time_utc'].strftime('%Y-%m-%d %H:%M:%S.%f%z')
-            logger.info(f"タイムスタンプ修正後の時間範囲: {fixed_first} - {fixed_last}")
+        fixed_first = _format_ns(times[0], '%Y-%m-%d %H:%M:%S.%f%z')
+        fixed_last = _format_ns(times[-1], '%Y-%m-%d %H:%M:%S.%f%z')
+        logger.info(f"タイムスタンプ修正後の時間範囲: {fixed_first} - {fixed_last}")
         
-        # 修正したデータをキャッシュに保存
-        _gpx_cache[cache_key] = points
-    else:
-        # 未修正データもキャッシュ
-        _gpx_cache[cache_key] = points
-    
-    return points
-
-def calculate_metrics(df):
-    """Calculate vertical and horizontal speed, acceleration, and 3D metrics."""
-    # Sort by time to ensure correct calculation
-    df = df.sort_values('time_utc')
-    
-    # Calculate time differences in seconds
-    df['time_diff'] = df['time_utc'].diff().dt.total_seconds()
-    
-    # Calculate position differences
-    df['ele_diff'] = df['ele'].diff()
-    df['lat_diff'] = df['lat'].diff()
-    df['lon_diff'] = df['lon'].diff()
-    
-    # Calculate horizontal distance between consecutive points
-    df['horizontal_distance'] = df.apply(
-        lambda row: haversine_distance(
-            row['lat'] - row['lat_diff'] if not pd.isna(row['lat_diff']) else row['lat'],
-            row['lon'] - row['lon_diff'] if not pd.isna(row['lon_diff']) else row['lon'],
-            row['lat'],
-            row['lon']
-        ) if not pd.isna(row['lat_diff']) else 0,
-        axis=1
-    )
-    
-    # Calculate 3D distance between consecutive points
-    df['distance_3d'] = df.apply(
-        lambda row: calculate_3d_distance(
-            row['lat'] - row['lat_diff'] if not pd.isna(row['lat_diff']) else row['lat'],
-            row['lon'] - row['lon_diff'] if not pd.isna(row['lon_diff']) else row['lon'],
-            row['ele'] - row['ele_diff'] if not pd.isna(row['ele_diff']) else row['ele'],
-            row['lat'],
-            row['lon'],
-            row['ele']
-        ) if not pd.isna(row['lat_diff']) else 0,
-        axis=1
-    )
-    
-    # Calculate various speeds (m/s)
-    df['vertical_speed'] = df.apply(
-        lambda row: row['ele_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
+        track = dict(track, time_utc=times)
     
-    df['horizontal_speed'] = df.apply(
-        lambda row: row['horizontal_distance'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
-    
-    df['speed_3d'] = df.apply(
-        lambda row: row['distance_3d'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
-    
-    # Calculate accelerations (m/s^2)
-    df['vertical_speed_diff'] = df['vertical_speed'].diff()
-    df['horizontal_speed_diff'] = df['horizontal_speed'].diff()
-    df['speed_3d_diff'] = df['speed_3d'].diff()
-    
-    df['vertical_accel'] = df.apply(
-        lambda row: row['vertical_speed_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
+    # 解析結果をキャッシュに保存 (修正済み・未修正の両方)
+    _gpx_cache.set(cache_key, track)
+    _track_store.save(disk_key, track)
     
-    df['horizontal_accel'] = df.apply(
-        lambda row: row['horizontal_speed_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
+    return track
+
+def clear_track_cache():
+    """解析済みトラックのメモリキャッシュをクリアし、削除した件数とバイト数を返す"""
+    return _gpx_cache.clear()
+
+def clear_disk_cache():
+    """解析済みトラック・メトリクスのディスクキャッシュ (TrackStore) を削除し、削除した件数を返す"""
+    return _track_store.clear()
+
+def track_cache_stats():
+    """解析済みトラックのメモリキャッシュの統計情報"""
+    return _gpx_cache.stats()
+
+def clear_merged_cache():
+    """結合済みトラックのキャッシュをクリアし、削除した件数とバイト数を返す"""
+    return _merged_cache.clear()
+
+def merged_cache_stats():
+    """結合済みトラックのキャッシュの統計情報"""
+    return _merged_cache.stats()
+
+def calculate_metrics(df, origin=None):
+    """
+    Calculate vertical and horizontal speed, acceleration, and 3D metrics.
     
-    df['accel_3d'] = df.apply(
-        lambda row: row['speed_3d_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-        axis=1
-    )
+    origin に (lat, lon) を指定すると、ENU座標に投影した east / north / up の列を追加し、
+    水平距離はその座標から計算する。
+    """
+    # Sort by time to ensure correct calculation
+    # (同時刻のポイントは元の順序を保ち、移動平均と行を揃えるためインデックスを振り直す)
+    df = df.sort_values('time_utc', kind='stable').reset_index(drop=True)
+    
+    # Calculate distances, speeds and accelerations between consecutive points
+    lat, lon, ele = df['lat'].to_numpy(), df['lon'].to_numpy(), df['ele'].to_numpy()
+    east = north = None
+    if origin is not None:
+        east, north, up = geodetic_to_enu(lat, lon, ele, *origin)
+        for name, values in zip(ENU_COLUMNS, (east, north, up)):
+            df[name] = values
+    metrics = compute_step_metrics(_time_ns(df), lat, lon, ele, east=east, north=north)
+    for column, values in metrics.items():
+        df[column] = values
     
     # Calculate 10-second moving averages
     # 修正: rolling() メソッドのon='time_utc'パラメータを削除し、
@@ -419,25 +646,28 @@ def calculate_metrics(df):
     
     return df
 
-def filter_by_time_range(df, start_time_str, end_time_str):
-    """Filter data by time range (UTC)."""
-    # Parse start and end times in UTC
-    start_time = datetime.datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
-    start_time = pytz.UTC.localize(start_time)
+def filter_by_time_range(df, start_time_str, end_time_str, time_index=None):
+    """
+    Filter data by time range (UTC).
     
-    end_time = datetime.datetime.strptime(end_time_str, '%Y-%m-%d %H:%M:%S')
-    end_time = pytz.UTC.localize(end_time)
+    time_index に作成済みの TrackTimeIndex を渡すと、範囲の境界を二分探索だけで求める。
+    """
+    # Parse start and end times in UTC (epoch nanoseconds)
+    start_ns = _range_time_to_ns(start_time_str)
+    end_ns = _range_time_to_ns(end_time_str)
     
     # Filter by complete timestamp (UTC)
-    return df[(df['time_utc'] >= start_time) & (df['time_utc'] <= end_time)]
+    if time_index is None:
+        time_index = TrackTimeIndex.from_dataframe(df)
+    return df.iloc[time_index.range_positions(start_ns, end_ns)]
 
 def process_gpx_file(gpx_file):
     """Process a single GPX file and return processed dataframe."""
     # Parse GPX file
-    points = parse_gpx(gpx_file)
+    track = parse_gpx(gpx_file)
     
     # Calculate metrics
-    df = pd.DataFrame(points)
+    df = arrays_to_dataframe(track)
     
     # Sort by time to ensure correct calculation
     df = df.sort_values('time_utc')
@@ -447,12 +677,25 @@ def process_gpx_file(gpx_file):
     
     return df
 
-def merge_dataframes(df_a, df_b):
-    """Merge two dataframes based on time_utc."""
-    # Create a formatted time string for merging
-    df_a['time_key'] = df_a['time_utc'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    df_b['time_key'] = df_b['time_utc'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    
+# 結合後のDataFrameにトラックごとに含める列 (列名には _a / _b を付ける)
+MERGE_TRACK_COLUMNS = [
+    'lat', 'lon', 'ele',
+    'vertical_speed', 'horizontal_speed', 'speed_3d',
+    'vertical_accel', 'horizontal_accel', 'accel_3d',
+    'avg_10sec_vertical_speed', 'avg_10sec_horizontal_speed', 'avg_10sec_speed_3d',
+]
+
+def merge_dataframes(df_a, df_b, join_mode=JOIN_EXACT, join_tolerance_ms=None):
+    """
+    Merge two dataframes based on time_utc.
+    
+    時刻は整数（エポックナノ秒）のまま突き合わせる。join_mode は
+    'exact' (1秒単位で一致する点同士), 'nearest' (最も近い点), 'previous' (直前の点)
+    のいずれかで、nearest / previous では join_tolerance_ms (ミリ秒) 以内の点のみ結合する。
+    time_utc にはトラックAの時刻を使い、time_utc_b にトラックBの時刻を入れる。
+    両トラックに共通の原点で投影済みの east / north / up の列がある場合は、それを
+    east_a / north_a / up_a などとして引き継ぎ、距離をユークリッド距離で計算する。
+    """
     # Ensure required columns exist
     for df in [df_a, df_b]:
         # 速度と加速度のカラムが存在しない場合、デフォルト値を設定
@@ -462,44 +705,34 @@ def merge_dataframes(df_a, df_b):
             if col not in df.columns:
                 df[col] = 0.0  # デフォルト値として0を設定
     
-    # Select columns needed from each dataframe
-    df_a_selected = df_a[['time_key', 'time_utc', 'lat', 'lon', 'ele', 
-                          'vertical_speed', 'horizontal_speed', 'speed_3d',
-                          'vertical_accel', 'horizontal_accel', 'accel_3d',
-                          'avg_10sec_vertical_speed', 'avg_10sec_horizontal_speed', 'avg_10sec_speed_3d']].copy()
-    
-    df_b_selected = df_b[['time_key', 'lat', 'lon', 'ele', 
-                          'vertical_speed', 'horizontal_speed', 'speed_3d',
-                          'vertical_accel', 'horizontal_accel', 'accel_3d',
-                          'avg_10sec_vertical_speed', 'avg_10sec_horizontal_speed', 'avg_10sec_speed_3d']].copy()
-    
-    # Rename columns to avoid conflicts
-    df_a_selected.columns = ['time_key', 'time_utc', 
-                            'lat_a', 'lon_a', 'ele_a', 
-                            'vertical_speed_a', 'horizontal_speed_a', 'speed_3d_a',
-                            'vertical_accel_a', 'horizontal_accel_a', 'accel_3d_a',
-                            'avg_10sec_vertical_speed_a', 'avg_10sec_horizontal_speed_a', 'avg_10sec_speed_3d_a']
-    
-    df_b_selected.columns = ['time_key', 
-                            'lat_b', 'lon_b', 'ele_b', 
-                            'vertical_speed_b', 'horizontal_speed_b', 'speed_3d_b',
-                            'vertical_accel_b', 'horizontal_accel_b', 'accel_3d_b',
-                            'avg_10sec_vertical_speed_b', 'avg_10sec_horizontal_speed_b', 'avg_10sec_speed_3d_b']
-    
-    # Merge dataframes on time_key
-    merged_df = pd.merge(df_a_selected, df_b_selected, on='time_key', how='inner')
-    
-    # Calculate height difference (m)
-    merged_df['height_diff'] = merged_df['ele_a'] - merged_df['ele_b']
-    
-    # Calculate 3D distance between points
-    merged_df['distance_3d'] = merged_df.apply(
-        lambda row: calculate_3d_distance(
-            row['lat_a'], row['lon_a'], row['ele_a'], 
-            row['lat_b'], row['lon_b'], row['ele_b']
-        ), 
-        axis=1
+    # 対応する点の位置を求める
+    pos_a, pos_b = join_indices(_time_ns(df_a), _time_ns(df_b), mode=join_mode, tolerance_ms=join_tolerance_ms)
+    
+    merged = {
+        'time_utc': df_a['time_utc'].iloc[pos_a].reset_index(drop=True),
+        'time_utc_b': df_b['time_utc'].iloc[pos_b].reset_index(drop=True)
+    }
+    for suffix, df, positions in (('a', df_a, pos_a), ('b', df_b, pos_b)):
+        for col in MERGE_TRACK_COLUMNS:
+            merged[f'{col}_{suffix}'] = df[col].to_numpy()[positions]
+    merged_df = pd.DataFrame(merged)
+    
+    # トラックごとに投影済みのENU座標を対応する点の位置で取り出す
+    enu = {}
+    if all(name in df.columns for df in (df_a, df_b) for name in ENU_COLUMNS):
+        for suffix, df, positions in (('a', df_a, pos_a), ('b', df_b, pos_b)):
+            enu[suffix] = tuple(df[name].to_numpy()[positions] for name in ENU_COLUMNS)
+            for name, values in zip(ENU_COLUMNS, enu[suffix]):
+                merged_df[f'{name}_{suffix}'] = values
+    
+    # Calculate horizontal distance, height difference (m), 3D distance and bearing between points
+    separation = compute_separation(
+        merged['lat_a'], merged['lon_a'], merged['ele_a'],
+        merged['lat_b'], merged['lon_b'], merged['ele_b'],
+        enu_a=enu.get('a'), enu_b=enu.get('b')
     )
+    for column, values in separation.items():
+        merged_df[column] = values
     
     return merged_df
 
@@ -515,6 +748,7 @@ def format_for_visualization(merged_df):
     merged_df = merged_df.sort_values('time_utc')
     
     # Convert to JSON-serializable format
+    has_enu = 'east_a' in merged_df.columns
     result = []
     for _, row in merged_df.iterrows():
         timestamp = row['time_utc'].timestamp() * 1000  # Convert to milliseconds for JS
@@ -566,6 +800,12 @@ def format_for_visualization(merged_df):
                 "distance_3d": float(row['distance_3d'])
             }
         }
+        if has_enu:
+            # ENU座標（メートル）。クライアントはこの座標をそのまま描画に使える
+            for suffix in ('a', 'b'):
+                point_data[f"track_{suffix}"]["enu"] = {
+                    name: float(row[f'{name}_{suffix}']) for name in ENU_COLUMNS
+                }
         result.append(point_data)
     
     return result
@@ -601,19 +841,604 @@ def format_for_table(merged_df):
     
     return table_data
 
+# テーブルのページで返す列: キー -> (結合済みDataFrameの列, 係数, 小数点以下の桁数)
+TABLE_PAGE_COLUMNS = {
+    'ele_a_ft': ('ele_a', M_TO_FT, 2),
+    'ele_b_ft': ('ele_b', M_TO_FT, 2),
+    'height_diff_ft': ('height_diff', M_TO_FT, 2),
+    **{
+        f'{name}_{suffix}': (f'{name}_{suffix}', 1.0, 3)
+        for name in ('vertical_speed', 'horizontal_speed', 'speed_3d',
+                     'vertical_accel', 'horizontal_accel', 'accel_3d',
+                     'avg_10sec_vertical_speed', 'avg_10sec_horizontal_speed', 'avg_10sec_speed_3d')
+        for suffix in ('a', 'b')
+    },
+    'distance_3d': ('distance_3d', 1.0, 3),
+}
+TABLE_SORT_KEYS = ('time',) + tuple(TABLE_PAGE_COLUMNS)
+
+def table_page(merged_df, offset=0, limit=100, sort='time', descending=False,
+               window_start=None, window_end=None):
+    """
+    結合済みDataFrameからテーブルの1ページ分の行を作成する
+    
+    時間窓で絞り込み、sort の列で並べた上で offset から limit 行だけを行の辞書にする。
+    各行の 'index' は時刻順に並べた位置で、visualization_data のインデックスと一致する。
+    10秒平均の速度は calculate_metrics で計算済みの列をそのまま返す。
+    
+    Parameters:
+    ----------
+    merged_df : pandas.DataFrame
+        merge_gpx_files で作成した結合済みのDataFrame
+    offset, limit : int
+        返す行の開始位置と行数
+    sort : str
+        並べ替えるキー ('time' または TABLE_PAGE_COLUMNS のキー)
+    descending : bool
+        降順に並べるかどうか（値が同じ行は時刻順のまま）
+    window_start, window_end : str, optional
+        '%Y-%m-%d %H:%M:%S' 形式のUTC時刻。指定した場合はこの範囲の行だけを対象にする
+        
+    Returns:
+    -------
+    dict
+        'total' (時間窓内の行数), 'offset', 'limit', 'sort', 'order', 'rows'
+        
+    Raises:
+    ------
+    ValueError
+        sort が不正な場合
+    """
+    if sort not in TABLE_SORT_KEYS:
+        raise ValueError(f"並べ替えできない列です: {sort}")
+    
+    # visualization_data と同じ時刻順
+    time_order = merged_df.sort_values('time_utc').index.to_numpy()
+    time_ns = _time_ns(merged_df)[time_order]
+    
+    # 時間窓（時刻順の位置の範囲）
+    index = TrackTimeIndex(time_ns, is_sorted=True)
+    start_ns = _range_time_to_ns(window_start) if window_start else np.iinfo(np.int64).min
+    end_ns = _range_time_to_ns(window_end) if window_end else np.iinfo(np.int64).max
+    window = index.range_slice(start_ns, end_ns)
+    positions = np.arange(window.start, window.stop)
+    
+    if sort == 'time':
+        if descending:
+            positions = positions[::-1]
+    else:
+        column, _, _ = TABLE_PAGE_COLUMNS[sort]
+        values = merged_df[column].to_numpy(dtype=np.float64)[time_order[positions]]
+        positions = positions[np.argsort(-values if descending else values, kind='stable')]
+    
+    page = positions[offset:offset + limit]
+    rows_df = merged_df.iloc[time_order[page]]
+    columns = {
+        "index": page.tolist(),
+        "timestamp": (time_ns[page] / 1_000_000).tolist(),
+        "time": pd.to_datetime(time_ns[page], utc=True).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+    }
+    for key, (column, factor, digits) in TABLE_PAGE_COLUMNS.items():
+        columns[key] = np.round(rows_df[column].to_numpy(dtype=np.float64) * factor, digits).tolist()
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    return {
+        "total": len(positions),
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "rows": rows
+    }
+
+# レスポンスの形式
+OUTPUT_NESTED = 'nested'      # ポイントごとの入れ子の辞書 (visualization_data / table_data)
+OUTPUT_COLUMNAR = 'columnar'  # 項目ごとの配列 (columns)
+OUTPUT_BINARY = 'binary'      # columnar と同じ列をNumPy配列のまま返す（binary_format でエンコードする）
+OUTPUT_FORMATS = (OUTPUT_NESTED, OUTPUT_COLUMNAR, OUTPUT_BINARY)
+
+# nested 形式で返すビュー。table_data の値はすべて visualization_data にも含まれるため、
+# 片方だけを要求してもう片方をクライアント側で導出できる
+VIEW_VISUALIZATION = 'visualization'  # visualization_data
+VIEW_TABLE = 'table'                  # table_data
+VIEWS = (VIEW_VISUALIZATION, VIEW_TABLE)
+
+# 列形式で返す比較の列
+COLUMNAR_COMPARISON_COLUMNS = ['height_diff', 'horizontal_distance', 'distance_3d', 'bearing']
+
+def format_columnar(merged_df, as_lists=True):
+    """
+    結合済みDataFrameを項目ごとの配列 (struct-of-arrays) に変換する
+    
+    行ごとの辞書を作らず、NumPyの列を丸ごとリストに変換する。
+    columns のキーは timestamp（JavaScript向けのUTCエポックミリ秒）、
+    トラックごとの列（lat_a, ele_a, ele_ft_a, vertical_speed_a, ... と _b）、
+    比較の列（height_diff, height_diff_ft, distance_3d, ...）。
+    ENU座標の列 (east_a, north_a, up_a, ...) は投影した場合のみ含まれる。
+    as_lists=False の場合は各列をNumPy配列のまま返す。
+    """
+    # Ensure data is sorted by time
+    merged_df = merged_df.sort_values('time_utc')
+    
+    columns = {"timestamp": _time_ns(merged_df) / 1_000_000}
+    
+    def values(name):
+        return merged_df[name].to_numpy(dtype=np.float64)
+    
+    for suffix in ('a', 'b'):
+        for name in MERGE_TRACK_COLUMNS:
+            columns[f"{name}_{suffix}"] = values(f"{name}_{suffix}")
+        columns[f"ele_ft_{suffix}"] = values(f"ele_{suffix}") * M_TO_FT
+        if f"east_{suffix}" in merged_df.columns:
+            for name in ENU_COLUMNS:
+                columns[f"{name}_{suffix}"] = values(f"{name}_{suffix}")
+    for name in COLUMNAR_COMPARISON_COLUMNS:
+        columns[name] = values(name)
+    columns["height_diff_ft"] = values('height_diff') * M_TO_FT
+    
+    if as_lists:
+        columns = {name: array.tolist() for name, array in columns.items()}
+    return {"count": len(merged_df), "columns": columns}
+
+def empty_result(output_format=OUTPUT_NESTED, views=VIEWS):
+    """ポイントがない場合のレスポンス"""
+    if output_format in (OUTPUT_COLUMNAR, OUTPUT_BINARY):
+        return {"format": output_format, "count": 0, "columns": {}, "summary": {}}
+    result = {}
+    if VIEW_VISUALIZATION in views:
+        result["visualization_data"] = []
+    if VIEW_TABLE in views:
+        result["table_data"] = []
+    result["summary"] = {}
+    return result
+
+def simplify_merged(merged_df, max_points):
+    """
+    結合済みDataFrameを時刻順に並べ、表示用に max_points 点程度まで間引く
+    
+    両トラックのENU座標を並べた点列の形を保つように simplify.simplify_indices (LTTB) で選び、
+    各トラックの垂直速度が最大・最小の点と、A-B間の3D距離が最小の点は keep として必ず残す。
+    点数が max_points 以下の場合は時刻順に並べるだけで間引かない。
+    """
+    merged_df = merged_df.sort_values('time_utc')
+    if len(merged_df) <= max_points:
+        return merged_df
+    
+    columns = [f'{name}_{suffix}' for suffix in ('a', 'b') for name in ENU_COLUMNS]
+    if not all(column in merged_df.columns for column in columns):
+        columns = ['ele_a', 'ele_b']
+    points = merged_df[columns].to_numpy(dtype=np.float64)
+    
+    keep = [int(np.nanargmin(merged_df['distance_3d'].to_numpy()))]
+    for suffix in ('a', 'b'):
+        vertical_speed = merged_df[f'vertical_speed_{suffix}'].to_numpy()
+        keep += [int(np.nanargmax(vertical_speed)), int(np.nanargmin(vertical_speed))]
+    
+    return merged_df.iloc[simplify_indices(points, max_points, keep=keep)]
+
 def create_summary(merged_df):
-    """Create summary data from merged dataframe."""
+    """
+    Create summary data from merged dataframe.
+    
+    最大・最小値は merge_dataframes で計算済みの位置関係の列配列から直接求める。
+    """
+    time_ns = _time_ns(merged_df)
+    height_diff = merged_df['height_diff'].to_numpy()
+    distance_3d = merged_df['distance_3d'].to_numpy()
     summary = {
         "count": len(merged_df),
-        "start_time": merged_df['time_utc'].min().strftime('%Y-%m-%d %H:%M:%S'),
-        "end_time": merged_df['time_utc'].max().strftime('%Y-%m-%d %H:%M:%S'),
-        "max_height_diff_ft": round(merged_df['height_diff'].max() * M_TO_FT, 2),
-        "min_height_diff_ft": round(merged_df['height_diff'].min() * M_TO_FT, 2),
-        "max_distance_3d": round(merged_df['distance_3d'].max(), 2)
+        "start_time": _format_ns(time_ns.min(), '%Y-%m-%d %H:%M:%S'),
+        "end_time": _format_ns(time_ns.max(), '%Y-%m-%d %H:%M:%S'),
+        "max_height_diff_ft": round(float(height_diff.max()) * M_TO_FT, 2),
+        "min_height_diff_ft": round(float(height_diff.min()) * M_TO_FT, 2),
+        "max_distance_3d": round(float(distance_3d.max()), 2)
     }
     return summary
 
-def process_gpx_files(file_a_path, file_b_path, start_time=None, end_time=None, get_time_range_only=False):
+def get_process_pool():
+    """
+    トラック処理用のプロセスプールを取得（初回呼び出し時に作成）
+    
+    プールはスケジューラのワーカースレッドから作成され、その時点で他のスレッドが
+    キャッシュやロギングのロックを保持している場合がある。fork した子プロセスでは
+    それらのロックが解放されずデッドロックしうるため、spawn で起動する。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            workers = max(MIN_PROCESS_POOL_WORKERS, PROCESS_POOL_WORKERS)
+            logger.info(f"プロセスプールを作成: ワーカー数 {workers}")
+            _process_pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+def track_extent(gpx_file, fix_timestamps=True):
+    """トラック全体の緯度・経度の範囲（解析に失敗した場合やポイントがない場合は None）"""
+    track = parse_gpx(gpx_file, fix_timestamps=fix_timestamps)
+    if not track:
+        return None
+    return track_bounds(track['lat'], track['lon'])
+
+def projection_origin(gpx_files, fix_timestamps=True, pool=None):
+    """
+    ENU投影の共通の原点 (lat, lon) を決める
+    
+    すべてのファイルに <metadata><bounds> があればそれらを合わせた範囲の中心、
+    なければトラック全体の緯度・経度の範囲 (track_extent) の中心を使う。
+    pool にプロセスプールを指定すると、範囲を求めるための解析をワーカーで並列に行う。
+    
+    Returns:
+    -------
+    tuple
+        ((lat, lon) または None, 原点の決め方 'metadata_bounds' / 'track_extent')
+    """
+    bounds = [read_gpx_bounds(gpx_file) for gpx_file in gpx_files]
+    if all(b is not None for b in bounds):
+        return bounds_center(bounds), 'metadata_bounds'
+    if pool is not None:
+        futures = [pool.submit(track_extent, gpx_file, fix_timestamps) for gpx_file in gpx_files]
+        extents = [future.result() for future in futures]
+    else:
+        extents = [track_extent(gpx_file, fix_timestamps) for gpx_file in gpx_files]
+    return bounds_center(extents), 'track_extent'
+
+def compute_track_metrics(gpx_file, fix_timestamps=True, progress=None, origin=None):
+    """
+    トラック全体のメトリクスを計算し、時刻順に並んだ列配列として返す
+    
+    ENU座標 (east / north / up) は origin を原点に1回だけ投影して列として保存し、
+    水平速度もその座標から計算する。結合するトラックには共通の原点 (projection_origin)
+    を指定する。origin を省略した場合はこのトラックだけで決めた原点を使う。
+    結果は原点ごとにメモリキャッシュとディスクキャッシュに保存され、時間範囲の異なる
+    リクエストでも再計算せずに compute_track でスライスして使い回す。
+    
+    Returns:
+    -------
+    dict or None
+        TRACK_RESULT_COLUMNS の列配列の辞書。解析に失敗した場合は None
+    """
+    if origin is None:
+        origin, _ = projection_origin([gpx_file], fix_timestamps=fix_timestamps)
+        if origin is None:
+            return None
+    origin_key = f"{origin[0]:.9f}_{origin[1]:.9f}"
+    
+    file_stats = os.stat(gpx_file)
+    cache_key = f"{gpx_file}_{file_stats.st_mtime}_{file_stats.st_size}_{fix_timestamps}_{origin_key}_metrics"
+    metrics = _gpx_cache.get(cache_key)
+    if metrics is not None:
+        return metrics
+    
+    digest = file_digest(gpx_file)
+    disk_key = f"{digest}_v{TRACK_CACHE_VERSION}_{'fixed' if fix_timestamps else 'raw'}_{origin_key}_metrics"
+    stored = _track_store.load(disk_key)
+    if stored is not None:
+        logger.info(f"ディスクキャッシュのメトリクスを使用: {gpx_file} ({disk_key})")
+        metrics = {column: stored[column] for column in TRACK_RESULT_COLUMNS}
+        _gpx_cache.set(cache_key, metrics)
+        return metrics
+    
+    track = parse_gpx(gpx_file, fix_timestamps=fix_timestamps, digest=digest, progress=progress)
+    if not track:
+        return None
+    
+    # メトリクス計算（トラック全体で1回だけ、指定した原点のENU座標で）
+    logger.info(f"メトリクスの計算を開始: {gpx_file}")
+    if progress:
+        progress('metrics')
+    df = calculate_metrics(arrays_to_dataframe(track), origin=origin)
+    metrics = dataframe_to_arrays(df, TRACK_RESULT_COLUMNS)
+    
+    _gpx_cache.set(cache_key, metrics)
+    _track_store.save(disk_key, metrics)
+    
+    return metrics
+
+def slice_time_range(track, start_ns, end_ns):
+    """
+    時刻順に並んだ列配列から start_ns 以上 end_ns 以下の区間を切り出す
+    
+    境界は二分探索で求めるため、コストは切り出す点数にのみ比例する。
+    返す配列は元の配列のビュー。
+    """
+    window = TrackTimeIndex(track['time_utc'], is_sorted=True).range_slice(start_ns, end_ns)
+    return {column: values[window] for column, values in track.items()}
+
+def compute_track(gpx_file, start_time=None, end_time=None, fix_timestamps=True, progress=None, origin=None):
+    """
+    1トラック分の解析・タイムスタンプ修正・メトリクス計算・時間範囲の切り出しを行う
+    
+    メトリクスはトラック全体で計算してキャッシュし、時間範囲はその結果から切り出す。
+    プロセスプールのワーカーでも実行できるよう、結果はDataFrameではなく
+    TRACK_RESULT_COLUMNS の列配列（NumPy配列の辞書）で返す。
+    progress には処理ステージ名を受け取る進捗通知関数を、origin にはENU投影の原点を指定できる
+    (compute_track_metrics を参照)。
+    
+    Returns:
+    -------
+    dict or None
+        列配列の辞書。解析に失敗した場合は None、
+        時間範囲内にポイントがない場合は空の配列を返す
+    """
+    track = compute_track_metrics(gpx_file, fix_timestamps=fix_timestamps, progress=progress, origin=origin)
+    if track is None:
+        return None
+    
+    # 時間範囲で切り出し
+    if start_time and end_time:
+        track = slice_time_range(track, _range_time_to_ns(start_time), _range_time_to_ns(end_time))
+        logger.info(f"フィルタリング後: {gpx_file}: {len(track['time_utc'])}ポイント")
+    
+    return track
+
+def resample_for_merge(track, step_ms, max_gap_ms=DEFAULT_MAX_GAP_MS):
+    """
+    トラックの列配列を共通グリッドに再サンプリングし、ギャップの点を除いて返す
+    
+    Returns:
+    -------
+    tuple
+        (再サンプリングした列配列, ギャップとして除外したグリッド点の数)
+    """
+    resampled, gap = resample_track(track, step_ms, max_gap_ms)
+    gap_count = int(gap.sum())
+    if gap_count:
+        logger.info(f"点間隔が {max_gap_ms}ms を超える区間を除外: {gap_count} 点")
+        resampled = {column: values[~gap] for column, values in resampled.items()}
+    return resampled, gap_count
+
+# 時間ピラミッドで集計する結合済みDataFrameの列（標高・垂直速度・A-B間の位置関係）
+PYRAMID_COLUMNS = ['ele_a', 'ele_b', 'vertical_speed_a', 'vertical_speed_b', 'height_diff', 'distance_3d']
+
+def merged_pyramid(merged_df):
+    """結合済みDataFrameの PYRAMID_COLUMNS の時間ピラミッド (pyramid.build_pyramid) を作成する"""
+    merged_df = merged_df.sort_values('time_utc', kind='stable')
+    return build_pyramid(_time_ns(merged_df), {column: merged_df[column].to_numpy() for column in PYRAMID_COLUMNS})
+
+def overview_buckets(pyramid, window_start=None, window_end=None, width=1000):
+    """
+    時間ピラミッドから、時間窓を width 個以下のバケットで表す集計を返す (pyramid.query_pyramid を参照)
+    
+    window_start, window_end は '%Y-%m-%d %H:%M:%S' 形式のUTC時刻（省略時はデータ全体）。
+    """
+    start_ns = _range_time_to_ns(window_start) if window_start else None
+    end_ns = _range_time_to_ns(window_end) if window_end else None
+    return query_pyramid(pyramid, start_ns, end_ns, width)
+
+# 区間サマリーのインデックスで集計する列と、最小・最大を求める集計
+SUMMARY_INDEX_EXTREMA = {'height_diff': ('min', 'max'), 'distance_3d': ('min', 'max')}
+
+def merged_summary_index(merged_df):
+    """
+    結合済みDataFrameの区間サマリー用のインデックス (range_index.build_range_index) を作成する
+    
+    Returns:
+    -------
+    dict
+        'time_ns' (時刻順のエポックナノ秒) と 'index' (SUMMARY_INDEX_EXTREMA の列のインデックス)
+    """
+    merged_df = merged_df.sort_values('time_utc', kind='stable')
+    columns = {column: merged_df[column].to_numpy() for column in SUMMARY_INDEX_EXTREMA}
+    return {"time_ns": _time_ns(merged_df), "index": build_range_index(columns, SUMMARY_INDEX_EXTREMA)}
+
+def range_summary(summary_index, window_start=None, window_end=None, rows=None):
+    """
+    区間サマリーのインデックスから時間窓のサマリーを求める（窓の長さによらず定数時間）
+    
+    window_start, window_end は '%Y-%m-%d %H:%M:%S' 形式のUTC時刻（省略時はデータ全体、両端を含む）。
+    rows (lo, hi) を指定すると、インデックスの時刻順で [lo, hi) の行に制限する
+    （切り出した結合結果で、元の結合結果のインデックスを使う場合。slice_merged を参照）。
+    create_summary と同じ項目に加え、A-B間の3D距離の最小値、高度差・3D距離の平均と、
+    最大・最小になった時刻（'*_time'）を返す。窓にポイントがない場合は空の辞書。
+    """
+    if summary_index is None or len(summary_index["time_ns"]) == 0:
+        return {}
+    time_ns = summary_index["time_ns"]
+    start_ns = _range_time_to_ns(window_start) if window_start else None
+    end_ns = _range_time_to_ns(window_end) if window_end else None
+    if start_ns is not None and end_ns is not None and end_ns < start_ns:
+        raise ValueError("窓の終了時刻が開始時刻より前です")
+    lo = int(np.searchsorted(time_ns, start_ns, side='left')) if start_ns is not None else 0
+    hi = int(np.searchsorted(time_ns, end_ns, side='right')) if end_ns is not None else len(time_ns)
+    if rows is not None:
+        lo, hi = max(lo, rows[0]), min(hi, rows[1])
+    if lo >= hi:
+        return {}
+    
+    stats = query_range(summary_index["index"], lo, hi)
+    height_diff = stats['height_diff']
+    distance_3d = stats['distance_3d']
+    
+    def round_ft(value):
+        return round(value * M_TO_FT, 2) if value is not None else None
+    
+    def round_m(value):
+        return round(value, 2) if value is not None else None
+    
+    def time_at(position):
+        return _format_ns(time_ns[position], '%Y-%m-%d %H:%M:%S') if position is not None else None
+    
+    return {
+        "count": hi - lo,
+        "start_time": _format_ns(time_ns[lo], '%Y-%m-%d %H:%M:%S'),
+        "end_time": _format_ns(time_ns[hi - 1], '%Y-%m-%d %H:%M:%S'),
+        "max_height_diff_ft": round_ft(height_diff['max']),
+        "min_height_diff_ft": round_ft(height_diff['min']),
+        "max_distance_3d": round_m(distance_3d['max']),
+        "min_distance_3d": round_m(distance_3d['min']),
+        "mean_height_diff_ft": round_ft(height_diff['mean']),
+        "mean_distance_3d": round_m(distance_3d['mean']),
+        "max_height_diff_time": time_at(height_diff['argmax']),
+        "min_height_diff_time": time_at(height_diff['argmin']),
+        "max_distance_3d_time": time_at(distance_3d['argmax']),
+        "min_distance_3d_time": time_at(distance_3d['argmin'])
+    }
+
+def _file_cache_key(path):
+    """ファイルのパス・更新時刻・サイズによるキャッシュキー"""
+    file_stats = os.stat(path)
+    return f"{path}_{file_stats.st_mtime}_{file_stats.st_size}"
+
+def slice_merged(merged, time_range):
+    """
+    merge_gpx_files の結果から時間範囲 time_range (start_ns, end_ns) の部分を切り出す
+    
+    トラックA/Bの時刻がともに範囲内の行を残すため、exact 結合では範囲を指定して
+    結合し直した結果と一致する（各点のメトリクスとENU投影の原点は時間範囲によらない）。
+    nearest / previous 結合や再サンプリングでは範囲の端の対応付けが変わるため使わない。
+    
+    時間ピラミッドは範囲の両端のバケットに範囲外の行を含まないよう、切り出した結果から作り直す
+    （計算量は切り出す行数に比例する）。区間サマリーのインデックスは作り直さず元の結果のものを使い、
+    'rows'（インデックスの時刻順での行の範囲）で問い合わせる範囲を制限する。exact 結合では
+    時刻が1秒単位で一致する点同士を対応付けるため、範囲内の行は元の結果の時刻順で連続する。
+    """
+    merged_df = merged["merged"]
+    if merged_df.empty:
+        return dict(merged)
+    start_ns, end_ns = time_range
+    time_a = _time_ns(merged_df)
+    time_b = _time_ns(merged_df, 'time_utc_b')
+    keep = (time_a >= start_ns) & (time_a <= end_ns) & (time_b >= start_ns) & (time_b <= end_ns)
+    positions = np.flatnonzero(keep)
+    merged_df = merged_df[keep].reset_index(drop=True)
+    if merged_df.empty:
+        return {**merged, "merged": merged_df, "pyramid": [], "summary_index": None, "rows": None}
+    
+    if positions[-1] - positions[0] + 1 != len(positions):
+        # 連続しない場合（想定外）はインデックスも切り出した結果から作り直す
+        logger.warning("切り出した行が連続しないため、区間サマリーのインデックスを作り直します")
+        return {**merged, "merged": merged_df, "pyramid": merged_pyramid(merged_df),
+                "summary_index": merged_summary_index(merged_df), "rows": None}
+    
+    # 元の結果も切り出したものであれば、その行の範囲の中での位置に直す
+    offset = merged["rows"][0] if merged.get("rows") else 0
+    return {
+        **merged,
+        "merged": merged_df,
+        "pyramid": merged_pyramid(merged_df),
+        "rows": (offset + int(positions[0]), offset + int(positions[-1]) + 1)
+    }
+
+def merge_gpx_files(file_a_path, file_b_path, start_time=None, end_time=None, parallel=None, progress=None,
+                    join_mode=JOIN_EXACT, join_tolerance_ms=None, resample_step_ms=None,
+                    max_gap_ms=DEFAULT_MAX_GAP_MS):
+    """
+    2つのGPXファイルを処理して結合済みのDataFrameを作成する（結果はキャッシュする）
+    
+    引数は process_gpx_files と同じ。同じファイル・時間範囲・結合オプションの
+    2回目以降の呼び出しでは、キャッシュした結合結果をそのまま返す。exact 結合（再サンプリングなし）
+    では、要求した時間範囲を含む範囲の結合結果がキャッシュにあれば slice_merged で切り出して返す。
+    
+    Returns:
+    -------
+    dict
+        'merged' (結合済みのDataFrame。ポイントがない場合は空), 'origin' (ENU投影の原点),
+        'origin_source', 'resample' (再サンプリングの情報、しない場合は None),
+        'pyramid' (概観用の時間ピラミッド。merged_pyramid を参照),
+        'summary_index' (区間サマリー用のインデックス。merged_summary_index を参照),
+        'rows' (キャッシュから切り出した場合に summary_index を問い合わせる行の範囲。
+        slice_merged を参照。それ以外は None)
+        
+    Raises:
+    ------
+    ValueError
+        GPXファイルの解析に失敗した場合
+    """
+    cache_group = (_file_cache_key(file_a_path), _file_cache_key(file_b_path),
+                   join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms)
+    # compute_track と同じく、開始・終了の両方を指定した場合のみ時間範囲で絞り込む
+    time_range = (_range_time_to_ns(start_time), _range_time_to_ns(end_time)) if start_time and end_time else None
+    slicer = slice_merged if join_mode == JOIN_EXACT and not resample_step_ms else None
+    merged = _merged_cache.get(cache_group, time_range, slicer)
+    if merged is not None:
+        logger.info("キャッシュされた結合結果を使用")
+        return merged
+    
+    # 常にタイムスタンプ修正を適用
+    fix_timestamps = True
+    
+    if start_time and end_time:
+        logger.info(f"時間範囲でフィルタリング: {start_time} - {end_time}")
+    
+    # トラックごとの処理（解析・修正・フィルタリング・メトリクス計算）
+    if parallel is None:
+        parallel = PROCESS_POOL_WORKERS > 0
+    
+    def track_progress(label):
+        # トラック単位のステージにトラック名を付けて通知
+        if not progress:
+            return None
+        return lambda stage: progress(stage, label)
+    
+    # 両トラック共通のENU投影の原点（各トラックはこの原点で1回だけ投影する）
+    if parallel:
+        logger.info("トラックA/Bをプロセスプールで並列処理")
+        # ワーカープロセスからは進捗を通知できないため、解析開始のみ通知
+        if progress:
+            progress('parse', None)
+        pool = get_process_pool()
+        origin, origin_source = projection_origin([file_a_path, file_b_path], fix_timestamps, pool=pool)
+        future_a = pool.submit(compute_track, file_a_path, start_time, end_time, fix_timestamps, origin=origin)
+        future_b = pool.submit(compute_track, file_b_path, start_time, end_time, fix_timestamps, origin=origin)
+        track_a, track_b = future_a.result(), future_b.result()
+    else:
+        origin, origin_source = projection_origin([file_a_path, file_b_path], fix_timestamps)
+        track_a = compute_track(file_a_path, start_time, end_time, fix_timestamps, progress=track_progress('a'),
+                                origin=origin)
+        track_b = compute_track(file_b_path, start_time, end_time, fix_timestamps, progress=track_progress('b'),
+                                origin=origin)
+    
+    if track_a is None or track_b is None:
+        error_msg = "GPXファイルの解析に失敗したか、有効なポイントが見つかりませんでした。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    
+    df_a = arrays_to_dataframe(track_a)
+    df_b = arrays_to_dataframe(track_b)
+    
+    merged = {"merged": pd.DataFrame(), "origin": None, "origin_source": None, "resample": None, "pyramid": [],
+              "summary_index": None, "rows": None}
+    if df_a.empty or df_b.empty:
+        logger.warning("フィルタリング後にデータフレームが空になりました")
+        _merged_cache.set(cache_group, time_range, merged)
+        return merged
+    
+    # データフレームの結合
+    logger.info("データフレームを結合中")
+    if progress:
+        progress('merge', None)
+    resample_info = None
+    if resample_step_ms:
+        # 共通グリッドに再サンプリングし、グリッド時刻が完全に一致する点同士を結合
+        track_a, gaps_a = resample_for_merge(track_a, resample_step_ms, max_gap_ms)
+        track_b, gaps_b = resample_for_merge(track_b, resample_step_ms, max_gap_ms)
+        resample_info = {
+            "step_ms": resample_step_ms,
+            "max_gap_ms": max_gap_ms,
+            "gap_points_a": gaps_a,
+            "gap_points_b": gaps_b
+        }
+        df_a = arrays_to_dataframe(track_a)
+        df_b = arrays_to_dataframe(track_b)
+        join_mode, join_tolerance_ms = JOIN_NEAREST, 0
+    merged_df = merge_dataframes(df_a, df_b, join_mode=join_mode, join_tolerance_ms=join_tolerance_ms)
+    
+    if merged_df.empty:
+        logger.warning("結合後のデータフレームが空です")
+    else:
+        logger.info(f"結合後のデータポイント数: {len(merged_df)}")
+        # 概観・スクラブ用の集計はキャッシュする前に1回だけ作成する
+        merged["pyramid"] = merged_pyramid(merged_df)
+        merged["summary_index"] = merged_summary_index(merged_df)
+    
+    merged.update(merged=merged_df, origin=origin, origin_source=origin_source, resample=resample_info)
+    _merged_cache.set(cache_group, time_range, merged)
+    return merged
+
+def process_gpx_files(file_a_path, file_b_path, start_time=None, end_time=None, get_time_range_only=False,
+                      parallel=None, progress=None, join_mode=JOIN_EXACT, join_tolerance_ms=None,
+                      resample_step_ms=None, max_gap_ms=DEFAULT_MAX_GAP_MS, output_format=OUTPUT_NESTED,
+                      views=VIEWS, max_points=None):
     """
     2つのGPXファイルを処理して視覚化データを生成
     
@@ -629,6 +1454,30 @@ def process_gpx_files(file_a_path, file_b_path, start_time=None, end_time=None,
         フィルタリングの終了時間
     get_time_range_only : bool, optional
         時間範囲情報のみを返すかどうか
+    parallel : bool, optional
+        トラックA/Bをプロセスプールで並列処理するかどうか
+        (省略時は GPX_PROCESS_WORKERS が1以上なら並列処理)
+    progress : callable, optional
+        進捗通知関数。progress(stage, track) の形で呼ばれる。
+        stage は PROCESSING_STAGES のいずれか、track は 'a' / 'b' (トラック単位のステージ) または None
+    join_mode : str, optional
+        トラックA/Bの結合方式 ('exact', 'nearest', 'previous')。merge_dataframes を参照
+    join_tolerance_ms : float, optional
+        nearest / previous で結合する時刻差の上限（ミリ秒）
+    resample_step_ms : float, optional
+        指定した場合、結合前に両トラックをこの間隔（ミリ秒）の共通グリッドに再サンプリングし、
+        同じグリッド時刻の点同士を結合する（join_mode は無視される）
+    max_gap_ms : float, optional
+        再サンプリング時に補間しない点間隔の上限（ミリ秒）。これを超える区間はギャップとして除外する
+    output_format : str, optional
+        'nested' (既定: visualization_data / table_data) または
+        'columnar' (項目ごとの配列 columns。format_columnar を参照) または
+        'binary' (columnar と同じ列をNumPy配列のまま返す)
+    views : sequence of str, optional
+        nested 形式で返すビュー ('visualization', 'table')。省略時は両方
+    max_points : int, optional
+        指定した場合、結合後の点数がこれを超えると simplify_merged で間引いて返す
+        （summary は間引く前の全点から作成する）。狭い時間範囲を指定すれば全点を取得できる
         
     Returns:
     -------
@@ -640,82 +1489,86 @@ def process_gpx_files(file_a_path, file_b_path, start_time=None, end_time=None,
     try:
         # 常にタイムスタンプ修正を適用
         fix_timestamps = True
-        
-        # GPXファイルを解析
-        track_a_data = parse_gpx(file_a_path, fix_timestamps=fix_timestamps)
-        track_b_data = parse_gpx(file_b_path, fix_timestamps=fix_timestamps)
-        
-        if not track_a_data or not track_b_data:
-            error_msg = "GPXファイルの解析に失敗したか、有効なポイントが見つかりませんでした。"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-        
-        logger.info(f"解析結果: トラックA: {len(track_a_data)}ポイント, トラックB: {len(track_b_data)}ポイント")
-        
-        # データフレームに変換
-        df_a = pd.DataFrame(track_a_data)
-        df_b = pd.DataFrame(track_b_data)
+        error_msg = "GPXファイルの解析に失敗したか、有効なポイントが見つかりませんでした。"
         
         # 時間範囲情報のみ要求された場合
         if get_time_range_only:
-            logger.info("時間範囲情報のみ取得します")
-            time_range_info = get_time_range_info(df_a, df_b)
-            logger.info(f"時間範囲情報: {time_range_info}")
-            return time_range_info
-        
-        # 時間範囲でフィルタリング
-        if start_time and end_time:
-            logger.info(f"時間範囲でフィルタリング: {start_time} - {end_time}")
+            # GPXファイルを解析
+            track_a_data = parse_gpx(file_a_path, fix_timestamps=fix_timestamps)
+            track_b_data = parse_gpx(file_b_path, fix_timestamps=fix_timestamps)
             
-            # データフレームが空でないことを確認
-            if df_a.empty or df_b.empty:
-                logger.warning("フィルタリング前にデータフレームが空です")
-                return {"visualization_data": [], "table_data": [], "summary": {}}
+            if not track_a_data or not track_b_data:
+                logger.error(error_msg)
+                raise ValueError(error_msg)
             
-            df_a = filter_by_time_range(df_a, start_time, end_time)
-            df_b = filter_by_time_range(df_b, start_time, end_time)
+            logger.info(f"解析結果: トラックA: {len(track_a_data['time_utc'])}ポイント, トラックB: {len(track_b_data['time_utc'])}ポイント")
             
-            # フィルタリング後のデータ量を確認
-            logger.info(f"フィルタリング後: トラックA: {len(df_a)}ポイント, トラックB: {len(df_b)}ポイント")
-            
-            if df_a.empty or df_b.empty:
-                logger.warning("フィルタリング後にデータフレームが空になりました")
-                return {"visualization_data": [], "table_data": [], "summary": {}}
-        
-        # メトリクス計算
-        logger.info("メトリクスの計算を開始")
-        df_a = calculate_metrics(df_a)
-        df_b = calculate_metrics(df_b)
-        
-        # データフレームの結合
-        logger.info("データフレームを結合中")
-        merged_df = merge_dataframes(df_a, df_b)
+            logger.info("時間範囲情報のみ取得します")
+            time_range_info = get_time_range_info(TrackTimeIndex(track_a_data['time_utc']),
+                                                  TrackTimeIndex(track_b_data['time_utc']))
+            logger.info(f"時間範囲情報: {time_range_info}")
+            return time_range_info
         
+        merged = merge_gpx_files(file_a_path, file_b_path, start_time, end_time, parallel=parallel,
+                                 progress=progress, join_mode=join_mode, join_tolerance_ms=join_tolerance_ms,
+                                 resample_step_ms=resample_step_ms, max_gap_ms=max_gap_ms)
+        merged_df = merged["merged"]
         if merged_df.empty:
-            logger.warning("結合後のデータフレームが空です")
-            return {"visualization_data": [], "table_data": [], "summary": {}}
-        
-        logger.info(f"結合後のデータポイント数: {len(merged_df)}")
-        
-        # 視覚化データの作成
-        logger.info("視覚化データを作成中")
-        visualization_data = format_for_visualization(merged_df)
-        
-        # テーブルデータの作成
-        logger.info("テーブルデータを作成中")
-        table_data = format_for_table(merged_df)
+            return empty_result(output_format, views)
+        origin = merged["origin"]
+        origin_source = merged["origin_source"]
+        resample_info = merged["resample"]
         
-        # サマリーデータの作成
+        # サマリーデータの作成（間引く前の全点から）
         logger.info("サマリーデータを作成中")
         summary = create_summary(merged_df)
         
-        logger.info(f"GPXファイル処理完了: {len(visualization_data)}データポイント")
+        lod_info = None
+        if max_points and len(merged_df) > max_points:
+            total_points = len(merged_df)
+            merged_df = simplify_merged(merged_df, max_points)
+            lod_info = {"max_points": max_points, "total_points": total_points, "points": len(merged_df)}
+            logger.info(f"表示用に間引き: {total_points} -> {len(merged_df)} ポイント")
+        
+        if progress:
+            progress('format', None)
+        
+        if output_format == OUTPUT_COLUMNAR:
+            # 項目ごとの配列として返す
+            logger.info("列形式のデータを作成中")
+            result = {"format": OUTPUT_COLUMNAR, **format_columnar(merged_df)}
+        elif output_format == OUTPUT_BINARY:
+            # バイナリにエンコードする列をNumPy配列のまま返す
+            logger.info("バイナリ用の列データを作成中")
+            result = {"format": OUTPUT_BINARY, **format_columnar(merged_df, as_lists=False)}
+        else:
+            result = {}
+            if VIEW_VISUALIZATION in views:
+                # 視覚化データの作成
+                logger.info("視覚化データを作成中")
+                result["visualization_data"] = format_for_visualization(merged_df)
+            
+            if VIEW_TABLE in views:
+                # テーブルデータの作成
+                logger.info("テーブルデータを作成中")
+                result["table_data"] = format_for_table(merged_df)
         
-        return {
-            "visualization_data": visualization_data,
-            "table_data": table_data,
-            "summary": summary
-        }
+        result["summary"] = summary
+        
+        logger.info(f"GPXファイル処理完了: {len(merged_df)}データポイント")
+        
+        if origin is not None:
+            # 各ポイントの track_a.enu / track_b.enu の原点
+            result["projection"] = {
+                "type": "enu",
+                "origin": {"lat": origin[0], "lon": origin[1]},
+                "origin_source": origin_source
+            }
+        if resample_info:
+            result["resample"] = resample_info
+        if lod_info:
+            result["lod"] = lod_info
+        return result
         
     except Exception as e:
         logger.error(f"GPXファイル処理中にエラーが発生: {str(e)}", exc_info=True)
@@ -727,18 +1580,21 @@ def get_time_range_info(df_a, df_b):
     
     Parameters:
     ----------
-    df_a : DataFrame
-        1つ目のGPXデータのデータフレーム
-    df_b : DataFrame
-        2つ目のGPXデータのデータフレーム
+    df_a : DataFrame or TrackTimeIndex
+        1つ目のGPXデータのデータフレーム、またはその時刻インデックス
+    df_b : DataFrame or TrackTimeIndex
+        2つ目のGPXデータのデータフレーム、またはその時刻インデックス
         
     Returns:
     -------
     dict
         時間範囲情報を含む辞書
     """
+    index_a = df_a if isinstance(df_a, TrackTimeIndex) else TrackTimeIndex.from_dataframe(df_a)
+    index_b = df_b if isinstance(df_b, TrackTimeIndex) else TrackTimeIndex.from_dataframe(df_b)
+    
     # データフレームが空の場合の処理
-    if df_a.empty or df_b.empty:
+    if len(index_a) == 0 or len(index_b) == 0:
         logger.warning("データフレームが空です。有効な時間範囲を計算できません。")
         return {
             "time_range": {
@@ -756,26 +1612,26 @@ def get_time_range_info(df_a, df_b):
         }
     
     # 時間でソートせず、元の順序を使用
-    df_a_first = df_a.iloc[0]['time_utc']
-    df_a_last = df_a.iloc[-1]['time_utc']
-    df_b_first = df_b.iloc[0]['time_utc']
-    df_b_last = df_b.iloc[-1]['time_utc']
+    df_a_first = index_a.first
+    df_a_last = index_a.last
+    df_b_first = index_b.first
+    df_b_last = index_b.last
     
     # 実際のタイムスタンプをログに出力（デバッグ用）
-    logger.info(f"トラックA - 開始: {df_a_first.strftime('%Y-%m-%d %H:%M:%S.%f%z')}")
-    logger.info(f"トラックA - 終了: {df_a_last.strftime('%Y-%m-%d %H:%M:%S.%f%z')}")
-    logger.info(f"トラックB - 開始: {df_b_first.strftime('%Y-%m-%d %H:%M:%S.%f%z')}")
-    logger.info(f"トラックB - 終了: {df_b_last.strftime('%Y-%m-%d %H:%M:%S.%f%z')}")
+    logger.info(f"トラックA - 開始: {_format_ns(df_a_first, '%Y-%m-%d %H:%M:%S.%f%z')}")
+    logger.info(f"トラックA - 終了: {_format_ns(df_a_last, '%Y-%m-%d %H:%M:%S.%f%z')}")
+    logger.info(f"トラックB - 開始: {_format_ns(df_b_first, '%Y-%m-%d %H:%M:%S.%f%z')}")
+    logger.info(f"トラックB - 終了: {_format_ns(df_b_last, '%Y-%m-%d %H:%M:%S.%f%z')}")
     
     # 時間の順序をチェック (A, B両方のトラック)
     time_order_ok_a = df_a_first <= df_a_last
     time_order_ok_b = df_b_first <= df_b_last
     
     if not time_order_ok_a:
-        logger.warning(f"トラックAの時間順序が逆転しています。開始: {df_a_first}, 終了: {df_a_last}")
+        logger.warning(f"トラックAの時間順序が逆転しています。開始: {_format_ns(df_a_first)}, 終了: {_format_ns(df_a_last)}")
     
     if not time_order_ok_b:
-        logger.warning(f"トラックBの時間順序が逆転しています。開始: {df_b_first}, 終了: {df_b_last}")
+        logger.warning(f"トラックBの時間順序が逆転しています。開始: {_format_ns(df_b_first)}, 終了: {_format_ns(df_b_last)}")
     
     # 共通の時間範囲を計算 (元の順序を尊重)
     all_times = []
@@ -802,23 +1658,23 @@ def get_time_range_info(df_a, df_b):
         common_end = max(all_times)
     
     # 実際の最小値と最大値をログに出力
-    logger.info(f"時間範囲 - 開始: {common_start.strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"時間範囲 - 終了: {common_end.strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"時間範囲 - 開始: {_format_ns(common_start, '%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"時間範囲 - 終了: {_format_ns(common_end, '%Y-%m-%d %H:%M:%S')}")
     
     # 時間範囲情報を返却（ミリ秒を含まない形式にフォーマット）
     # トラックの実際の開始・終了時刻を正確に返す
     return {
         "time_range": {
-            "start": common_start.strftime('%Y-%m-%d %H:%M:%S'),
-            "end": common_end.strftime('%Y-%m-%d %H:%M:%S')
+            "start": _format_ns(common_start, '%Y-%m-%d %H:%M:%S'),
+            "end": _format_ns(common_end, '%Y-%m-%d %H:%M:%S')
         },
         "track_a": {
-            "start": df_a_first.strftime('%Y-%m-%d %H:%M:%S'),
-            "end": df_a_last.strftime('%Y-%m-%d %H:%M:%S') 
+            "start": _format_ns(df_a_first, '%Y-%m-%d %H:%M:%S'),
+            "end": _format_ns(df_a_last, '%Y-%m-%d %H:%M:%S') 
         },
         "track_b": {
-            "start": df_b_first.strftime('%Y-%m-%d %H:%M:%S'),
-            "end": df_b_last.strftime('%Y-%m-%d %H:%M:%S')
+            "start": _format_ns(df_b_first, '%Y-%m-%d %H:%M:%S'),
+            "end": _format_ns(df_b_last, '%Y-%m-%d %H:%M:%S')
         }
     }
 
@@ -968,13 +1824,13 @@ class GPXProcessor:
         # Parse GPX file
         try:
             # 外部の日付修正関数を利用（fix_timestamps=True）
-            points = parse_gpx(gpx_file, fix_timestamps=True)
+            track = parse_gpx(gpx_file, fix_timestamps=True)
             logger.info(f"外部のparse_gpx関数を使用 ({gpx_file}): 修正済みのデータ")
             
             # 時間範囲をログに出力（デバッグ用）
-            if points and len(points) > 0:
-                first_ts = points[0]['time_utc'].strftime('%Y-%m-%d %H:%M:%S%z')
-                last_ts = points[-1]['time_utc'].strftime('%Y-%m-%d %H:%M:%S%z')
+            if track:
+                first_ts = _format_ns(track['time_utc'][0])
+                last_ts = _format_ns(track['time_utc'][-1])
                 logger.info(f"GPXデータ範囲: {first_ts} - {last_ts}")
         except Exception as e:
             logger.warning(f"外部のparse_gpx関数でエラー ({str(e)})。代わりにクラス内の実装を使用します。")
@@ -988,7 +1844,7 @@ class GPXProcessor:
             return df
             
         # Calculate metrics
-        df = pd.DataFrame(points)
+        df = arrays_to_dataframe(track)
         
         # Filter by time range if provided
         if start_time_str and end_time_str:
@@ -997,94 +1853,21 @@ class GPXProcessor:
         else:
             return df
 
-    def filter_by_time_range(self, df, start_time_str, end_time_str):
+    def filter_by_time_range(self, df, start_time_str, end_time_str, time_index=None):
         """Filter data by time range (UTC)."""
-        # Parse start and end times in UTC
-        start_time = datetime.datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
-        start_time = pytz.UTC.localize(start_time)
-        
-        end_time = datetime.datetime.strptime(end_time_str, '%Y-%m-%d %H:%M:%S')
-        end_time = pytz.UTC.localize(end_time)
-        
-        # Filter by complete timestamp (UTC)
-        filtered_df = df[(df['time_utc'] >= start_time) & (df['time_utc'] <= end_time)]
-        
-        return filtered_df
+        return filter_by_time_range(df, start_time_str, end_time_str, time_index=time_index)
 
     def calculate_metrics(self, points):
         """Calculate vertical and horizontal speed, acceleration, and 3D metrics."""
-        df = pd.DataFrame(points)
+        df = arrays_to_dataframe(points) if isinstance(points, dict) else pd.DataFrame(points)
         
         # Sort by time to ensure correct calculation
-        df = df.sort_values('time_utc')
-        
-        # Calculate time differences in seconds
-        df['time_diff'] = df['time_utc'].diff().dt.total_seconds()
-        
-        # Calculate position differences
-        df['ele_diff'] = df['ele'].diff()
-        df['lat_diff'] = df['lat'].diff()
-        df['lon_diff'] = df['lon'].diff()
-        
-        # Calculate horizontal distance between consecutive points
-        df['horizontal_distance'] = df.apply(
-            lambda row: haversine_distance(
-                row['lat'] - row['lat_diff'] if not pd.isna(row['lat_diff']) else row['lat'],
-                row['lon'] - row['lon_diff'] if not pd.isna(row['lon_diff']) else row['lon'],
-                row['lat'],
-                row['lon']
-            ) if not pd.isna(row['lat_diff']) else 0,
-            axis=1
-        )
-        
-        # Calculate 3D distance between consecutive points
-        df['distance_3d'] = df.apply(
-            lambda row: calculate_3d_distance(
-                row['lat'] - row['lat_diff'] if not pd.isna(row['lat_diff']) else row['lat'],
-                row['lon'] - row['lon_diff'] if not pd.isna(row['lon_diff']) else row['lon'],
-                row['ele'] - row['ele_diff'] if not pd.isna(row['ele_diff']) else row['ele'],
-                row['lat'],
-                row['lon'],
-                row['ele']
-            ) if not pd.isna(row['lat_diff']) else 0,
-            axis=1
-        )
-        
-        # Calculate various speeds (m/s)
-        df['vertical_speed'] = df.apply(
-            lambda row: row['ele_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
-        
-        df['horizontal_speed'] = df.apply(
-            lambda row: row['horizontal_distance'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
-        
-        df['speed_3d'] = df.apply(
-            lambda row: row['distance_3d'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
-        
-        # Calculate accelerations (m/s^2)
-        df['vertical_speed_diff'] = df['vertical_speed'].diff()
-        df['horizontal_speed_diff'] = df['horizontal_speed'].diff()
-        df['speed_3d_diff'] = df['speed_3d'].diff()
-        
-        df['vertical_accel'] = df.apply(
-            lambda row: row['vertical_speed_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
-        
-        df['horizontal_accel'] = df.apply(
-            lambda row: row['horizontal_speed_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
+        df = df.sort_values('time_utc', kind='stable').reset_index(drop=True)
         
-        df['accel_3d'] = df.apply(
-            lambda row: row['speed_3d_diff'] / row['time_diff'] if row['time_diff'] > 0 else 0, 
-            axis=1
-        )
+        # Calculate distances, speeds and accelerations between consecutive points
+        metrics = compute_step_metrics(_time_ns(df), df['lat'].to_numpy(), df['lon'].to_numpy(), df['ele'].to_numpy())
+        for column, values in metrics.items():
+            df[column] = values
         
         # Calculate 10-second moving averages
         # 修正: rolling() メソッドのon='time_utc'パラメータを削除し、
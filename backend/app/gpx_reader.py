@@ -0,0 +1,154 @@
+"""GPXファイルを列指向のNumPy配列として高速に読み込むリーダー"""
+import os
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 対応するGPX名前空間 (1.1 と 1.0)
+GPX_NAMESPACES = (
+    'http://www.topografix.com/GPX/1/1',
+    'http://www.topografix.com/GPX/1/0',
+)
+
+# trkpt タグ -> (ele タグ, time タグ) の対応表
+_TRKPT_TAGS = {
+    f'{{{ns}}}trkpt': (f'{{{ns}}}ele', f'{{{ns}}}time') for ns in GPX_NAMESPACES
+}
+_TRKSEG_TAGS = {f'{{{ns}}}trkseg' for ns in GPX_NAMESPACES}
+
+# 1ポイントあたりのおおよそのバイト数（配列の初期確保サイズの見積もり用）
+_BYTES_PER_POINT = 90
+_MIN_CAPACITY = 1024
+
+
+class UnsupportedGPXError(ValueError):
+    """高速リーダーで扱えないGPXファイル（gpxpyへのフォールバック対象）"""
+
+
+def _allocate(capacity: int) -> Dict[str, np.ndarray]:
+    """指定サイズの列配列を確保"""
+    return {
+        'lat': np.empty(capacity, dtype=np.float64),
+        'lon': np.empty(capacity, dtype=np.float64),
+        'ele': np.empty(capacity, dtype=np.float64),
+        'time': np.empty(capacity, dtype=object),
+    }
+
+
+def _grow(columns: Dict[str, np.ndarray], size: int) -> Dict[str, np.ndarray]:
+    """列配列の容量を2倍に拡張（先頭 size 件をコピー）"""
+    grown = _allocate(len(columns['lat']) * 2)
+    for name, values in columns.items():
+        grown[name][:size] = values[:size]
+    return grown
+
+
+def read_gpx_arrays(gpx_file: str) -> Dict[str, np.ndarray]:
+    """
+    GPXファイルを逐次解析し、トラックポイントを列配列に格納する
+
+    gpxpy のオブジェクトモデルを経由せず、iterparse で読み取った値を
+    事前確保した配列に直接書き込む。時間と標高を持つポイントのみを
+    ファイルの順序のまま返す。
+
+    Parameters:
+    ----------
+    gpx_file : str
+        GPXファイルのパス
+
+    Returns:
+    -------
+    dict
+        'lat', 'lon', 'ele' (float64) と 'time' (ISO 8601 文字列) の配列
+
+    Raises:
+    ------
+    UnsupportedGPXError
+        XMLが不正、または想定外の形式で高速リーダーでは扱えない場合
+    """
+    capacity = max(_MIN_CAPACITY, os.path.getsize(gpx_file) // _BYTES_PER_POINT)
+    columns = _allocate(capacity)
+    size = 0
+    skipped = 0
+
+    try:
+        for _, elem in ET.iterparse(gpx_file, events=('end',)):
+            tag = elem.tag
+            child_tags = _TRKPT_TAGS.get(tag)
+            if child_tags is None:
+                # セグメント終了時に処理済みポイントを解放
+                if tag in _TRKSEG_TAGS:
+                    elem.clear()
+                continue
+
+            ele_el = elem.find(child_tags[0])
+            time_el = elem.find(child_tags[1])
+            ele_text = ele_el.text if ele_el is not None else None
+            time_text = time_el.text if time_el is not None else None
+
+            if not ele_text or not time_text:
+                skipped += 1
+                elem.clear()
+                continue
+
+            time_text = time_text.strip()
+            # UTC (Z) 以外のタイムスタンプはgpxpyに任せる
+            if not time_text.endswith('Z'):
+                raise UnsupportedGPXError(f"UTC以外のタイムスタンプ形式: {time_text}")
+
+            if size == len(columns['lat']):
+                columns = _grow(columns, size)
+
+            columns['lat'][size] = float(elem.get('lat'))
+            columns['lon'][size] = float(elem.get('lon'))
+            columns['ele'][size] = float(ele_text)
+            columns['time'][size] = time_text
+            size += 1
+
+            elem.clear()
+    except ET.ParseError as e:
+        raise UnsupportedGPXError(f"XML解析エラー: {e}") from e
+    except (TypeError, ValueError) as e:
+        if isinstance(e, UnsupportedGPXError):
+            raise
+        raise UnsupportedGPXError(f"トラックポイントの値が不正です: {e}") from e
+
+    if size == 0:
+        raise UnsupportedGPXError("GPX名前空間のトラックポイントが見つかりません")
+
+    if skipped:
+        logger.debug(f"時間または標高がないポイントをスキップ: {skipped}件 ({gpx_file})")
+
+    return {name: values[:size].copy() for name, values in columns.items()}
+
+
+_BOUNDS_TAGS = {f'{{{ns}}}bounds' for ns in GPX_NAMESPACES}
+
+
+def read_gpx_bounds(gpx_file: str) -> Optional[Tuple[float, float, float, float]]:
+    """
+    GPXファイルの <metadata><bounds> を読み取る
+
+    最初のトラックポイントに達した時点で読み込みを打ち切るため、
+    ファイル全体を解析しない。
+
+    Returns:
+    -------
+    tuple or None
+        (minlat, minlon, maxlat, maxlon)。bounds がない・不正な場合は None
+    """
+    try:
+        # 途中で打ち切ってもファイルが閉じられるよう、iterparse にはファイルオブジェクトを渡す
+        with open(gpx_file, 'rb') as f:
+            for _, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag in _BOUNDS_TAGS:
+                    return tuple(float(elem.get(name)) for name in ('minlat', 'minlon', 'maxlat', 'maxlon'))
+                if elem.tag in _TRKPT_TAGS:
+                    return None
+    except (ET.ParseError, TypeError, ValueError) as e:
+        logger.debug(f"boundsを読み取れません ({gpx_file}): {e}")
+    return None
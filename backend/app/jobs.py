@@ -0,0 +1,201 @@
+"""時間のかかるトラック処理を非同期ジョブとして実行し、進捗と結果を管理する"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.scheduler import ProcessingScheduler, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+# 完了したジョブの結果を保持する時間（秒）
+JOB_RESULT_TTL = float(os.environ.get("GPX_JOB_RESULT_TTL", "600"))
+
+# SSEでイベントがない場合にコメントを送る間隔（秒）
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class Job:
+    """1件の処理ジョブの状態"""
+
+    def __init__(self, job_id: str, total_steps: int):
+        self.job_id = job_id
+        self.status = JOB_QUEUED
+        self.stage: Optional[str] = None
+        self.track: Optional[str] = None
+        self.total_steps = total_steps
+        self.steps_seen: List[Tuple[str, Optional[str]]] = []
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._waiters_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    @property
+    def progress(self) -> float:
+        if self.status == JOB_SUCCEEDED:
+            return 1.0
+        # 開始済みのステップ数から進捗率を概算（最後のステップは完了時に1.0）
+        return round(min(len(self.steps_seen), self.total_steps) / (self.total_steps + 1), 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ポーリング・SSEで返すジョブの状態"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "track": self.track,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+        }
+
+    def update(self, **fields) -> None:
+        """状態を更新して待機中のSSE購読者に通知（どのスレッドからでも呼び出せる）"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.updated_at = time.time()
+        with self._waiters_lock:
+            self.version += 1
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 購読側のイベントループが既に終了している
+                pass
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """version 以降に状態が更新されるまで待機（タイムアウト時は False）"""
+        event = asyncio.Event()
+        with self._waiters_lock:
+            if self.version != version:
+                return True
+            self._waiters.append((asyncio.get_running_loop(), event))
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class JobManager:
+    """
+    ジョブの登録・実行・結果保持を行うマネージャ
+
+    ジョブは ProcessingScheduler のワーカースレッドで実行され、処理関数には
+    progress(stage, track) 形式の進捗通知関数が渡される。
+    完了したジョブは result_ttl 秒経過後に破棄される。
+    """
+
+    def __init__(self, scheduler: ProcessingScheduler, stages: Tuple[str, ...],
+                 track_stages: Tuple[str, ...] = (), result_ttl: float = JOB_RESULT_TTL):
+        self.scheduler = scheduler
+        self.stages = stages
+        self.result_ttl = result_ttl
+        # トラック単位のステージはトラックA/Bの2回ずつ数える
+        self.total_steps = len(stages) + len(track_stages)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and now - job.finished_at > self.result_ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            logger.info(f"保持期間を過ぎたジョブを削除: {len(expired)} 件")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Job:
+        """
+        ジョブを登録して実行を開始する
+
+        Raises:
+        ------
+        QueueFullError
+            スケジューラの待ち行列が満杯の場合
+        """
+        self._purge_expired()
+        job = Job(uuid.uuid4().hex, self.total_steps)
+
+        def progress(stage: str, track: Optional[str] = None) -> None:
+            job.steps_seen.append((stage, track))
+            job.update(stage=stage, track=track)
+
+        def run() -> None:
+            job.update(status=JOB_RUNNING)
+            try:
+                result = func(*args, progress=progress, **kwargs)
+            except Exception as e:
+                logger.error(f"ジョブ {job.job_id} が失敗: {e}", exc_info=True)
+                job.update(status=JOB_FAILED, error=str(e), finished_at=time.time())
+                return
+            job.result = result
+            job.update(status=JOB_SUCCEEDED, finished_at=time.time())
+            logger.info(f"ジョブ {job.job_id} 完了")
+
+        # すぐに開始したワーカーが更新したジョブも取得できるよう、先に登録してから投入する
+        with self._lock:
+            self._jobs[job.job_id] = job
+        try:
+            self.scheduler.submit(run)
+        except QueueFullError:
+            # 待ち行列が満杯の場合は登録を取り消す
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        logger.info(f"ジョブを登録: {job.job_id}")
+        return job
+
+    async def events(self, job: Job) -> AsyncIterator[str]:
+        """ジョブの状態変化をServer-Sent Events形式で送出する"""
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                event = "progress"
+                if job.status == JOB_SUCCEEDED:
+                    event = "done"
+                elif job.status == JOB_FAILED:
+                    event = "error"
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+            elif not await job.wait_for_change(version, SSE_KEEPALIVE_INTERVAL):
+                # プロキシに接続を切られないよう定期的にコメントを送る
+                yield ": keepalive\n\n"
+
+    def stats(self) -> Dict[str, int]:
+        """ステータスごとのジョブ件数"""
+        with self._lock:
+            counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_SUCCEEDED: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
@@ -1,4 +1,7 @@
 import os
+import re
+import asyncio
+import hashlib
 import tempfile
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
@@ -8,11 +11,25 @@ import json
 from pydantic import BaseModel
 import gpxpy
 import logging
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.gpx_processor import process_gpx_files
+from app.gpx_processor import (
+    process_gpx_files, parse_gpx, clear_track_cache, clear_disk_cache, track_cache_stats, PROCESSING_STAGES,
+    OUTPUT_FORMATS, OUTPUT_NESTED, OUTPUT_BINARY, VIEWS,
+    merge_gpx_files, table_page, TABLE_SORT_KEYS, clear_merged_cache, merged_cache_stats,
+    overview_buckets, range_summary
+)
+from app.binary_format import encode_columns, MEDIA_TYPE as BINARY_MEDIA_TYPE
+from app.cache import ByteLRUCache
+from app.scheduler import scheduler, QueueFullError
+from app.single_flight import SingleFlight
+from app.track_store import file_digest
+from app.jobs import JobManager, JOB_FAILED
+from app.track_join import JOIN_MODES, JOIN_EXACT
+from app.resample import DEFAULT_MAX_GAP_MS
+from app.simplify import MIN_OUTPUT_POINTS
 
 # ロギングの設定
 logging.basicConfig(level=logging.DEBUG)
@@ -31,11 +48,39 @@ app.add_middleware(
 
 # アップロードされたファイルを一時的に保存するディレクトリ
 UPLOAD_DIR = tempfile.gettempdir()
+# アップロードを読み込むチャンクサイズ（バイト）
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# アップロードしたファイルの名前（内容のSHA-256に基づく。save_upload を参照）
+UPLOAD_NAME_PATTERN = re.compile(r"gpx_([0-9a-f]{64})\.gpx")
+# 再サンプリングのステップの下限（ミリ秒）
+MIN_RESAMPLE_STEP_MS = 10
+# /api/table で1回に返す行数の上限
+MAX_TABLE_PAGE_SIZE = 1000
+# /api/overview で指定できる幅（バケット数）の上限
+MAX_OVERVIEW_WIDTH = 10000
 # サンプルデータディレクトリ
 SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "samples")
 
 # レスポンスキャッシュ（処理に時間がかかる結果をキャッシュ）
-RESPONSE_CACHE: Dict[str, Any] = {}
+# バイト数の上限を超えると古い順に削除され、TTL経過後のエントリは破棄される
+RESPONSE_CACHE = ByteLRUCache(
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MB", "256")) * 1024 * 1024,
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "3600")) or None,
+    name="response_cache"
+)
+
+# 非同期ジョブの管理（処理はスケジューラのワーカーで実行）
+job_manager = JobManager(
+    scheduler,
+    stages=PROCESSING_STAGES,
+    track_stages=('parse', 'fix_timestamps', 'metrics')
+)
+
+# 同時に来た同じ内容の処理リクエストを1回の処理にまとめる
+process_flights = SingleFlight(name="process")
+
+# アップロード直後に開始した解析処理（ファイルパス -> Future）
+_pending_parses: Dict[str, asyncio.Future] = {}
 
 class TimeRange(BaseModel):
     start: str
@@ -47,8 +92,22 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    """ヘルスチェックエンドポイント"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    """ヘルスチェックエンドポイント（処理キューの状態も返す）"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "scheduler": scheduler.stats(),
+        "jobs": job_manager.stats(),
+        "single_flight": process_flights.stats()
+    }
+
+def queue_full_response(e: QueueFullError) -> JSONResponse:
+    """処理キューが満杯の場合の503レスポンス"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(e), "scheduler": scheduler.stats()},
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
 # サンプルデータのキャッシュキー
 @lru_cache(maxsize=1)
@@ -81,13 +140,14 @@ async def load_sample_data():
         cache_key = get_sample_data_cache_key()
         
         # キャッシュをチェック
-        # if cache_key in RESPONSE_CACHE: # キャッシュの利用を一時停止（確認のため）
-        #    logger.info("サンプルデータのキャッシュを使用")
-        #    return RESPONSE_CACHE[cache_key]
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info("サンプルデータのキャッシュを使用")
+            return cached
         
         # 時間範囲も取得するように戻す
         logger.info("サンプルファイルパスと時間範囲を取得中...")
-        time_range = process_gpx_files(file_a_path, file_b_path, get_time_range_only=True)
+        time_range = await scheduler.run(process_gpx_files, file_a_path, file_b_path, get_time_range_only=True)
         
         # 結果を返す (ファイルパスと時間範囲)
         result = {
@@ -97,14 +157,93 @@ async def load_sample_data():
         }
         
         # キャッシュに保存
-        # RESPONSE_CACHE[cache_key] = result # キャッシュの利用を一時停止（確認のため）
+        RESPONSE_CACHE.set(cache_key, result)
         
         logger.info("サンプルデータ読み込み成功")
         return result
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except HTTPException:
+        # HTTPExceptionはそのまま再発生
+        raise
     except Exception as e:
         logger.error(f"サンプルデータ読み込みエラー: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"サンプルデータエラー: {str(e)}")
 
+async def save_upload(upload: UploadFile) -> Dict[str, str]:
+    """
+    アップロードされたファイルをチャンク単位でディスクに書き込みながらハッシュを計算する
+    
+    保存先はファイル内容のSHA-256に基づくパスとし、同じ内容のファイルが
+    既に保存されている場合は書き込んだ一時ファイルを破棄して既存のパスを返す。
+    """
+    sha = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix=".gpx.part", dir=UPLOAD_DIR)
+    os.close(fd)
+    
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as out_file:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                await out_file.write(chunk)
+        
+        digest = sha.hexdigest()
+        file_path = os.path.join(UPLOAD_DIR, f"gpx_{digest}.gpx")
+        
+        if os.path.exists(file_path):
+            # 同一内容のファイルは再保存しない
+            logger.info(f"同一内容のファイルが保存済みのため再利用: {upload.filename} -> {file_path}")
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return {"path": file_path, "digest": digest}
+
+def start_background_parse(file_path: str, digest: Optional[str] = None) -> None:
+    """
+    ファイルの解析をバックグラウンドで開始し、最初の処理リクエストでキャッシュが使えるようにする
+    
+    解析は同時実行数を制限したスケジューラで行い、待ち行列が満杯の場合は事前の解析を行わない
+    （最初の処理リクエストで解析する）。
+    """
+    if file_path in _pending_parses:
+        return
+    
+    try:
+        future = asyncio.wrap_future(scheduler.submit(parse_gpx, file_path, fix_timestamps=True, digest=digest))
+    except QueueFullError:
+        logger.info(f"処理待ちが多いためバックグラウンド解析を省略: {file_path}")
+        return
+    _pending_parses[file_path] = future
+    
+    def _on_done(done: asyncio.Future):
+        _pending_parses.pop(file_path, None)
+        if done.cancelled():
+            return
+        if done.exception() is not None:
+            logger.warning(f"バックグラウンド解析に失敗: {file_path}: {done.exception()}")
+        elif not done.result():
+            # parse_gpx は解析できないファイルやポイントがないファイルでは空の辞書を返す
+            logger.warning(f"バックグラウンド解析で有効なポイントが得られませんでした: {file_path}")
+        else:
+            logger.info(f"バックグラウンド解析完了: {file_path}")
+    
+    future.add_done_callback(_on_done)
+
+async def wait_for_pending_parses(*file_paths: str) -> None:
+    """対象ファイルのバックグラウンド解析が実行中であれば完了を待つ"""
+    pending = [_pending_parses[path] for path in file_paths if path in _pending_parses]
+    if pending:
+        logger.info(f"バックグラウンド解析の完了を待機: {len(pending)} 件")
+        await asyncio.gather(*pending, return_exceptions=True)
+
 @app.post("/api/upload")
 async def upload_gpx_files(
     file_a: UploadFile = File(...),
@@ -117,29 +256,24 @@ async def upload_gpx_files(
         if not file_a.filename.endswith('.gpx') or not file_b.filename.endswith('.gpx'):
             raise HTTPException(status_code=400, detail="GPXファイルのみアップロード可能です")
         
-        # 一時ファイルとして保存
-        file_a_path = os.path.join(UPLOAD_DIR, f"file_a_{datetime.now().timestamp()}.gpx")
-        file_b_path = os.path.join(UPLOAD_DIR, f"file_b_{datetime.now().timestamp()}.gpx")
+        async def store_and_parse(upload: UploadFile) -> Dict[str, str]:
+            # 保存が終わったファイルから順に解析を開始
+            saved = await save_upload(upload)
+            start_background_parse(saved["path"], saved["digest"])
+            return saved
         
         # ファイル保存を並行して実行
-        async with aiofiles.open(file_a_path, 'wb') as out_file:
-            content = await file_a.read()
-            await out_file.write(content)
-        
-        async with aiofiles.open(file_b_path, 'wb') as out_file:
-            content = await file_b.read()
-            await out_file.write(content)
+        saved_a, saved_b = await asyncio.gather(store_and_parse(file_a), store_and_parse(file_b))
         
-        # GPXデータから時間範囲を抽出する処理を削除
-        # time_range = process_gpx_files(file_a_path, file_b_path, get_time_range_only=True)
-        
-        # 結果を返す (ファイルパスのみ)
+        # 結果を返す (ファイルパスと内容のハッシュ)
         result = {
-            "file_a_path": file_a_path,
-            "file_b_path": file_b_path,
+            "file_a_path": saved_a["path"],
+            "file_b_path": saved_b["path"],
+            "file_a_sha256": saved_a["digest"],
+            "file_b_sha256": saved_b["digest"],
         }
         
-        logger.info("アップロード処理成功（ファイルパスのみ返却）")
+        logger.info("アップロード処理成功（ファイルパスのみ返却、解析はバックグラウンドで開始）")
         return result
     except HTTPException:
         # HTTPExceptionはそのまま再発生
@@ -149,8 +283,9 @@ async def upload_gpx_files(
         raise HTTPException(status_code=500, detail=f"アップロードエラー: {str(e)}")
 
 # 処理結果のキャッシュ用のキー生成関数
-def get_process_cache_key(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str]) -> str:
-    """処理リクエストのキャッシュキーを生成"""
+def get_process_cache_key(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                          **options) -> str:
+    """処理リクエストのキャッシュキーを生成（options には結果に影響する処理オプションを渡す）"""
     file_a_stat = os.stat(file_a_path) if os.path.exists(file_a_path) else None
     file_b_stat = os.stat(file_b_path) if os.path.exists(file_b_path) else None
     
@@ -161,14 +296,118 @@ def get_process_cache_key(file_a_path: str, file_b_path: str, start_time: Option
     start_key = start_time if start_time is not None else "None"
     end_key = end_time if end_time is not None else "None"
     
-    return f"process_{file_a_path}_{file_a_mtime}_{file_b_path}_{file_b_mtime}_{start_key}_{end_key}"
+    options_key = "_".join(f"{name}={options[name]}" for name in sorted(options))
+    
+    return f"process_{file_a_path}_{file_a_mtime}_{file_b_path}_{file_b_mtime}_{start_key}_{end_key}_{options_key}"
+
+@lru_cache(maxsize=256)
+def _file_digest_cached(path: str, mtime_ns: int, size: int) -> str:
+    return file_digest(path)
+
+def content_digest(path: str) -> str:
+    """
+    ファイル内容のSHA-256
+    
+    アップロードしたファイルは保存時に計算したファイル名のハッシュを使い、それ以外の
+    ファイルはパス・更新時刻・サイズが同じ間は計算し直さない。
+    """
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(UPLOAD_DIR):
+        match = UPLOAD_NAME_PATTERN.fullmatch(os.path.basename(path))
+        if match:
+            return match.group(1)
+    file_stat = os.stat(path)
+    return _file_digest_cached(path, file_stat.st_mtime_ns, file_stat.st_size)
+
+def get_process_flight_key(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                           **options) -> tuple:
+    """
+    同時に来た処理リクエストを束ねるキーを生成
+    
+    パスではなくファイル内容のハッシュを使うため、同じフライトを別々にアップロードした
+    リクエストも1回の処理にまとめる。
+    """
+    return (content_digest(file_a_path), content_digest(file_b_path), start_time, end_time,
+            tuple(sorted(options.items())))
+
+def get_processing_options(join_mode: str, join_tolerance_ms: Optional[float],
+                           resample_step_ms: Optional[float] = None,
+                           max_gap_ms: Optional[float] = None,
+                           output_format: str = OUTPUT_NESTED,
+                           views: Optional[str] = None,
+                           max_points: Optional[int] = None) -> Dict[str, Any]:
+    """リクエストの処理オプションを検証し、process_gpx_files に渡す引数にまとめる"""
+    if join_mode not in JOIN_MODES:
+        raise HTTPException(status_code=400, detail=f"join_mode は {', '.join(JOIN_MODES)} のいずれかを指定してください: {join_mode}")
+    if join_tolerance_ms is not None and join_tolerance_ms < 0:
+        raise HTTPException(status_code=400, detail=f"join_tolerance_ms には0以上の値を指定してください: {join_tolerance_ms}")
+    if resample_step_ms is not None and resample_step_ms < MIN_RESAMPLE_STEP_MS:
+        raise HTTPException(status_code=400, detail=f"resample_step_ms には{MIN_RESAMPLE_STEP_MS}以上の値を指定してください: {resample_step_ms}")
+    if max_gap_ms is not None and max_gap_ms <= 0:
+        raise HTTPException(status_code=400, detail=f"max_gap_ms には正の値を指定してください: {max_gap_ms}")
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format は {', '.join(OUTPUT_FORMATS)} のいずれかを指定してください: {output_format}")
+    if max_points is not None and max_points < MIN_OUTPUT_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points には{MIN_OUTPUT_POINTS}以上の値を指定してください: {max_points}")
+    requested_views = VIEWS if views is None else {view.strip() for view in views.split(",") if view.strip()}
+    invalid_views = set(requested_views) - set(VIEWS)
+    if not requested_views or invalid_views:
+        raise HTTPException(status_code=400, detail=f"views には {', '.join(VIEWS)} をカンマ区切りで指定してください: {views}")
+    return {
+        "join_mode": join_mode,
+        "join_tolerance_ms": join_tolerance_ms,
+        "resample_step_ms": resample_step_ms,
+        "max_gap_ms": max_gap_ms if max_gap_ms is not None else DEFAULT_MAX_GAP_MS,
+        "output_format": output_format,
+        # キャッシュキーが要求の順序に依存しないよう VIEWS の順に並べる
+        "views": tuple(view for view in VIEWS if view in requested_views),
+        "max_points": max_points
+    }
+
+def merge_options(join_mode: str, join_tolerance_ms: Optional[float],
+                  resample_step_ms: Optional[float] = None,
+                  max_gap_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    リクエストの処理オプションを検証し、merge_gpx_files に渡す引数にまとめる
+    
+    get_processing_options の結果から、結合結果には影響しないレスポンス形式・間引きのオプションを除く。
+    """
+    options = get_processing_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms)
+    for name in ("output_format", "views", "max_points"):
+        options.pop(name)
+    return options
+
+def negotiate_output_format(request: Request, output_format: str) -> str:
+    """Accept ヘッダーでバイナリ形式を要求された場合は binary、それ以外は format の指定に従う"""
+    if BINARY_MEDIA_TYPE in request.headers.get("accept", ""):
+        return OUTPUT_BINARY
+    return output_format
+
+def encode_result(result: Dict[str, Any], output_format: str):
+    """binary 形式の処理結果をバイト列にエンコードする（それ以外はそのまま返す）"""
+    if output_format == OUTPUT_BINARY:
+        return encode_columns(result)
+    return result
+
+def result_response(result):
+    """処理結果をレスポンスにする（バイト列はバイナリ形式として返す）"""
+    if isinstance(result, bytes):
+        return Response(content=result, media_type=BINARY_MEDIA_TYPE)
+    return result
 
 @app.post("/api/process")
 async def process_data(
+    request: Request,
     file_a_path: str = Form(...),
     file_b_path: str = Form(...),
     start_time: Optional[str] = Form(None),
     end_time: Optional[str] = Form(None),
+    join_mode: str = Form(JOIN_EXACT),
+    join_tolerance_ms: Optional[float] = Form(None),
+    resample_step_ms: Optional[float] = Form(None),
+    max_gap_ms: Optional[float] = Form(None),
+    output_format: str = Form(OUTPUT_NESTED, alias="format"),
+    views: Optional[str] = Form(None),
+    max_points: Optional[int] = Form(None),
 ):
     logger.info(f"データ処理リクエスト受信")
     if start_time and end_time:
@@ -183,39 +422,64 @@ async def process_data(
     if not os.path.exists(file_b_path):
         raise HTTPException(status_code=400, detail=f"ファイルBが見つかりません: {file_b_path}")
     
+    output_format = negotiate_output_format(request, output_format)
+    options = get_processing_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms, output_format, views,
+                                     max_points)
+    
     # キャッシュキーを生成
-    cache_key = get_process_cache_key(file_a_path, file_b_path, start_time, end_time)
+    cache_key = get_process_cache_key(file_a_path, file_b_path, start_time, end_time, **options)
     
     # キャッシュをチェック
-    # if cache_key in RESPONSE_CACHE: # キャッシュの利用を一時停止（確認のため）
-    #    logger.info("処理結果のキャッシュを使用")
-    #    return RESPONSE_CACHE[cache_key]
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        logger.info("処理結果のキャッシュを使用")
+        return result_response(cached)
     
-    # GPXファイルを処理してデータを返す
-    try:
+    async def compute():
+        # アップロード直後の解析が実行中であれば、その結果を使えるよう完了を待つ
+        await wait_for_pending_parses(file_a_path, file_b_path)
+        
         logger.info("GPXデータ処理開始")
         # process_gpx_files に Optional な start_time, end_time を渡す
         # process_gpx_files 側で None の場合の処理が必要
-        result = process_gpx_files(
+        # 同期処理はスケジューラのワーカースレッドで実行し、イベントループを塞がない
+        result = await scheduler.run(
+            process_gpx_files,
             file_a_path,
             file_b_path,
             start_time=start_time,
             end_time=end_time,
-            get_time_range_only=False
+            get_time_range_only=False,
+            **options
         )
         
         # 処理結果の基本検証
         if not result:
             raise ValueError("処理結果が空です")
         
-        if "visualization_data" not in result or not result["visualization_data"]:
+        if "columns" in result:
+            point_count = result["count"]
+        else:
+            point_count = len(result.get("visualization_data", result.get("table_data", [])))
+        if not point_count:
             logger.warning("視覚化データが空です。何かの問題かもしれません。")
         
         # キャッシュに処理結果を保存
-        # RESPONSE_CACHE[cache_key] = result # キャッシュの利用を一時停止（確認のため）
+        result = encode_result(result, options["output_format"])
+        RESPONSE_CACHE.set(cache_key, result)
         
-        logger.info(f"データ処理完了: {len(result.get('visualization_data', []))} データポイント")
+        logger.info(f"データ処理完了: {point_count} データポイント")
         return result
+    
+    # GPXファイルを処理してデータを返す（同じ処理が実行中であれば、その結果を共有する）
+    try:
+        # 初回はファイル全体を読んでハッシュを計算するため、イベントループ外で実行する
+        flight_key = await asyncio.to_thread(get_process_flight_key, file_a_path, file_b_path, start_time, end_time,
+                                             **options)
+        result = await process_flights.run(flight_key, compute)
+        return result_response(result)
+    except QueueFullError as e:
+        return queue_full_response(e)
     except Exception as e:
         error_msg = str(e)
         logger.error(f"データ処理エラー: {error_msg}", exc_info=True)
@@ -237,16 +501,300 @@ async def process_data(
             }
         )
 
+def get_table_rows(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                   page_options: Dict[str, Any], **options) -> Dict[str, Any]:
+    """結合済みトラック（キャッシュ済みであれば再利用）からテーブルの1ページを作成する"""
+    merged = merge_gpx_files(file_a_path, file_b_path, start_time, end_time, **options)
+    if merged["merged"].empty:
+        return {"total": 0, "offset": page_options["offset"], "limit": page_options["limit"],
+                "sort": page_options["sort"], "order": "desc" if page_options["descending"] else "asc", "rows": []}
+    return table_page(merged["merged"], **page_options)
+
+@app.get("/api/table")
+async def get_table(
+    file_a_path: str,
+    file_b_path: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    join_mode: str = JOIN_EXACT,
+    join_tolerance_ms: Optional[float] = None,
+    resample_step_ms: Optional[float] = None,
+    max_gap_ms: Optional[float] = None,
+    offset: int = 0,
+    limit: int = 100,
+    sort: str = "time",
+    order: str = "asc",
+    window_start: Optional[str] = None,
+    window_end: Optional[str] = None,
+):
+    """
+    詳細テーブルの1ページ分の行を返すエンドポイント
+    
+    処理パラメータ（file_a_path 〜 max_gap_ms）は /api/process と同じで、同じ結合結果を再利用する。
+    window_start / window_end（'%Y-%m-%d %H:%M:%S', UTC）で時間窓を絞り込み、
+    sort / order で並べ替えた上で offset から limit 行を返す。
+    """
+    if not os.path.exists(file_a_path):
+        raise HTTPException(status_code=400, detail=f"ファイルAが見つかりません: {file_a_path}")
+    
+    if not os.path.exists(file_b_path):
+        raise HTTPException(status_code=400, detail=f"ファイルBが見つかりません: {file_b_path}")
+    
+    if offset < 0:
+        raise HTTPException(status_code=400, detail=f"offset には0以上の値を指定してください: {offset}")
+    if not 1 <= limit <= MAX_TABLE_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit には1〜{MAX_TABLE_PAGE_SIZE}の値を指定してください: {limit}")
+    if sort not in TABLE_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort には {', '.join(TABLE_SORT_KEYS)} のいずれかを指定してください: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"order には asc または desc を指定してください: {order}")
+    
+    options = merge_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms)
+    page_options = {
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "descending": order == "desc",
+        "window_start": window_start,
+        "window_end": window_end
+    }
+    
+    await wait_for_pending_parses(file_a_path, file_b_path)
+    
+    try:
+        return await scheduler.run(get_table_rows, file_a_path, file_b_path, start_time, end_time,
+                                   page_options, **options)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_overview_buckets(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                         window_start: Optional[str], window_end: Optional[str], width: int,
+                         **options) -> Dict[str, Any]:
+    """結合済みトラックの時間ピラミッドから、窓を width 個程度のバケットで表す集計を返す"""
+    merged = merge_gpx_files(file_a_path, file_b_path, start_time, end_time, **options)
+    return overview_buckets(merged["pyramid"], window_start, window_end, width)
+
+@app.get("/api/overview")
+async def get_overview(
+    file_a_path: str,
+    file_b_path: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    join_mode: str = JOIN_EXACT,
+    join_tolerance_ms: Optional[float] = None,
+    resample_step_ms: Optional[float] = None,
+    max_gap_ms: Optional[float] = None,
+    window_start: Optional[str] = None,
+    window_end: Optional[str] = None,
+    width: int = 1000,
+):
+    """
+    タイムスライダーやグラフの概観用に、時間窓の min / max / mean の集計を返すエンドポイント
+    
+    処理パラメータ（file_a_path 〜 max_gap_ms）は /api/process と同じで、同じ結合結果の
+    時間ピラミッドを使う。window_start / window_end（'%Y-%m-%d %H:%M:%S', UTC。省略時は全体）を
+    width 個以下のバケットで表せる最も細かいレベルを返すため、応答の大きさは飛行時間によらない。
+    """
+    if not os.path.exists(file_a_path):
+        raise HTTPException(status_code=400, detail=f"ファイルAが見つかりません: {file_a_path}")
+    
+    if not os.path.exists(file_b_path):
+        raise HTTPException(status_code=400, detail=f"ファイルBが見つかりません: {file_b_path}")
+    
+    if not 1 <= width <= MAX_OVERVIEW_WIDTH:
+        raise HTTPException(status_code=400, detail=f"width には1〜{MAX_OVERVIEW_WIDTH}の値を指定してください: {width}")
+    
+    options = merge_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms)
+    
+    await wait_for_pending_parses(file_a_path, file_b_path)
+    
+    try:
+        return await scheduler.run(get_overview_buckets, file_a_path, file_b_path, start_time, end_time,
+                                   window_start, window_end, width, **options)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_range_summary(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                      window_start: Optional[str], window_end: Optional[str], **options) -> Dict[str, Any]:
+    """結合済みトラックの区間サマリーのインデックスから、窓のサマリーを返す"""
+    merged = merge_gpx_files(file_a_path, file_b_path, start_time, end_time, **options)
+    return range_summary(merged["summary_index"], window_start, window_end, rows=merged["rows"])
+
+@app.get("/api/summary")
+async def get_summary(
+    file_a_path: str,
+    file_b_path: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    join_mode: str = JOIN_EXACT,
+    join_tolerance_ms: Optional[float] = None,
+    resample_step_ms: Optional[float] = None,
+    max_gap_ms: Optional[float] = None,
+    window_start: Optional[str] = None,
+    window_end: Optional[str] = None,
+):
+    """
+    時間窓のサマリー（高度差・3D距離の最大・最小・平均とその時刻）を返すエンドポイント
+    
+    処理パラメータ（file_a_path 〜 max_gap_ms）は /api/process と同じで、同じ結合結果の
+    区間サマリーのインデックスを使う。window_start / window_end（'%Y-%m-%d %H:%M:%S', UTC。
+    省略時は全体）を変えても結合し直さず、窓の長さによらない時間で応答する。
+    """
+    if not os.path.exists(file_a_path):
+        raise HTTPException(status_code=400, detail=f"ファイルAが見つかりません: {file_a_path}")
+    
+    if not os.path.exists(file_b_path):
+        raise HTTPException(status_code=400, detail=f"ファイルBが見つかりません: {file_b_path}")
+    
+    options = merge_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms)
+    
+    await wait_for_pending_parses(file_a_path, file_b_path)
+    
+    try:
+        return await scheduler.run(get_range_summary, file_a_path, file_b_path, start_time, end_time,
+                                   window_start, window_end, **options)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def run_process_job(file_a_path: str, file_b_path: str, start_time: Optional[str], end_time: Optional[str],
+                    progress=None, **options) -> Dict[str, Any]:
+    """ジョブとしてGPXファイルを処理し、結果をレスポンスキャッシュにも保存する"""
+    cache_key = get_process_cache_key(file_a_path, file_b_path, start_time, end_time, **options)
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        logger.info("処理結果のキャッシュを使用（ジョブ）")
+        return cached
+    
+    result = process_gpx_files(
+        file_a_path,
+        file_b_path,
+        start_time=start_time,
+        end_time=end_time,
+        progress=progress,
+        **options
+    )
+    result = encode_result(result, options["output_format"])
+    RESPONSE_CACHE.set(cache_key, result)
+    return result
+
+def get_job_or_404(job_id: str):
+    """ジョブを取得（存在しない・保持期間切れの場合は404）"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    file_a_path: str = Form(...),
+    file_b_path: str = Form(...),
+    start_time: Optional[str] = Form(None),
+    end_time: Optional[str] = Form(None),
+    join_mode: str = Form(JOIN_EXACT),
+    join_tolerance_ms: Optional[float] = Form(None),
+    resample_step_ms: Optional[float] = Form(None),
+    max_gap_ms: Optional[float] = Form(None),
+    output_format: str = Form(OUTPUT_NESTED, alias="format"),
+    views: Optional[str] = Form(None),
+    max_points: Optional[int] = Form(None),
+):
+    """処理ジョブを登録し、ジョブIDをすぐに返すエンドポイント"""
+    logger.info(f"ジョブ登録リクエスト受信: {start_time} - {end_time}")
+    
+    if not os.path.exists(file_a_path):
+        raise HTTPException(status_code=400, detail=f"ファイルAが見つかりません: {file_a_path}")
+    
+    if not os.path.exists(file_b_path):
+        raise HTTPException(status_code=400, detail=f"ファイルBが見つかりません: {file_b_path}")
+    
+    output_format = negotiate_output_format(request, output_format)
+    options = get_processing_options(join_mode, join_tolerance_ms, resample_step_ms, max_gap_ms, output_format, views,
+                                     max_points)
+    
+    try:
+        job = job_manager.submit(run_process_job, file_a_path, file_b_path, start_time, end_time, **options)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    
+    return {
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.job_id}",
+        "events_url": f"/api/jobs/{job.job_id}/events",
+        "result_url": f"/api/jobs/{job.job_id}/result"
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """ジョブの状態と進捗を返すエンドポイント（ポーリング用）"""
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """ジョブの進捗をServer-Sent Eventsで配信するエンドポイント"""
+    job = get_job_or_404(job_id)
+    return StreamingResponse(
+        job_manager.events(job),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx のバッファリングを無効化してイベントを即時に届ける
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """完了したジョブの処理結果を返すエンドポイント（未完了の場合は202で状態を返す）"""
+    job = get_job_or_404(job_id)
+    
+    if job.status == JOB_FAILED:
+        return JSONResponse(status_code=500, content={"detail": job.error, "job": job.to_dict()})
+    
+    if not job.finished:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    
+    return result_response(job.result)
+
 # キャッシュをクリアするエンドポイント（管理用）
 @app.post("/api/clear_cache")
 async def clear_cache():
     """キャッシュをクリアするエンドポイント"""
-    global RESPONSE_CACHE
-    cache_size = len(RESPONSE_CACHE)
-    RESPONSE_CACHE = {}
+    response_cleared = RESPONSE_CACHE.clear()
+    track_cleared = clear_track_cache()
+    merged_cleared = clear_merged_cache()
+    disk_cleared = clear_disk_cache()
     get_sample_data_cache_key.cache_clear() # lru_cache もクリア (コメント解除)
-    logger.info(f"RESPONSE_CACHE と lru_cache クリア完了 (クリア前: {cache_size} 件)")
-    return {"status": "success", "cleared_items": cache_size}
+    _file_digest_cached.cache_clear()
+    logger.info(f"RESPONSE_CACHE・トラックキャッシュ・ディスクキャッシュ・lru_cache クリア完了 "
+                f"(レスポンス: {response_cleared['items']} 件 / {response_cleared['bytes']} bytes, "
+                f"トラック: {track_cleared['items']} 件 / {track_cleared['bytes']} bytes, "
+                f"結合済み: {merged_cleared['items']} 件 / {merged_cleared['bytes']} bytes, "
+                f"ディスク: {disk_cleared} 件)")
+    return {
+        "status": "success",
+        "cleared_items": response_cleared["items"] + track_cleared["items"] + merged_cleared["items"] + disk_cleared,
+        "freed_bytes": response_cleared["bytes"] + track_cleared["bytes"] + merged_cleared["bytes"],
+        "response_cache": response_cleared,
+        "track_cache": track_cleared,
+        "merged_cache": merged_cleared,
+        "disk_cache": {"items": disk_cleared}
+    }
+
+@app.get("/api/cache_stats")
+async def cache_stats():
+    """キャッシュの統計情報（ヒット・ミス・削除回数、使用バイト数）を返すエンドポイント"""
+    return {
+        "response_cache": RESPONSE_CACHE.stats(),
+        "track_cache": track_cache_stats(),
+        "merged_cache": merged_cache_stats()
+    }
 
 def calculate_relative_data(track_a_data, track_b_data):
     """
@@ -0,0 +1,68 @@
+"""緯度・経度・標高を原点周りの局所 East-North-Up (ENU) 座標（メートル）に変換する"""
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+# 地球の半径（メートル）。距離計算のハーバーサイン公式と同じ球体モデルを使う
+EARTH_RADIUS = 6371000.0
+
+Bounds = Tuple[float, float, float, float]  # (minlat, minlon, maxlat, maxlon)
+
+
+def track_bounds(lat: np.ndarray, lon: np.ndarray) -> Optional[Bounds]:
+    """トラックの緯度・経度の範囲（ポイントがない場合は None）"""
+    if len(lat) == 0:
+        return None
+    return float(np.min(lat)), float(np.min(lon)), float(np.max(lat)), float(np.max(lon))
+
+
+def bounds_center(bounds_list: Iterable[Optional[Bounds]]) -> Optional[Tuple[float, float]]:
+    """複数の範囲を合わせた範囲の中心 (lat, lon)。有効な範囲がない場合は None"""
+    bounds_list = [b for b in bounds_list if b is not None]
+    if not bounds_list:
+        return None
+    minlat = min(b[0] for b in bounds_list)
+    minlon = min(b[1] for b in bounds_list)
+    maxlat = max(b[2] for b in bounds_list)
+    maxlon = max(b[3] for b in bounds_list)
+    return (minlat + maxlat) / 2, (minlon + maxlon) / 2
+
+
+def geodetic_to_enu(lat, lon, ele, origin_lat: float, origin_lon: float):
+    """
+    緯度・経度・標高を原点（標高0）に接する平面の ENU 座標に変換する
+
+    球体上の地心直交座標を経由して回転するだけなので、変換後は
+    距離や速度をユークリッド距離として計算できる。
+
+    Parameters:
+    -----------
+    lat, lon, ele : numpy.ndarray
+        緯度・経度（度）と標高（メートル）
+    origin_lat, origin_lon : float
+        原点の緯度・経度（度）
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (east, north, up)（メートル）。up は原点の接平面からの高さで、
+        原点から離れるほど地球の曲率の分だけ標高より小さくなる
+    """
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    radius = EARTH_RADIUS + np.asarray(ele, dtype=np.float64)
+
+    lat0 = np.radians(origin_lat)
+    lon0 = np.radians(origin_lon)
+
+    # 経度差で回転してから地心直交座標の差を取り、桁落ちを避ける
+    dlon = lon_rad - lon0
+    cos_lat = np.cos(lat_rad)
+    x = radius * cos_lat * np.cos(dlon) - EARTH_RADIUS * np.cos(lat0)
+    y = radius * cos_lat * np.sin(dlon)
+    z = radius * np.sin(lat_rad) - EARTH_RADIUS * np.sin(lat0)
+
+    east = y
+    north = -np.sin(lat0) * x + np.cos(lat0) * z
+    up = np.cos(lat0) * x + np.sin(lat0) * z
+    return east, north, up
@@ -0,0 +1,167 @@
+"""
+時刻を2のべき乗の幅のバケットに区切った min / max / mean の多重解像度集計（時間ピラミッド）
+
+レベル0はエポックから BASE_BUCKET_MS の整数倍に揃えたバケットで、レベルが1つ上がるごとに
+隣り合う2つのバケットを統合する（バケット幅は 2 倍）。作成はデータ長に比例する計算量で1回だけ行い、
+query_pyramid は窓の長さによらず、要求した幅（ピクセル数）程度のバケットだけを返す。
+
+ピラミッドはキャッシュの使用量を推定できるよう、NumPy配列の辞書のリストで表す。
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+NS_PER_MS = 1_000_000
+
+# レベル0のバケット幅（ミリ秒）
+BASE_BUCKET_MS = 1000
+
+Pyramid = List[Dict[str, np.ndarray]]
+
+
+def _aggregate(starts: np.ndarray, values: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Dict[str, np.ndarray]]:
+    """starts で区切った連続区間ごとに min / max / sum / count を集計する"""
+    return {
+        column: {
+            "min": np.minimum.reduceat(stats["min"], starts),
+            "max": np.maximum.reduceat(stats["max"], starts),
+            "sum": np.add.reduceat(stats["sum"], starts),
+            "count": np.add.reduceat(stats["count"], starts),
+        }
+        for column, stats in values.items()
+    }
+
+
+def _level(bucket_ids: np.ndarray, bucket_ns: int, counts: np.ndarray,
+           stats: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    level = {"bucket_ns": np.int64(bucket_ns), "bucket_id": bucket_ids, "count": counts}
+    for column, column_stats in stats.items():
+        for name, values in column_stats.items():
+            level[f"{column}:{name}"] = values
+    return level
+
+
+def build_pyramid(time_ns: np.ndarray, columns: Dict[str, np.ndarray],
+                  base_bucket_ms: int = BASE_BUCKET_MS) -> Pyramid:
+    """
+    時刻順の列配列から時間ピラミッドを作成する
+
+    Parameters:
+    -----------
+    time_ns : numpy.ndarray
+        UTCエポックナノ秒 (int64)。昇順であること
+    columns : dict
+        集計する列名 -> 値の配列。NaN は集計から除外する
+    base_bucket_ms : int
+        レベル0のバケット幅（ミリ秒）
+
+    Returns:
+    --------
+    list of dict
+        レベル0から順に、バケット番号 'bucket_id'（時刻 // バケット幅）、'bucket_ns'、
+        バケット内の点数 'count' と各列の '<列名>:min' / ':max' / ':sum' / ':count' の配列。
+        最上位のレベルのバケットは1つ
+    """
+    time_ns = np.asarray(time_ns, dtype=np.int64)
+    if len(time_ns) == 0:
+        return []
+
+    stats = {}
+    for column, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        stats[column] = {
+            "min": np.where(valid, values, np.inf),
+            "max": np.where(valid, values, -np.inf),
+            "sum": np.where(valid, values, 0.0),
+            "count": valid.astype(np.int64),
+        }
+
+    bucket_ns = int(base_bucket_ms) * NS_PER_MS
+    bucket_ids = time_ns // bucket_ns
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    counts = np.diff(np.append(starts, len(time_ns)))
+    stats = _aggregate(starts, stats)
+    bucket_ids = bucket_ids[starts]
+    levels = [_level(bucket_ids, bucket_ns, counts, stats)]
+
+    while len(bucket_ids) > 1:
+        bucket_ns *= 2
+        parent_ids = bucket_ids // 2
+        starts = np.flatnonzero(np.r_[True, parent_ids[1:] != parent_ids[:-1]])
+        counts = np.add.reduceat(counts, starts)
+        stats = _aggregate(starts, stats)
+        bucket_ids = parent_ids[starts]
+        levels.append(_level(bucket_ids, bucket_ns, counts, stats))
+    return levels
+
+
+def pyramid_columns(pyramid: Pyramid) -> List[str]:
+    """ピラミッドで集計している列名"""
+    if not pyramid:
+        return []
+    return [key[:-len(":min")] for key in pyramid[0] if key.endswith(":min")]
+
+
+def choose_level(pyramid: Pyramid, start_ns: int, end_ns: int, width: int) -> int:
+    """窓 [start_ns, end_ns] のバケット数が width 以下になる最も細かいレベル"""
+    base_ns = int(pyramid[0]["bucket_ns"])
+    needed = max(1, end_ns - start_ns + 1) / max(1, width)
+    level = max(0, math.ceil(math.log2(needed / base_ns))) if needed > base_ns else 0
+    # バケット境界の端数で1つ多くなる分を確かめて調整する
+    while level < len(pyramid) - 1:
+        bucket_ns = int(pyramid[level]["bucket_ns"])
+        if end_ns // bucket_ns - start_ns // bucket_ns + 1 <= width:
+            break
+        level += 1
+    return min(level, len(pyramid) - 1)
+
+
+def query_pyramid(pyramid: Pyramid, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                  width: int = 1000) -> Dict[str, Any]:
+    """
+    窓 [start_ns, end_ns] を width 個程度のバケットで表す集計を返す
+
+    Returns:
+    --------
+    dict
+        'level', 'bucket_ms', 各バケットの開始時刻 'time'（エポックミリ秒）と点数 'count'、
+        列ごとの {'min', 'max', 'mean'}（値がないバケットは None）
+    """
+    if not pyramid:
+        return {"level": None, "bucket_ms": None, "time": [], "count": [], "columns": {}}
+
+    if start_ns is None:
+        start_ns = int(pyramid[0]["bucket_id"][0] * pyramid[0]["bucket_ns"])
+    if end_ns is None:
+        end_ns = int((pyramid[0]["bucket_id"][-1] + 1) * pyramid[0]["bucket_ns"]) - 1
+    if end_ns < start_ns:
+        raise ValueError("窓の終了時刻が開始時刻より前です")
+
+    level_index = choose_level(pyramid, start_ns, end_ns, width)
+    level = pyramid[level_index]
+    bucket_ns = int(level["bucket_ns"])
+    ids = level["bucket_id"]
+    lo = int(np.searchsorted(ids, start_ns // bucket_ns, side="left"))
+    hi = int(np.searchsorted(ids, end_ns // bucket_ns, side="right"))
+
+    columns = {}
+    for column in pyramid_columns(pyramid):
+        count = level[f"{column}:count"][lo:hi]
+        present = (count > 0).tolist()
+        mean = level[f"{column}:sum"][lo:hi] / np.maximum(count, 1)
+        columns[column] = {
+            name: [value if has_value else None for value, has_value in zip(values.tolist(), present)]
+            for name, values in (("min", level[f"{column}:min"][lo:hi]),
+                                 ("max", level[f"{column}:max"][lo:hi]),
+                                 ("mean", mean))
+        }
+
+    return {
+        "level": level_index,
+        "bucket_ms": bucket_ns // NS_PER_MS,
+        "time": (ids[lo:hi] * bucket_ns // NS_PER_MS).tolist(),
+        "count": level["count"][lo:hi].tolist(),
+        "columns": columns,
+    }
@@ -0,0 +1,130 @@
+"""
+時刻順の列配列に対する区間集計のインデックス（累積和とスパーステーブル）
+
+作成は O(n log n) で1回だけ行い、任意の区間 [lo, hi) の平均・最小・最大と
+その位置を区間の長さによらず O(1) で求める。
+
+- 平均: 値と有効な点数の累積和の差
+- 最小・最大: スパーステーブル（長さ 2^k の区間ごとの最小・最大の位置）。
+  区間を重なりのある2つの 2^k 区間で覆い、どちらかの位置を選ぶ
+
+インデックスはキャッシュの使用量を推定できるよう、NumPy配列の辞書で表す。
+"""
+from typing import Any, Dict, Iterable, List, Mapping
+
+import numpy as np
+
+RangeIndex = Dict[str, Any]
+
+# スパーステーブルで扱う集計（'min' / 'max'）
+EXTREMA = ("min", "max")
+
+
+def _sparse_table(values: np.ndarray, op: str) -> List[np.ndarray]:
+    """
+    values の長さ 2^k の区間ごとに最小（op='min'）または最大の位置を持つ表
+
+    table[k][i] は values[i:i + 2^k] の最小・最大の位置。同じ値の場合は前の位置
+    """
+    better = np.less if op == "min" else np.greater
+    positions = np.arange(len(values), dtype=np.int32)
+    table = [positions]
+    span = 1
+    while span * 2 <= len(values):
+        previous = table[-1]
+        left = previous[:len(previous) - span]
+        right = previous[span:]
+        table.append(np.where(better(values[right], values[left]), right, left))
+        span *= 2
+    return table
+
+
+def build_range_index(columns: Mapping[str, np.ndarray], extrema: Mapping[str, Iterable[str]] = None) -> RangeIndex:
+    """
+    列配列から区間集計のインデックスを作成する
+
+    Parameters:
+    -----------
+    columns : dict
+        列名 -> 値の配列（すべて同じ長さ）。NaN は集計から除外する
+    extrema : dict, optional
+        列名 -> スパーステーブルを作る集計（EXTREMA の部分集合）。
+        省略時はすべての列で最小・最大の両方を作る
+
+    Returns:
+    --------
+    dict
+        'length' と、列ごとの 'values', 'prefix_sum', 'prefix_count' と
+        '<集計>_table'（スパーステーブル）の辞書 'columns'
+    """
+    if extrema is None:
+        extrema = {column: EXTREMA for column in columns}
+
+    length = None
+    indexed = {}
+    for column, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        if length is None:
+            length = len(values)
+        elif len(values) != length:
+            raise ValueError(f"列 {column} の長さ {len(values)} が {length} と一致しません")
+        valid = ~np.isnan(values)
+        entry = {
+            "values": values,
+            "prefix_sum": np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0)))),
+            "prefix_count": np.concatenate(([0], np.cumsum(valid, dtype=np.int64))),
+        }
+        for op in extrema.get(column, ()):
+            if op not in EXTREMA:
+                raise ValueError(f"未対応の集計です: {op}")
+            # NaN は最小・最大として選ばれない値に置き換える
+            fill = np.inf if op == "min" else -np.inf
+            entry[f"{op}_table"] = _sparse_table(np.where(valid, values, fill), op)
+        indexed[column] = entry
+    return {"length": length or 0, "columns": indexed}
+
+
+def _extreme_position(entry: Dict[str, Any], op: str, lo: int, hi: int) -> int:
+    table = entry[f"{op}_table"]
+    level = (hi - lo).bit_length() - 1
+    left = int(table[level][lo])
+    right = int(table[level][hi - (1 << level)])
+    left_value, right_value = entry["values"][left], entry["values"][right]
+    if np.isnan(left_value) or np.isnan(right_value):
+        return left if np.isnan(right_value) else right
+    better = right_value < left_value if op == "min" else right_value > left_value
+    return right if better else left
+
+
+def query_range(index: RangeIndex, lo: int, hi: int) -> Dict[str, Dict[str, Any]]:
+    """
+    区間 [lo, hi) の列ごとの集計を返す
+
+    Returns:
+    --------
+    dict
+        列名 -> {'count'（有効な点数）, 'mean'} と、スパーステーブルを作った集計の
+        値 'min' / 'max' と位置 'argmin' / 'argmax'。有効な値がない場合の値・位置は None
+
+    Raises:
+    -------
+    ValueError
+        区間が空、またはインデックスの範囲外の場合
+    """
+    lo, hi = int(lo), int(hi)
+    if not 0 <= lo < hi <= index["length"]:
+        raise ValueError(f"区間 [{lo}, {hi}) が範囲外か空です（点数 {index['length']}）")
+
+    result = {}
+    for column, entry in index["columns"].items():
+        count = int(entry["prefix_count"][hi] - entry["prefix_count"][lo])
+        total = float(entry["prefix_sum"][hi] - entry["prefix_sum"][lo])
+        stats = {"count": count, "mean": total / count if count else None}
+        for op in EXTREMA:
+            if f"{op}_table" not in entry:
+                continue
+            position = _extreme_position(entry, op, lo, hi) if count else None
+            stats[op] = float(entry["values"][position]) if position is not None else None
+            stats[f"arg{op}"] = position
+        result[column] = stats
+    return result
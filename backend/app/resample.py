@@ -0,0 +1,87 @@
+"""トラックを共通の等間隔時刻グリッドに再サンプリングする"""
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.time_index import TrackTimeIndex
+
+logger = logging.getLogger(__name__)
+
+NS_PER_MS = 1_000_000
+
+# 前後の点の時刻差がこれを超える区間は補間せずギャップとして扱う（ミリ秒）
+DEFAULT_MAX_GAP_MS = 10_000
+
+# グリッドの点数の上限（細かすぎるステップによるメモリ消費を防ぐ）
+MAX_GRID_POINTS = 2_000_000
+
+
+def make_grid(start_ns: int, end_ns: int, step_ms: float) -> np.ndarray:
+    """
+    start_ns 以上 end_ns 以下の等間隔の時刻グリッドを作成する
+
+    グリッドはエポックからステップの整数倍の時刻に揃えるため、
+    同じステップで作成した別トラックのグリッドと時刻が一致する。
+
+    Raises:
+    -------
+    ValueError
+        ステップが0以下、またはグリッドの点数が MAX_GRID_POINTS を超える場合
+    """
+    step_ns = int(round(step_ms * NS_PER_MS))
+    if step_ns <= 0:
+        raise ValueError(f"再サンプリングのステップには正の値を指定してください: {step_ms}")
+
+    first = -(-start_ns // step_ns)  # 切り上げ
+    last = end_ns // step_ns
+    count = max(0, last - first + 1)
+    if count > MAX_GRID_POINTS:
+        raise ValueError(f"再サンプリングのステップが細かすぎます: {step_ms}ms ({count} 点)")
+    return (np.arange(count, dtype=np.int64) + first) * step_ns
+
+
+def resample_track(track: Dict[str, np.ndarray], step_ms: float,
+                   max_gap_ms: Optional[float] = DEFAULT_MAX_GAP_MS) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    トラックの列配列を等間隔の時刻グリッド上に線形補間する
+
+    Parameters:
+    -----------
+    track : dict
+        'time_utc' (UTCエポックナノ秒, int64) と数値列の配列の辞書
+    step_ms : float
+        グリッドの間隔（ミリ秒）。大きくするほど出力点数が減る
+    max_gap_ms : float, optional
+        前後の点の時刻差がこれを超える区間はギャップとして補間しない。None の場合は無制限
+
+    Returns:
+    --------
+    tuple
+        (resampled, gap)。resampled はグリッドの時刻 'time_utc' と補間した各列の配列、
+        gap はギャップに当たるグリッド点を示す真偽値配列（該当する値は NaN）
+    """
+    times = track['time_utc']
+    if len(times) == 0:
+        empty = {column: np.empty(0, dtype=values.dtype) for column, values in track.items()}
+        return empty, np.zeros(0, dtype=bool)
+
+    index = TrackTimeIndex(times)
+    grid = make_grid(index.start, index.end, step_ms)
+    left, right, ratio, span = index.bracket(grid)
+
+    gap = (grid < index.start) | (grid > index.end)
+    if max_gap_ms is not None:
+        gap |= span > max_gap_ms * NS_PER_MS
+
+    resampled = {'time_utc': grid}
+    for column, values in track.items():
+        if column == 'time_utc':
+            continue
+        values = np.asarray(values, dtype=np.float64)
+        interpolated = values[left] + (values[right] - values[left]) * ratio
+        interpolated[gap] = np.nan
+        resampled[column] = interpolated
+
+    logger.debug(f"再サンプリング: {len(times)} 点 -> {len(grid)} 点 (ステップ {step_ms}ms, ギャップ {int(gap.sum())} 点)")
+    return resampled, gap
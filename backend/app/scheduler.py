@@ -0,0 +1,104 @@
+"""CPU負荷の高い処理をイベントループ外で実行する、同時実行数と待ち行列を制限したスケジューラ"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """待ち行列が満杯で新しい処理を受け付けられない"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"処理待ちのリクエストが多すぎます。{retry_after}秒後に再試行してください。")
+        self.retry_after = retry_after
+
+
+class ProcessingScheduler:
+    """
+    同期処理をスレッドプールで実行するスケジューラ
+
+    同時に実行する処理は max_workers 件まで、実行待ちは max_queue 件までとし、
+    それを超えたリクエストは QueueFullError で即座に拒否する。
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gpx-worker")
+        self._lock = threading.Lock()
+        self._submitted = 0  # 実行中 + 待機中
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _run_tracked(self, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        func をワーカースレッドに投入し、concurrent.futures.Future を返す
+
+        Raises:
+        ------
+        QueueFullError
+            実行中・待機中の処理が上限に達している場合
+        """
+        with self._lock:
+            if self._submitted >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                logger.warning(f"処理待ちが上限に達したためリクエストを拒否 "
+                               f"(実行中: {self._running}, 待機中: {self._submitted - self._running})")
+                raise QueueFullError(self.retry_after)
+            self._submitted += 1
+
+        # 呼び出し側がキャンセルされても、実際の処理が終わるまで件数に含める
+        future = self._executor.submit(self._run_tracked, func, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        func をワーカースレッドで実行し、完了を待って結果を返す
+
+        Raises:
+        ------
+        QueueFullError
+            実行中・待機中の処理が上限に達している場合
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def _on_done(self, future) -> None:
+        with self._lock:
+            self._submitted -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """実行中・待機中の件数などの統計情報"""
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._submitted - self._running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+# アプリケーション全体で共有するスケジューラ（環境変数で設定可能）
+scheduler = ProcessingScheduler(
+    max_workers=int(os.environ.get("GPX_MAX_CONCURRENT_JOBS", "2")),
+    max_queue=int(os.environ.get("GPX_MAX_QUEUED_JOBS", "8")),
+    retry_after=int(os.environ.get("GPX_RETRY_AFTER", "5")),
+)
@@ -0,0 +1,77 @@
+"""表示用に点数を減らす形状保持の間引き (Largest-Triangle-Three-Buckets)"""
+from typing import Iterable
+
+import numpy as np
+
+# 間引き後の点数の下限（先頭・末尾と必ず残す点を含められるようにする）
+MIN_OUTPUT_POINTS = 10
+
+
+def lttb_indices(points: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    時刻順に並んだ点列から形を保つ n_out 点を選ぶ
+
+    先頭と末尾の点は必ず残し、残りを n_out - 2 個の連続したバケットに分けて
+    各バケットから1点ずつ選ぶ。選ぶ点は前後のバケットの平均点と作る三角形の
+    面積が最大の点（多次元の点でも面積で比較する）。通常の LTTB は前のバケットで
+    選んだ点を使うが、ここでは前のバケットの平均点を使うことで全バケットを
+    まとめて配列演算で処理する。
+
+    Parameters:
+    -----------
+    points : numpy.ndarray
+        (n,) または (n, k) の座標。NaN を含む点は選ばれにくくなる
+    n_out : int
+        選ぶ点数（3以上）。n 以上の場合はすべての点を返す
+
+    Returns:
+    --------
+    numpy.ndarray
+        選んだ点の位置（昇順）
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim == 1:
+        points = points[:, None]
+    n = len(points)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError(f"間引き後の点数は3以上を指定してください: {n_out}")
+
+    # 先頭・末尾を除く点をバケットに分ける（バケットの大きさの差は1以内）
+    n_buckets = n_out - 2
+    interior = points[1:-1]
+    bucket = (np.arange(n - 2) * n_buckets) // (n - 2)
+    starts = np.searchsorted(bucket, np.arange(n_buckets))
+    counts = np.diff(np.append(starts, n - 2))
+    means = np.add.reduceat(np.nan_to_num(interior), starts, axis=0) / counts[:, None]
+
+    # 各バケットの前後の基準点（端のバケットは先頭・末尾の点）
+    left = np.vstack([points[:1], means[:-1]])[bucket]
+    right = np.vstack([means[1:], points[-1:]])[bucket]
+
+    # 三角形の面積の2乗（の4倍）: |u|^2 |v|^2 - (u・v)^2
+    u = interior - left
+    v = right - left
+    area = np.einsum('ij,ij->i', u, u) * np.einsum('ij,ij->i', v, v) - np.einsum('ij,ij->i', u, v) ** 2
+    area = np.where(np.isnan(area), -np.inf, area)
+
+    # バケットごとに面積が最大の点（同じバケット内は面積の降順）
+    order = np.lexsort((-area, bucket))
+    chosen = order[starts] + 1
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def simplify_indices(points: np.ndarray, n_out: int, keep: Iterable[int] = ()) -> np.ndarray:
+    """
+    lttb_indices で n_out 点程度を選び、keep の位置の点も必ず含める
+
+    keep の点の分だけ LTTB で選ぶ点を減らすため、返す点数は n_out 以下
+    （keep が多すぎる場合を除く）になる。
+    """
+    n = len(points)
+    keep = np.unique(np.asarray(list(keep), dtype=np.int64))
+    if n_out >= n:
+        return np.arange(n)
+    selected = lttb_indices(points, max(3, n_out - len(keep)))
+    return np.union1d(selected, keep)
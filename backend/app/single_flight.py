@@ -0,0 +1,64 @@
+"""同じキーの処理が同時に要求された場合に、1回だけ実行して結果を共有する (single-flight)"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    キーごとに実行中の処理を1つに束ねる（イベントループ上で使う）
+
+    最初のリクエストが処理を開始し、完了前に同じキーで来たリクエストは
+    新しく処理を始めずに同じタスクの完了を待って、同じ結果（例外も含む）を受け取る。
+    完了したキーは取り除くため、結果の保持はキャッシュ側で行う。
+    待っているリクエストが切断されても、処理は他のリクエストのために続行する。
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        key の処理が実行中であればその結果を待ち、なければ func() を実行する
+
+        Parameters:
+        -----------
+        key : hashable
+            同じ結果になるリクエストを識別するキー
+        func : callable
+            引数なしで呼び出すコルーチン関数
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+
+            def _on_done(done: asyncio.Future) -> None:
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+                # 待っていたリクエストがすべて切断された場合に未取得の例外として警告されないようにする
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(_on_done)
+        else:
+            self.coalesced += 1
+            logger.info(f"{self.name}: 実行中の同じ処理の結果を待機")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """実行中のキー数、開始した処理の回数、実行中の処理に束ねたリクエスト数"""
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
@@ -1 +1,32 @@
-"""GPX 3D Visualization用のテストスイート""" 
\ No newline at end of file
+"""GPX 3D Visualization用のテストスイート"""
+import os
+import tempfile
+from unittest import mock
+
+from app import gpx_processor
+from app.track_store import TrackStore
+
+
+def use_temporary_track_store(test_case):
+    """
+    テストの間だけ gpx_processor のディスクキャッシュを一時ディレクトリに向ける
+
+    プロセスプールのワーカーには環境変数 GPX_CACHE_DIR で伝え、テスト中に作成したプールは
+    終了時に停止する。一時ディレクトリはテストの終了時に削除する。
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp_dir.cleanup)
+    store = TrackStore(tmp_dir.name)
+    for patch in (mock.patch.object(gpx_processor, '_track_store', store),
+                  mock.patch.dict(os.environ, {'GPX_CACHE_DIR': tmp_dir.name})):
+        patch.start()
+        test_case.addCleanup(patch.stop)
+    test_case.addCleanup(_shutdown_new_process_pool, gpx_processor._process_pool)
+    return store
+
+
+def _shutdown_new_process_pool(previous):
+    pool = gpx_processor._process_pool
+    if pool is not None and pool is not previous:
+        pool.shutdown()
+        gpx_processor._process_pool = None
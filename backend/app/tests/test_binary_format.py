@@ -0,0 +1,73 @@
+"""列形式のバイナリエンコードのテスト"""
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.binary_format import encode_columns, decode_columns, FORMAT_VERSION
+from app.gpx_processor import process_gpx_files
+from app.tests import use_temporary_track_store
+
+class TestBinaryFormat(unittest.TestCase):
+    def test_round_trip(self):
+        """ヘッダーの項目と各列の値・型を復元できる"""
+        result = {
+            "format": "binary",
+            "summary": {"max_distance_3d": 12.5},
+            "columns": {
+                "timestamp": np.array([1.7e12, 1.7e12 + 1000]),
+                "lat_a": np.array([35.123456789, 35.2]),
+                "ele_a": np.array([100.25, np.nan]),
+                "index": np.array([3, 4], dtype=np.int64),
+            },
+        }
+        data = encode_columns(result)
+        decoded = decode_columns(data)
+
+        self.assertEqual(decoded["count"], 2)
+        self.assertEqual(decoded["summary"], result["summary"])
+        self.assertEqual(list(decoded["columns"]), list(result["columns"]))
+        np.testing.assert_array_equal(decoded["columns"]["timestamp"], result["columns"]["timestamp"])
+        np.testing.assert_array_equal(decoded["columns"]["lat_a"], result["columns"]["lat_a"])
+        self.assertEqual(decoded["columns"]["ele_a"].dtype, np.float32)
+        np.testing.assert_array_equal(decoded["columns"]["ele_a"], np.array([100.25, np.nan], dtype=np.float32))
+        np.testing.assert_array_equal(decoded["columns"]["index"], [3, 4])
+
+    def test_columns_are_aligned(self):
+        """各列はバッファ先頭から8バイト境界に配置される"""
+        columns = {f"c{i}": np.arange(3, dtype=np.float64) for i in range(5)}
+        data = encode_columns({"columns": columns})
+        base = np.frombuffer(data, np.uint8).ctypes.data
+        self.assertEqual(len(data) % 8, 0)
+        for values in decode_columns(data)["columns"].values():
+            self.assertEqual((values.ctypes.data - base) % 8, 0)
+
+    def test_rejects_invalid_data(self):
+        """マジックナンバー・バージョンの不一致や途中で切れたデータは ValueError"""
+        data = encode_columns({"columns": {"ele_a": np.arange(10.0)}})
+        with self.assertRaises(ValueError):
+            decode_columns(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            decode_columns(data[:4] + (FORMAT_VERSION + 1).to_bytes(4, "little") + data[8:])
+        with self.assertRaises(ValueError):
+            decode_columns(data[:-8])
+
+    def test_matches_columnar_result(self):
+        """処理結果のバイナリは列形式の値を float32 の精度で保持する"""
+        use_temporary_track_store(self)
+        samples_dir = Path(__file__).parent.parent / 'samples'
+        file_a = str(samples_dir / 'flight1_6.gpx')
+        file_b = str(samples_dir / 'flight1_17.gpx')
+        columnar = process_gpx_files(file_a, file_b, output_format='columnar')
+        decoded = decode_columns(encode_columns(process_gpx_files(file_a, file_b, output_format='binary')))
+
+        self.assertEqual(decoded["count"], columnar["count"])
+        self.assertEqual(decoded["summary"], columnar["summary"])
+        self.assertEqual(list(decoded["columns"]), list(columnar["columns"]))
+        np.testing.assert_array_equal(decoded["columns"]["timestamp"], columnar["columns"]["timestamp"])
+        np.testing.assert_array_equal(decoded["columns"]["lat_a"], columnar["columns"]["lat_a"])
+        np.testing.assert_allclose(decoded["columns"]["ele_b"], columnar["columns"]["ele_b"], rtol=1e-6)
+        np.testing.assert_allclose(decoded["columns"]["distance_3d"], columnar["columns"]["distance_3d"], rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
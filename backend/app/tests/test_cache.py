@@ -0,0 +1,115 @@
+"""バイト数上限付きLRUキャッシュのテスト"""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.cache import ByteLRUCache, RangeCache, estimate_size, range_contains
+
+class TestByteLRUCache(unittest.TestCase):
+    def test_get_and_set(self):
+        """保存・取得とヒット/ミスのカウント"""
+        cache = ByteLRUCache(max_bytes=1000)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 'value', size=10)
+        self.assertEqual(cache.get('a'), 'value')
+        self.assertIn('a', cache)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['bytes'], 10)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        """上限バイト数を超えると最も古く使われたエントリから削除される"""
+        cache = ByteLRUCache(max_bytes=100)
+        cache.set('a', 1, size=40)
+        cache.set('b', 2, size=40)
+        cache.get('a')  # a を最新にする
+        cache.set('c', 3, size=40)
+
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.current_bytes, 80)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_rejects_oversized_entry(self):
+        """上限を超える単一エントリは保存しない"""
+        cache = ByteLRUCache(max_bytes=100)
+        self.assertFalse(cache.set('big', 'x', size=101))
+        self.assertEqual(len(cache), 0)
+
+    def test_replace_updates_size(self):
+        """同じキーへの再保存でバイト数が二重に数えられない"""
+        cache = ByteLRUCache(max_bytes=100)
+        cache.set('a', 1, size=30)
+        cache.set('a', 2, size=50)
+        self.assertEqual(cache.current_bytes, 50)
+        self.assertEqual(cache.get('a'), 2)
+
+    def test_ttl(self):
+        """TTLを過ぎたエントリは取得時に破棄される"""
+        cache = ByteLRUCache(max_bytes=100, ttl=10)
+        with mock.patch('app.cache.time.monotonic', return_value=1000.0):
+            cache.set('a', 1, size=10)
+        with mock.patch('app.cache.time.monotonic', return_value=1005.0):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('app.cache.time.monotonic', return_value=1011.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.current_bytes, 0)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_clear_reports_freed_bytes(self):
+        """クリア時に削除した件数とバイト数を返す"""
+        cache = ByteLRUCache(max_bytes=100)
+        cache.set('a', 1, size=10)
+        cache.set('b', 2, size=20)
+        self.assertEqual(cache.clear(), {"items": 2, "bytes": 30})
+        self.assertEqual(cache.current_bytes, 0)
+
+    def test_estimate_size(self):
+        """NumPy配列はnbytes、入れ子の辞書は要素を合算して推定する"""
+        values = np.zeros(1000, dtype=np.float64)
+        self.assertEqual(estimate_size(values), 8000)
+        self.assertGreater(estimate_size({'lat': values, 'points': [{'a': 1.0}] * 10}), 8000)
+
+class TestRangeCache(unittest.TestCase):
+    @staticmethod
+    def slicer(value, time_range):
+        return [v for v in value if time_range[0] <= v <= time_range[1]]
+
+    def test_slices_from_smallest_containing_range(self):
+        """範囲が一致しなければ、同じグループで要求範囲を含む最も狭い範囲から切り出す"""
+        cache = RangeCache(max_bytes=10 ** 6)
+        cache.set('pair', None, list(range(100)))
+        cache.set('pair', (10, 50), list(range(10, 51)))
+        cache.set('other', (0, 100), ['x'])
+
+        self.assertEqual(cache.get('pair', (20, 30), self.slicer), list(range(20, 31)))
+        self.assertEqual(cache.get('pair', (20, 30)), list(range(20, 31)))  # 切り出した結果も保存する
+        self.assertEqual(cache.get('pair', (40, 60), self.slicer), list(range(40, 61)))
+        self.assertIsNone(cache.get('pair', (20, 25)))  # slicer がなければ完全一致のみ
+        self.assertIsNone(cache.get('other', (50, 150), self.slicer))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['slices'], stats['misses']), (1, 2, 2))
+
+    def test_evicted_ranges_are_not_used(self):
+        """LRUで削除された範囲からは切り出さない"""
+        cache = RangeCache(max_bytes=100)
+        cache.set('pair', (0, 100), 'full')
+        for i in range(3):
+            cache._cache.set(('filler', i), i, size=40)
+        self.assertIsNone(cache.get('pair', (10, 20), self.slicer))
+        self.assertEqual(cache.clear()['items'], 2)
+
+    def test_range_contains(self):
+        """None は全範囲を表す"""
+        self.assertTrue(range_contains(None, (1, 2)))
+        self.assertTrue(range_contains((1, 5), (1, 5)))
+        self.assertFalse(range_contains((1, 5), None))
+        self.assertFalse(range_contains((1, 5), (0, 3)))
+
+if __name__ == '__main__':
+    unittest.main()
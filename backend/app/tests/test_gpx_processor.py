@@ -0,0 +1,338 @@
+"""GPX処理パイプラインのテスト"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app import gpx_processor
+from app.gpx_processor import (
+    compute_track, process_gpx_files, TRACK_RESULT_COLUMNS,
+    fix_datetime_sequence_robust, fix_datetime_for_file, NS_PER_DAY, NS_PER_SECOND,
+    compute_step_metrics, haversine_distance, calculate_3d_distance,
+    compute_track_metrics, slice_time_range, compute_separation,
+    merge_gpx_files, table_page, format_for_table, create_summary, range_summary, overview_buckets,
+    clear_merged_cache, merged_cache_stats,
+)
+from app.projection import geodetic_to_enu
+from app.tests import use_temporary_track_store
+
+class TestGpxProcessor(unittest.TestCase):
+    def setUp(self):
+        use_temporary_track_store(self)
+        samples_dir = Path(__file__).parent.parent / 'samples'
+        self.file_a = str(samples_dir / 'flight1_6.gpx')
+        self.file_b = str(samples_dir / 'flight1_17.gpx')
+        self.start_time = '2025-04-04 23:55:00'
+        self.end_time = '2025-04-05 00:00:00'
+
+    def test_compute_track_returns_arrays(self):
+        """トラック処理の結果はNumPy配列の辞書で返る"""
+        track = compute_track(self.file_a, self.start_time, self.end_time)
+        self.assertEqual(list(track), TRACK_RESULT_COLUMNS)
+        for values in track.values():
+            self.assertIsInstance(values, np.ndarray)
+        self.assertEqual(track['time_utc'].dtype, np.int64)
+        self.assertTrue(np.all(np.diff(track['time_utc']) >= 0))
+
+    def test_range_is_slice_of_full_track_metrics(self):
+        """時間範囲の結果はトラック全体のメトリクスをそのまま切り出したものになる"""
+        full = compute_track_metrics(self.file_a)
+        ranged = compute_track(self.file_a, self.start_time, self.end_time)
+
+        times = full['time_utc']
+        start_ns = np.datetime64('2025-04-04T23:55:00', 'ns').astype(np.int64)
+        end_ns = np.datetime64('2025-04-05T00:00:00', 'ns').astype(np.int64)
+        mask = (times >= start_ns) & (times <= end_ns)
+        self.assertGreater(mask.sum(), 0)
+        for column in TRACK_RESULT_COLUMNS:
+            np.testing.assert_array_equal(ranged[column], full[column][mask])
+
+        # 2回目以降はキャッシュ済みの同じ配列を使う
+        self.assertIs(compute_track_metrics(self.file_a), full)
+
+    def test_slice_outside_range_is_empty(self):
+        """範囲内にポイントがない場合は空の配列になる"""
+        full = compute_track_metrics(self.file_a)
+        empty = slice_time_range(full, 0, 1)
+        self.assertEqual(len(empty['time_utc']), 0)
+        self.assertEqual(list(empty), TRACK_RESULT_COLUMNS)
+
+    def test_merge_uses_tracks_projected_at_shared_origin(self):
+        """結合結果のENU座標は共通の原点で投影済みのトラックの列をそのまま使う"""
+        merged = merge_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time)
+        origin = merged['origin']
+        merged_df = merged['merged']
+        for suffix, gpx_file in (('a', self.file_a), ('b', self.file_b)):
+            track = compute_track_metrics(gpx_file, origin=origin)
+            east, north, up = geodetic_to_enu(track['lat'], track['lon'], track['ele'], *origin)
+            np.testing.assert_array_equal(track['east'], east)
+            np.testing.assert_array_equal(track['up'], up)
+            # 結合済みの各点は投影済みの配列の値を持つ
+            times = merged_df['time_utc' if suffix == 'a' else 'time_utc_b'].astype('int64').to_numpy()
+            positions = np.searchsorted(track['time_utc'], times)
+            for name in ('east', 'north', 'up'):
+                np.testing.assert_array_equal(merged_df[f'{name}_{suffix}'].to_numpy(), track[name][positions])
+        # 原点ごとに別の結果としてキャッシュする
+        self.assertIsNot(compute_track_metrics(self.file_a, origin=origin), compute_track_metrics(self.file_a))
+
+    def test_columnar_matches_nested(self):
+        """列形式の各配列は既定の入れ子形式と同じ値を同じ順序で持つ"""
+        nested = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time)
+        columnar = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time,
+                                     output_format='columnar')
+        points = nested['visualization_data']
+        columns = columnar['columns']
+
+        self.assertEqual(columnar['format'], 'columnar')
+        self.assertEqual(columnar['count'], len(points))
+        self.assertNotIn('visualization_data', columnar)
+        self.assertEqual(columnar['summary'], nested['summary'])
+        for values in columns.values():
+            self.assertEqual(len(values), len(points))
+
+        self.assertEqual(columns['timestamp'], [p['timestamp'] for p in points])
+        for suffix in ('a', 'b'):
+            track = [p[f'track_{suffix}'] for p in points]
+            np.testing.assert_allclose(columns[f'ele_{suffix}'], [t['ele'] for t in track])
+            np.testing.assert_allclose(columns[f'ele_ft_{suffix}'], [t['ele_ft'] for t in track])
+            np.testing.assert_allclose(columns[f'vertical_speed_{suffix}'], [t['speeds']['vertical'] for t in track])
+            np.testing.assert_allclose(columns[f'avg_10sec_speed_3d_{suffix}'], [t['speeds']['avg_10sec_3d'] for t in track])
+            np.testing.assert_allclose(columns[f'accel_3d_{suffix}'], [t['accelerations']['accel_3d'] for t in track])
+            np.testing.assert_allclose(columns[f'east_{suffix}'], [t['enu']['east'] for t in track])
+        np.testing.assert_allclose(columns['distance_3d'], [p['comparison']['distance_3d'] for p in points])
+        np.testing.assert_allclose(columns['height_diff_ft'], [p['comparison']['height_diff_ft'] for p in points])
+
+    def test_views_select_nested_outputs(self):
+        """views で要求したビューだけを返し、内容は既定の出力と同じ"""
+        both = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time)
+        visualization = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time,
+                                          views=('visualization',))
+        table = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time, views=('table',))
+
+        self.assertNotIn('table_data', visualization)
+        self.assertNotIn('visualization_data', table)
+        self.assertEqual(visualization['visualization_data'], both['visualization_data'])
+        self.assertEqual(table['table_data'], both['table_data'])
+        self.assertEqual(table['summary'], both['summary'])
+
+    def test_parallel_matches_sequential(self):
+        """プロセスプールでの並列処理と逐次処理の結果が一致する"""
+        sequential = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time, parallel=False)
+        # 結合済みトラックのキャッシュを使わずにもう一度処理する
+        gpx_processor.clear_merged_cache()
+        parallel = process_gpx_files(self.file_a, self.file_b, self.start_time, self.end_time, parallel=True)
+        self.assertIsNotNone(gpx_processor._process_pool)
+        # トラックA/Bが別々のワーカーで同時に処理される
+        self.assertGreaterEqual(gpx_processor._process_pool._max_workers, 2)
+        self.assertEqual(sequential, parallel)
+        self.assertGreater(sequential['summary']['count'], 0)
+
+class TestTablePage(unittest.TestCase):
+    def setUp(self):
+        use_temporary_track_store(self)
+        samples_dir = Path(__file__).parent.parent / 'samples'
+        self.merged = merge_gpx_files(str(samples_dir / 'flight1_6.gpx'), str(samples_dir / 'flight1_17.gpx'))['merged']
+
+    def test_time_order_matches_table_data(self):
+        """時刻順のページは table_data の同じ範囲と一致し、10秒平均の列も持つ"""
+        table = format_for_table(self.merged)
+        page = table_page(self.merged, offset=100, limit=20)
+        self.assertEqual(page['total'], len(table))
+        self.assertEqual([row['index'] for row in page['rows']], list(range(100, 120)))
+        for row, expected in zip(page['rows'], table[100:120]):
+            self.assertEqual(row['time'], expected['time'])
+            for key, value in expected.items():
+                if key != 'time':
+                    self.assertAlmostEqual(row[key], value, places=6)
+            self.assertIn('avg_10sec_vertical_speed_a', row)
+
+    def test_sort_and_window(self):
+        """時間窓で絞り込み、指定した列で並べ替える"""
+        page = table_page(self.merged, limit=5, sort='distance_3d', descending=True,
+                          window_start='2025-04-04 23:55:00', window_end='2025-04-05 00:00:00')
+        self.assertEqual(page['total'], 304)
+        distances = [row['distance_3d'] for row in page['rows']]
+        self.assertEqual(distances, sorted(distances, reverse=True))
+        for row in page['rows']:
+            self.assertTrue('2025-04-04 23:55:00' <= row['time'] <= '2025-04-05 00:00:00')
+
+        past_end = table_page(self.merged, offset=page['total'], window_start='2025-04-04 23:55:00',
+                              window_end='2025-04-05 00:00:00')
+        self.assertEqual(past_end['rows'], [])
+        with self.assertRaises(ValueError):
+            table_page(self.merged, sort='lat_a')
+
+class TestRangeSummary(unittest.TestCase):
+    def setUp(self):
+        use_temporary_track_store(self)
+        samples_dir = Path(__file__).parent.parent / 'samples'
+        self.merged = merge_gpx_files(str(samples_dir / 'flight1_6.gpx'), str(samples_dir / 'flight1_17.gpx'))
+
+    def test_matches_create_summary(self):
+        """全体・時間窓のサマリーは、その範囲の結合結果から create_summary で求めた値と一致する"""
+        merged_df = self.merged['merged'].sort_values('time_utc')
+        full = range_summary(self.merged['summary_index'])
+        self.assertEqual({key: full[key] for key in create_summary(merged_df)}, create_summary(merged_df))
+
+        window = range_summary(self.merged['summary_index'], '2025-04-04 23:55:00', '2025-04-05 00:00:00')
+        times = merged_df['time_utc'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        in_window = merged_df[(times >= '2025-04-04 23:55:00') & (times <= '2025-04-05 00:00:00')]
+        self.assertEqual(window['count'], 304)
+        self.assertEqual({key: window[key] for key in create_summary(in_window)}, create_summary(in_window))
+        closest = in_window.loc[in_window['distance_3d'].idxmin()]
+        self.assertEqual(window['min_distance_3d_time'], closest['time_utc'].strftime('%Y-%m-%d %H:%M:%S'))
+
+    def test_empty_and_invalid_window(self):
+        """ポイントのない窓は空のサマリー、窓の前後が逆の場合は ValueError"""
+        self.assertEqual(range_summary(self.merged['summary_index'], '2000-01-01 00:00:00', '2000-01-01 01:00:00'), {})
+        with self.assertRaises(ValueError):
+            range_summary(self.merged['summary_index'], '2025-04-05 00:00:00', '2025-04-04 23:55:00')
+
+class TestMergedRangeCache(unittest.TestCase):
+    def setUp(self):
+        use_temporary_track_store(self)
+        # Aは整数秒、Bは0.5秒ずらした時刻の点（exact 結合では同じ秒の点同士が対応する）
+        self.tmp_files = []
+        self.file_a = self.write_gpx(0.0)
+        self.file_b = self.write_gpx(0.5)
+        clear_merged_cache()
+
+    def tearDown(self):
+        for path in self.tmp_files:
+            os.remove(path)
+        clear_merged_cache()
+
+    def write_gpx(self, offset):
+        start = pd.Timestamp('2025-04-05 01:00:00', tz='UTC')
+        points = '\n'.join(
+            f'<trkpt lat="{35.0 + i * 1e-4}" lon="{135.0 + offset * 1e-3}"><ele>{100 + i}</ele>'
+            f'<time>{(start + pd.Timedelta(seconds=i + offset)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")}</time></trkpt>'
+            for i in range(120)
+        )
+        fd, path = tempfile.mkstemp(suffix='.gpx')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<gpx xmlns="http://www.topografix.com/GPX/1/1" '
+                    f'version="1.1" creator="test"><trk><trkseg>\n{points}\n</trkseg></trk></gpx>\n')
+        self.tmp_files.append(path)
+        return path
+
+    def test_sub_range_is_sliced_from_cached_superset(self):
+        """含む範囲の結合結果から切り出した結果は、範囲を指定して結合し直した結果と一致する"""
+        start, end = '2025-04-05 01:00:30', '2025-04-05 01:01:10'
+        fresh = merge_gpx_files(self.file_a, self.file_b, start, end)
+        # 終了時刻ちょうどのAの点に対応するBの点は範囲外
+        self.assertEqual(fresh['merged']['time_utc'].max(), pd.Timestamp('2025-04-05 01:01:09', tz='UTC'))
+        clear_merged_cache()
+
+        full = merge_gpx_files(self.file_a, self.file_b)
+        before = merged_cache_stats()
+        sliced = merge_gpx_files(self.file_a, self.file_b, start, end)
+        pd.testing.assert_frame_equal(sliced['merged'], fresh['merged'])
+        self.assertEqual(merged_cache_stats()['slices'], before['slices'] + 1)
+
+        # インデックスは作り直さず、元の結果のものを行の範囲を制限して使う
+        self.assertIs(sliced['summary_index'], full['summary_index'])
+        self.assertEqual(range_summary(sliced['summary_index'], rows=sliced['rows']),
+                         range_summary(fresh['summary_index']))
+        window = ('2025-04-05 01:00:50', '2025-04-05 01:01:30')
+        self.assertEqual(range_summary(sliced['summary_index'], *window, rows=sliced['rows']),
+                         range_summary(fresh['summary_index'], *window))
+        # 概観は粗いバケットでも範囲外の行を含まず、結合し直した結果と一致する
+        self.assertIsNot(sliced['pyramid'], full['pyramid'])
+        for width in (1000, 3):
+            self.assertEqual(overview_buckets(sliced['pyramid'], width=width),
+                             overview_buckets(fresh['pyramid'], width=width))
+            self.assertEqual(overview_buckets(sliced['pyramid'], *window, width=width),
+                             overview_buckets(fresh['pyramid'], *window, width=width))
+
+        # 切り出した結果からさらに切り出しても、元の結果の行の範囲に直して使う
+        nested = merge_gpx_files(self.file_a, self.file_b, '2025-04-05 01:00:40', '2025-04-05 01:00:59')
+        self.assertEqual(merged_cache_stats()['slices'], before['slices'] + 2)
+        nested_summary = range_summary(nested['summary_index'], rows=nested['rows'])
+        expected = create_summary(nested['merged'])
+        self.assertEqual({key: nested_summary[key] for key in expected}, expected)
+
+        merge_gpx_files(self.file_a, self.file_b, start, end)
+        self.assertEqual(merged_cache_stats()['hits'], before['hits'] + 1)
+
+    def test_nearest_join_is_not_sliced(self):
+        """nearest 結合は範囲の端の対応付けが変わるため、含む範囲からは切り出さない"""
+        merge_gpx_files(self.file_a, self.file_b, join_mode='nearest', join_tolerance_ms=1000)
+        before = merged_cache_stats()
+        merge_gpx_files(self.file_a, self.file_b, '2025-04-05 01:00:30', '2025-04-05 01:01:10',
+                        join_mode='nearest', join_tolerance_ms=1000)
+        stats = merged_cache_stats()
+        self.assertEqual((stats['slices'], stats['misses']), (before['slices'], before['misses'] + 1))
+
+class TestDateCrossover(unittest.TestCase):
+    def setUp(self):
+        times = np.array(['2025-04-04T23:58:00', '2025-04-04T23:59:30',
+                          '2025-04-04T00:00:30', '2025-04-04T00:02:00'], dtype='datetime64[ns]')
+        self.times = times.view(np.int64)
+
+    def test_sequence_robust_offsets_after_reversal(self):
+        """巻き戻り以降のポイントに1日のオフセットが加算される"""
+        fixed = fix_datetime_sequence_robust(self.times)
+        np.testing.assert_array_equal(fixed[:2], self.times[:2])
+        np.testing.assert_array_equal(fixed[2:], self.times[2:] + NS_PER_DAY)
+        self.assertTrue(np.all(np.diff(fixed) > 0))
+
+    def test_for_file_moves_early_morning_to_next_day(self):
+        """夜間の後に現れる0-4時台のポイントが翌日に移される"""
+        fixed = fix_datetime_for_file(self.times)
+        np.testing.assert_array_equal(fixed, fix_datetime_sequence_robust(self.times))
+
+    def test_monotonic_times_are_unchanged(self):
+        """日付跨ぎのない時刻列はそのまま返る"""
+        times = self.times[:2]
+        self.assertIs(fix_datetime_sequence_robust(times), times)
+        self.assertIs(fix_datetime_for_file(times), times)
+
+class TestStepMetrics(unittest.TestCase):
+    def test_matches_scalar_formulas(self):
+        """距離と速度がスカラー版の計算と一致し、時間差0以下の区間は0になる"""
+        time_ns = np.array([0, 2, 2, 5], dtype=np.int64) * NS_PER_SECOND
+        lat = np.array([35.0, 35.001, 35.002, 35.004])
+        lon = np.array([139.0, 139.001, 139.001, 139.003])
+        ele = np.array([100.0, 110.0, 108.0, 130.0])
+        metrics = compute_step_metrics(time_ns, lat, lon, ele)
+
+        self.assertTrue(np.isnan(metrics['time_diff'][0]))
+        self.assertEqual(metrics['horizontal_distance'][0], 0)
+        for i in range(1, 4):
+            self.assertAlmostEqual(metrics['horizontal_distance'][i],
+                                   haversine_distance(lat[i-1], lon[i-1], lat[i], lon[i]), places=6)
+            self.assertAlmostEqual(metrics['distance_3d'][i],
+                                   calculate_3d_distance(lat[i-1], lon[i-1], ele[i-1], lat[i], lon[i], ele[i]), places=6)
+
+        # 重複したタイムスタンプ（インデックス2）の速度・加速度は0
+        np.testing.assert_array_equal(metrics['vertical_speed'], [0, 5.0, 0, 22.0 / 3])
+        self.assertEqual(metrics['vertical_accel'][2], 0)
+        self.assertAlmostEqual(metrics['vertical_accel'][3], (22.0 / 3) / 3)
+        self.assertAlmostEqual(metrics['vertical_accel'][1], 2.5)
+
+class TestSeparation(unittest.TestCase):
+    def test_separation_arrays(self):
+        """水平距離・高度差・3D距離・方位角を配列でまとめて返す"""
+        lat_a = np.array([35.0, 35.0, 35.0])
+        lon_a = np.array([139.0, 139.0, 139.0])
+        ele_a = np.array([100.0, 200.0, 300.0])
+        lat_b = np.array([35.01, 35.0, 34.99])
+        lon_b = np.array([139.0, 139.01, 139.0])
+        ele_b = np.array([150.0, 200.0, 250.0])
+        separation = compute_separation(lat_a, lon_a, ele_a, lat_b, lon_b, ele_b)
+
+        np.testing.assert_allclose(separation['height_diff'], [-50.0, 0.0, 50.0])
+        for i in range(3):
+            self.assertAlmostEqual(separation['horizontal_distance'][i],
+                                   haversine_distance(lat_a[i], lon_a[i], lat_b[i], lon_b[i]), places=6)
+            self.assertAlmostEqual(separation['distance_3d'][i],
+                                   calculate_3d_distance(lat_a[i], lon_a[i], ele_a[i], lat_b[i], lon_b[i], ele_b[i]), places=6)
+        # 北・東・南
+        np.testing.assert_allclose(separation['bearing'], [0.0, 90.0, 180.0], atol=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""高速GPXリーダーのテスト"""
+import unittest
+import os
+import tempfile
+from pathlib import Path
+
+import gpxpy
+import numpy as np
+
+from app.gpx_reader import read_gpx_arrays, read_gpx_bounds, UnsupportedGPXError
+
+GPX_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="{ns}" version="1.1" creator="test">
+<trk><trkseg>
+{points}
+</trkseg></trk>
+</gpx>
+"""
+
+class TestGpxReader(unittest.TestCase):
+    def setUp(self):
+        self.samples_dir = Path(__file__).parent.parent / 'samples'
+        self.gpx_file = self.samples_dir / 'flight1_6.gpx'
+        self.tmp_files = []
+
+    def tearDown(self):
+        for path in self.tmp_files:
+            os.remove(path)
+
+    def write_gpx(self, points, ns='http://www.topografix.com/GPX/1/1'):
+        """テスト用のGPXファイルを作成"""
+        fd, path = tempfile.mkstemp(suffix='.gpx')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(GPX_TEMPLATE.format(ns=ns, points='\n'.join(points)))
+        self.tmp_files.append(path)
+        return path
+
+    def test_matches_gpxpy(self):
+        """サンプルファイルの読み込み結果がgpxpyと一致することを確認"""
+        columns = read_gpx_arrays(str(self.gpx_file))
+
+        with open(self.gpx_file, 'r', encoding='utf-8') as f:
+            gpx = gpxpy.parse(f)
+        points = [p for t in gpx.tracks for s in t.segments for p in s.points]
+
+        self.assertEqual(len(columns['lat']), len(points))
+        self.assertEqual(columns['lat'].dtype, np.float64)
+        np.testing.assert_array_equal(columns['lat'], [p.latitude for p in points])
+        np.testing.assert_array_equal(columns['lon'], [p.longitude for p in points])
+        np.testing.assert_array_equal(columns['ele'], [p.elevation for p in points])
+        self.assertEqual(columns['time'][0], "2025-04-04T23:44:14.000Z")
+
+    def test_skips_points_without_time_or_elevation(self):
+        """時間・標高のないポイントはスキップされる"""
+        path = self.write_gpx([
+            '<trkpt lat="35.0" lon="135.0"><ele>100</ele><time>2025-04-04T23:44:14Z</time></trkpt>',
+            '<trkpt lat="35.1" lon="135.1"><ele>101</ele></trkpt>',
+            '<trkpt lat="35.2" lon="135.2"><time>2025-04-04T23:44:16Z</time></trkpt>',
+            '<trkpt lat="35.3" lon="135.3"><ele>103</ele><time>2025-04-04T23:44:17.000Z</time></trkpt>',
+        ])
+        columns = read_gpx_arrays(path)
+        np.testing.assert_array_equal(columns['lat'], [35.0, 35.3])
+        self.assertEqual(list(columns['time']), ["2025-04-04T23:44:14Z", "2025-04-04T23:44:17.000Z"])
+
+    def test_gpx_1_0_namespace(self):
+        """GPX 1.0 の名前空間も読み込める"""
+        path = self.write_gpx(
+            ['<trkpt lat="35.0" lon="135.0"><ele>100</ele><time>2025-04-04T23:44:14Z</time></trkpt>'],
+            ns='http://www.topografix.com/GPX/1/0'
+        )
+        columns = read_gpx_arrays(path)
+        self.assertEqual(len(columns['ele']), 1)
+
+    def test_unsupported_files(self):
+        """扱えないファイルは UnsupportedGPXError を送出する"""
+        # UTC以外のタイムスタンプ
+        path = self.write_gpx([
+            '<trkpt lat="35.0" lon="135.0"><ele>100</ele><time>2025-04-05T08:44:14+09:00</time></trkpt>',
+        ])
+        with self.assertRaises(UnsupportedGPXError):
+            read_gpx_arrays(path)
+
+        # 未知の名前空間
+        path = self.write_gpx(
+            ['<trkpt lat="35.0" lon="135.0"><ele>100</ele><time>2025-04-04T23:44:14Z</time></trkpt>'],
+            ns='http://example.com/unknown'
+        )
+        with self.assertRaises(UnsupportedGPXError):
+            read_gpx_arrays(path)
+
+    def test_read_bounds(self):
+        """<metadata><bounds> を読み取り、ない場合は None を返す"""
+        self.assertEqual(read_gpx_bounds(str(self.gpx_file)),
+                         (35.048495, 135.556205, 35.06026, 135.569278))
+        path = self.write_gpx(['<trkpt lat="35.0" lon="139.0"><ele>1</ele><time>2025-04-04T00:00:00Z</time></trkpt>'])
+        self.assertIsNone(read_gpx_bounds(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""非同期ジョブ管理のテスト"""
+import unittest
+import asyncio
+import json
+import threading
+
+from app.scheduler import ProcessingScheduler, QueueFullError
+from app.jobs import JobManager, JOB_SUCCEEDED, JOB_FAILED, JOB_RUNNING
+
+def collect_events(manager, job):
+    async def scenario():
+        return [frame async for frame in manager.events(job)]
+
+    frames = asyncio.run(scenario())
+    events = []
+    for frame in frames:
+        lines = frame.strip().split('\n')
+        if lines[0].startswith('event: '):
+            events.append((lines[0][len('event: '):], json.loads(lines[1][len('data: '):])))
+    return events
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = ProcessingScheduler(max_workers=1, max_queue=1)
+        self.manager = JobManager(self.scheduler, stages=('parse', 'merge'))
+
+    def test_progress_events_and_result(self):
+        """進捗がSSEで通知され、完了後に結果を取得できる"""
+        def work(value, progress=None):
+            progress('parse')
+            progress('merge')
+            return value * 2
+
+        job = self.manager.submit(work, 21)
+        events = collect_events(self.manager, job)
+
+        self.assertEqual(events[-1][0], 'done')
+        self.assertEqual(events[-1][1]['progress'], 1.0)
+        self.assertEqual(job.status, JOB_SUCCEEDED)
+        self.assertEqual(job.result, 42)
+        self.assertEqual(job.steps_seen, [('parse', None), ('merge', None)])
+        self.assertIs(self.manager.get(job.job_id), job)
+
+    def test_failure_is_reported(self):
+        """処理中の例外はジョブの失敗として記録される"""
+        def fail(progress=None):
+            progress('parse')
+            raise ValueError("broken")
+
+        job = self.manager.submit(fail)
+        events = collect_events(self.manager, job)
+
+        self.assertEqual(events[-1][0], 'error')
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertEqual(job.error, "broken")
+        self.assertEqual(self.manager.stats()[JOB_FAILED], 1)
+
+    def test_expired_jobs_are_purged(self):
+        """保持期間を過ぎた完了ジョブは破棄される"""
+        manager = JobManager(self.scheduler, stages=(), result_ttl=0)
+        job = manager.submit(lambda progress=None: None)
+        collect_events(manager, job)
+        job.finished_at -= 1
+        self.assertIsNone(manager.get(job.job_id))
+
+    def test_job_is_registered_before_it_runs(self):
+        """ワーカーが処理を始めた時点でジョブは登録済みで、満杯で拒否したジョブは残らない"""
+        release = threading.Event()
+        seen = []
+
+        def work(progress=None):
+            seen.append(self.manager.stats()[JOB_RUNNING])
+            release.wait()
+
+        job = self.manager.submit(work)
+        queued = self.manager.submit(lambda progress=None: None)
+        with self.assertRaises(QueueFullError):
+            self.manager.submit(lambda progress=None: None)
+        self.assertEqual(sum(self.manager.stats().values()), 2)
+
+        release.set()
+        collect_events(self.manager, job)
+        collect_events(self.manager, queued)
+        self.assertEqual(seen, [1])
+
+if __name__ == '__main__':
+    unittest.main()
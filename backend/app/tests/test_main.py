@@ -0,0 +1,139 @@
+"""アップロード（ストリーミング保存・重複排除・アップロード直後の解析）のAPIテスト"""
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+from app import main, gpx_processor
+from app.track_store import file_digest
+from app.tests import use_temporary_track_store
+
+SAMPLES_DIR = Path(__file__).parent.parent / 'samples'
+
+class TestUpload(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.upload_dir = os.path.join(self.tmp_dir.name, 'uploads')
+        os.makedirs(self.upload_dir)
+        self.track_store = use_temporary_track_store(self)
+        patch = mock.patch.object(main, 'UPLOAD_DIR', self.upload_dir)
+        patch.start()
+        self.addCleanup(patch.stop)
+        # デバッグモードのイベントループはコールバックごとにトレースバックを取得し、
+        # アップロード本文の受け渡しが極端に遅くなるため無効にする
+        asyncio.get_running_loop().set_debug(False)
+        gpx_processor.clear_track_cache()
+        gpx_processor.clear_merged_cache()
+        main.RESPONSE_CACHE.clear()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test')
+        self.file_a = (SAMPLES_DIR / 'flight1_6.gpx').read_bytes()
+        self.file_b = (SAMPLES_DIR / 'flight1_17.gpx').read_bytes()
+
+    async def asyncTearDown(self):
+        # 後続のテストに解析が残らないよう、バックグラウンド解析の完了を待つ
+        await main.wait_for_pending_parses(*list(main._pending_parses))
+        await self.client.aclose()
+        gpx_processor.clear_track_cache()
+        self.tmp_dir.cleanup()
+
+    async def upload(self, content_a, content_b):
+        response = await self.client.post('/api/upload', files={
+            'file_a': ('a.gpx', content_a, 'application/gpx+xml'),
+            'file_b': ('b.gpx', content_b, 'application/gpx+xml'),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_repeated_upload_reuses_stored_file(self):
+        """同じ内容を再度アップロードすると、内容のハッシュに基づく同じファイルを使う"""
+        first = await self.upload(self.file_a, self.file_b)
+        second = await self.upload(self.file_a, self.file_b)
+
+        self.assertEqual(first, second)
+        digest = file_digest(str(SAMPLES_DIR / 'flight1_6.gpx'))
+        self.assertEqual(first['file_a_sha256'], digest)
+        self.assertEqual(first['file_a_path'], os.path.join(self.upload_dir, f'gpx_{digest}.gpx'))
+        # 書き込み途中の一時ファイルは残らない
+        self.assertEqual(sorted(os.listdir(self.upload_dir)),
+                         sorted(os.path.basename(first[key]) for key in ('file_a_path', 'file_b_path')))
+
+    async def test_process_waits_for_background_parse(self):
+        """処理リクエストは実行中のバックグラウンド解析の完了を待ち、その結果を使う"""
+        gate = threading.Event()
+        parse_gpx = main.parse_gpx
+
+        def gated_parse(*args, **kwargs):
+            gate.wait(10)
+            return parse_gpx(*args, **kwargs)
+
+        with mock.patch.object(main, 'parse_gpx', gated_parse), \
+                mock.patch.object(gpx_processor, '_read_track_fast', wraps=gpx_processor._read_track_fast) as read:
+            uploaded = await self.upload(self.file_a, self.file_b)
+            paths = (uploaded['file_a_path'], uploaded['file_b_path'])
+            self.assertTrue(all(path in main._pending_parses for path in paths))
+
+            request = asyncio.ensure_future(self.client.post('/api/process', data={
+                'file_a_path': paths[0], 'file_b_path': paths[1],
+                'start_time': '2025-04-04 23:55:00', 'end_time': '2025-04-05 00:00:00',
+            }))
+            await asyncio.sleep(0.2)
+            self.assertFalse(request.done())
+            self.assertEqual(read.call_count, 0)
+
+            gate.set()
+            response = await request
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()['summary']['count'], 0)
+        self.assertFalse(any(path in main._pending_parses for path in paths))
+        # XMLの解析はバックグラウンド解析の1ファイル1回だけ
+        self.assertEqual(sorted(call.args[0] for call in read.call_args_list), sorted(paths))
+
+    async def test_parse_without_points_is_not_reported_as_success(self):
+        """ポイントのないファイルの解析は完了ではなく警告としてログに出す"""
+        empty = b'<?xml version="1.0"?><gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1"></gpx>'
+        with self.assertLogs('app.main', level='INFO') as logs:
+            uploaded = await self.upload(empty, self.file_b)
+            await main.wait_for_pending_parses(uploaded['file_a_path'], uploaded['file_b_path'])
+            await asyncio.sleep(0)
+
+        self.assert_parse_logged(logs, uploaded['file_a_path'], 'WARNING', '有効なポイントが得られませんでした')
+        self.assert_parse_logged(logs, uploaded['file_b_path'], 'INFO', 'バックグラウンド解析完了')
+
+    async def test_failed_parse_is_not_reported_as_success(self):
+        """解析中の例外は完了ではなく失敗としてログに出す"""
+        def failing_parse(*args, **kwargs):
+            raise ValueError('broken')
+
+        with mock.patch.object(main, 'parse_gpx', failing_parse), \
+                self.assertLogs('app.main', level='INFO') as logs:
+            uploaded = await self.upload(self.file_a, self.file_b)
+            await main.wait_for_pending_parses(uploaded['file_a_path'], uploaded['file_b_path'])
+            await asyncio.sleep(0)
+
+        for key in ('file_a_path', 'file_b_path'):
+            self.assert_parse_logged(logs, uploaded[key], 'WARNING', 'バックグラウンド解析に失敗')
+
+    async def test_clear_cache_removes_disk_cache(self):
+        """/api/clear_cache はディスクキャッシュも削除し、削除した件数を返す"""
+        uploaded = await self.upload(self.file_a, self.file_b)
+        await main.wait_for_pending_parses(uploaded['file_a_path'], uploaded['file_b_path'])
+        self.assertEqual(len(os.listdir(self.track_store.cache_dir)), 2)
+
+        response = await self.client.post('/api/clear_cache')
+        self.assertEqual(response.json()['disk_cache'], {'items': 2})
+        self.assertEqual(os.listdir(self.track_store.cache_dir), [])
+
+    def assert_parse_logged(self, logs, path, level, message):
+        records = [record for record in logs.records
+                   if 'バックグラウンド解析' in record.getMessage() and path in record.getMessage()]
+        self.assertEqual([(record.levelname, message in record.getMessage()) for record in records],
+                         [(level, True)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""ENU投影のテスト"""
+import unittest
+
+import numpy as np
+
+from app.projection import geodetic_to_enu, bounds_center, track_bounds
+from app.gpx_processor import haversine_distance
+
+class TestProjection(unittest.TestCase):
+    def test_origin_maps_to_zero(self):
+        """原点は (0, 0, 標高) に写る"""
+        east, north, up = geodetic_to_enu(np.array([35.05]), np.array([135.56]), np.array([120.0]), 35.05, 135.56)
+        np.testing.assert_allclose([east[0], north[0], up[0]], [0.0, 0.0, 120.0], atol=1e-6)
+
+    def test_axes_and_distances(self):
+        """東・北の向きが正しく、水平距離はハーバーサイン公式とほぼ一致する"""
+        lat = np.array([35.05, 35.06, 35.05])
+        lon = np.array([135.56, 135.56, 135.57])
+        east, north, _ = geodetic_to_enu(lat, lon, np.zeros(3), 35.05, 135.56)
+        self.assertGreater(north[1], 1000)
+        self.assertAlmostEqual(east[1], 0.0, places=6)
+        self.assertGreater(east[2], 800)
+
+        for i, j in ((0, 1), (0, 2), (1, 2)):
+            planar = np.hypot(east[i] - east[j], north[i] - north[j])
+            self.assertAlmostEqual(planar, haversine_distance(lat[i], lon[i], lat[j], lon[j]), delta=0.05)
+
+    def test_bounds_center(self):
+        """複数の範囲を合わせた範囲の中心を原点にする"""
+        a = (35.0, 135.0, 35.2, 135.2)
+        b = track_bounds(np.array([34.9, 35.1]), np.array([135.1, 135.4]))
+        self.assertEqual(bounds_center([a, b, None]), ((34.9 + 35.2) / 2, (135.0 + 135.4) / 2))
+        self.assertIsNone(bounds_center([None]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""時間ピラミッドのテスト"""
+import unittest
+
+import numpy as np
+
+from app.pyramid import build_pyramid, query_pyramid, choose_level
+
+S = 1_000_000_000
+
+class TestPyramid(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        # 不規則な間隔の約1000秒分の点（途中に NaN を含む）
+        self.time_ns = np.cumsum(rng.integers(200, 1500, size=1500)) * 1_000_000
+        self.values = rng.normal(size=1500)
+        self.values[::97] = np.nan
+        self.pyramid = build_pyramid(self.time_ns, {'v': self.values})
+
+    def brute_force(self, bucket_ns):
+        ids = self.time_ns // bucket_ns
+        expected = {}
+        for bucket_id in np.unique(ids):
+            values = self.values[ids == bucket_id]
+            values = values[~np.isnan(values)]
+            expected[bucket_id * bucket_ns // 1_000_000] = (
+                (values.min(), values.max(), values.mean()) if len(values) else (None, None, None)
+            )
+        return expected
+
+    def test_levels_match_brute_force(self):
+        """各レベルの min / max / mean は、その幅のバケットで直接集計した値と一致する"""
+        self.assertEqual(len(self.pyramid[-1]['bucket_id']), 1)
+        for level in (0, 3, len(self.pyramid) - 1):
+            bucket_ns = int(self.pyramid[level]['bucket_ns'])
+            self.assertEqual(bucket_ns, S << level)
+            expected = self.brute_force(bucket_ns)
+            ids = self.pyramid[level]['bucket_id']
+            self.assertEqual((ids * bucket_ns // 1_000_000).tolist(), sorted(expected))
+            for i, time_ms in enumerate(sorted(expected)):
+                count = self.pyramid[level]['v:count'][i]
+                if count:
+                    self.assertAlmostEqual(self.pyramid[level]['v:min'][i], expected[time_ms][0])
+                    self.assertAlmostEqual(self.pyramid[level]['v:max'][i], expected[time_ms][1])
+                    self.assertAlmostEqual(self.pyramid[level]['v:sum'][i] / count, expected[time_ms][2])
+
+        result = query_pyramid(self.pyramid, width=10 ** 6)
+        self.assertEqual(result['level'], 0)
+        self.assertEqual(sum(result['count']), len(self.time_ns))
+
+    def test_query_respects_width(self):
+        """窓を width 個以下のバケットで表せる最も細かいレベルを選ぶ"""
+        start, end = int(self.time_ns[100]), int(self.time_ns[900])
+        for width in (1, 7, 50, 300):
+            result = query_pyramid(self.pyramid, start, end, width)
+            self.assertLessEqual(len(result['time']), width)
+            level = result['level']
+            if level > 0:
+                finer = int(self.pyramid[level - 1]['bucket_ns'])
+                self.assertGreater(end // finer - start // finer + 1, width)
+            self.assertLessEqual(result['time'][0], start // 1_000_000)
+            self.assertGreaterEqual(result['time'][-1] + result['bucket_ms'], end // 1_000_000)
+
+    def test_empty_and_invalid(self):
+        """空のピラミッドは空の結果、窓の前後が逆の場合は ValueError"""
+        self.assertEqual(query_pyramid([])['time'], [])
+        with self.assertRaises(ValueError):
+            query_pyramid(self.pyramid, 10 * S, 5 * S)
+        self.assertEqual(choose_level(self.pyramid, 0, 0, 1), 0)
+
+if __name__ == '__main__':
+    unittest.main()
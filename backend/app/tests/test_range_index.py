@@ -0,0 +1,51 @@
+"""区間集計インデックスのテスト"""
+import unittest
+
+import numpy as np
+
+from app.range_index import build_range_index, query_range
+
+class TestRangeIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.values = rng.normal(size=777)
+        self.values[::31] = np.nan
+        self.values[400:420] = np.nan
+        # 同じ値が続く区間（同じ値の場合は前の位置を返す）
+        self.values[600:610] = 5.0
+        self.index = build_range_index({'v': self.values, 'w': -self.values}, {'v': ('min', 'max')})
+
+    def test_matches_brute_force(self):
+        """任意の区間の平均・最小・最大と位置は、区間を直接集計した値と一致する"""
+        rng = np.random.default_rng(3)
+        ranges = [(0, 777), (0, 1), (776, 777), (598, 612), (405, 415)]
+        ranges += [tuple(sorted(rng.choice(778, size=2, replace=False))) for _ in range(200)]
+        for lo, hi in ranges:
+            stats = query_range(self.index, lo, hi)['v']
+            window = self.values[lo:hi]
+            valid = ~np.isnan(window)
+            self.assertEqual(stats['count'], int(valid.sum()))
+            if not valid.any():
+                self.assertIsNone(stats['mean'])
+                self.assertIsNone(stats['argmax'])
+                continue
+            self.assertAlmostEqual(stats['mean'], np.nanmean(window))
+            self.assertEqual(stats['argmin'], lo + int(np.nanargmin(window)))
+            self.assertEqual(stats['argmax'], lo + int(np.nanargmax(window)))
+            self.assertEqual(stats['max'], np.nanmax(window))
+
+    def test_extrema_only_for_requested_columns(self):
+        """スパーステーブルを作らない列は平均と点数だけを返す"""
+        stats = query_range(self.index, 10, 20)['w']
+        self.assertEqual(set(stats), {'count', 'mean'})
+
+    def test_invalid_range(self):
+        """空の区間や範囲外の区間は ValueError"""
+        for lo, hi in ((5, 5), (-1, 3), (0, 778)):
+            with self.assertRaises(ValueError):
+                query_range(self.index, lo, hi)
+        with self.assertRaises(ValueError):
+            build_range_index({'a': np.zeros(3), 'b': np.zeros(4)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""共通グリッドへの再サンプリングのテスト"""
+import unittest
+
+import numpy as np
+
+from app.resample import make_grid, resample_track
+
+S = 1_000_000_000
+
+class TestResample(unittest.TestCase):
+    def test_grid_is_aligned_to_step(self):
+        """グリッドはステップの整数倍の時刻に揃う"""
+        grid = make_grid(int(1.3 * S), int(4.1 * S), 1000)
+        np.testing.assert_array_equal(grid, np.array([2, 3, 4]) * S)
+        self.assertEqual(len(make_grid(int(1.3 * S), int(1.4 * S), 1000)), 0)
+        with self.assertRaises(ValueError):
+            make_grid(0, S, 0)
+
+    def test_linear_interpolation(self):
+        """異なる記録間隔のトラックを同じグリッド上に線形補間する"""
+        track = {
+            'time_utc': np.array([0, 2, 4], dtype=np.int64) * S,
+            'ele': np.array([100.0, 120.0, 100.0]),
+            'lat': np.array([35.0, 35.2, 35.4]),
+        }
+        resampled, gap = resample_track(track, step_ms=1000)
+        np.testing.assert_array_equal(resampled['time_utc'], np.arange(5) * S)
+        np.testing.assert_allclose(resampled['ele'], [100, 110, 120, 110, 100])
+        np.testing.assert_allclose(resampled['lat'], [35.0, 35.1, 35.2, 35.3, 35.4])
+        self.assertFalse(gap.any())
+
+        # ステップを粗くすると点数が減る
+        coarse, _ = resample_track(track, step_ms=2000)
+        self.assertEqual(len(coarse['time_utc']), 3)
+
+    def test_gaps_are_marked(self):
+        """点間隔が上限を超える区間は補間せずギャップとして NaN にする"""
+        track = {
+            'time_utc': np.array([0, 1, 10, 11], dtype=np.int64) * S,
+            'ele': np.array([0.0, 1.0, 10.0, 11.0]),
+        }
+        resampled, gap = resample_track(track, step_ms=1000, max_gap_ms=5000)
+        expected_gap = np.zeros(12, dtype=bool)
+        expected_gap[2:10] = True
+        np.testing.assert_array_equal(gap, expected_gap)
+        self.assertTrue(np.isnan(resampled['ele'][gap]).all())
+        np.testing.assert_allclose(resampled['ele'][~gap], [0, 1, 10, 11])
+
+        _, gap = resample_track(track, step_ms=1000, max_gap_ms=None)
+        self.assertFalse(gap.any())
+
+if __name__ == '__main__':
+    unittest.main()
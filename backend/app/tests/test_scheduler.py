@@ -0,0 +1,54 @@
+"""処理スケジューラのテスト"""
+import unittest
+import asyncio
+import threading
+
+from app.scheduler import ProcessingScheduler, QueueFullError
+
+class TestProcessingScheduler(unittest.TestCase):
+    def test_run_returns_result(self):
+        """ワーカースレッドで実行した結果が返る"""
+        scheduler = ProcessingScheduler(max_workers=1, max_queue=1)
+        result = asyncio.run(scheduler.run(lambda x, y=0: x + y, 1, y=2))
+        self.assertEqual(result, 3)
+        self.assertEqual(scheduler.stats()['completed'], 1)
+
+    def test_rejects_when_queue_is_full(self):
+        """実行中・待機中が上限に達すると QueueFullError になる"""
+        scheduler = ProcessingScheduler(max_workers=1, max_queue=1, retry_after=7)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(scheduler.run(release.wait))
+            queued = asyncio.ensure_future(scheduler.run(release.wait))
+            await asyncio.sleep(0.05)
+
+            stats = scheduler.stats()
+            self.assertEqual(stats['running'], 1)
+            self.assertEqual(stats['queued'], 1)
+
+            with self.assertRaises(QueueFullError) as ctx:
+                await scheduler.run(release.wait)
+            self.assertEqual(ctx.exception.retry_after, 7)
+
+            release.set()
+            await asyncio.gather(running, queued)
+
+        asyncio.run(scenario())
+        stats = scheduler.stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['running'] + stats['queued'], 0)
+
+    def test_exception_is_propagated(self):
+        """処理中の例外は呼び出し側に伝わり、件数は元に戻る"""
+        scheduler = ProcessingScheduler(max_workers=1, max_queue=0)
+
+        def fail():
+            raise ValueError("error")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(scheduler.run(fail))
+        self.assertEqual(scheduler.stats()['queued'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""形状保持の間引きのテスト"""
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.simplify import lttb_indices, simplify_indices
+from app.gpx_processor import process_gpx_files
+from app.tests import use_temporary_track_store
+
+class TestLttb(unittest.TestCase):
+    def test_keeps_endpoints_and_count(self):
+        """先頭・末尾を含む指定点数を昇順で返し、点数が少なければ全点を返す"""
+        t = np.linspace(0, 10, 1001)
+        indices = lttb_indices(np.c_[t, np.sin(t)], 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 1000)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        np.testing.assert_array_equal(lttb_indices(np.arange(5.0), 10), np.arange(5))
+        with self.assertRaises(ValueError):
+            lttb_indices(np.arange(5.0), 2)
+
+    def test_keeps_spike(self):
+        """平坦な系列の中の突出した点を選ぶ"""
+        y = np.zeros(1000)
+        y[437] = 50.0
+        indices = lttb_indices(np.c_[np.arange(1000.0), y], 20)
+        self.assertIn(437, indices)
+
+    def test_keep_points_are_included(self):
+        """keep で指定した点は必ず含まれ、合計は n_out を超えない"""
+        points = np.random.default_rng(0).normal(size=(500, 3))
+        indices = simplify_indices(points, 30, keep=[3, 250, 251])
+        self.assertTrue({3, 250, 251} <= set(indices.tolist()))
+        self.assertLessEqual(len(indices), 30)
+
+class TestMaxPoints(unittest.TestCase):
+    def test_process_with_max_points(self):
+        """max_points で表示用の点を間引き、極値の点とサマリーは全点のものを保つ"""
+        use_temporary_track_store(self)
+        samples_dir = Path(__file__).parent.parent / 'samples'
+        file_a = str(samples_dir / 'flight1_6.gpx')
+        file_b = str(samples_dir / 'flight1_17.gpx')
+        full = process_gpx_files(file_a, file_b, output_format='columnar')
+        lod = process_gpx_files(file_a, file_b, output_format='columnar', max_points=300)
+
+        self.assertLessEqual(lod['count'], 300)
+        self.assertEqual(lod['lod'], {"max_points": 300, "total_points": full['count'], "points": lod['count']})
+        self.assertEqual(lod['summary'], full['summary'])
+        self.assertNotIn('lod', full)
+
+        columns, full_columns = lod['columns'], full['columns']
+        self.assertEqual(min(columns['distance_3d']), min(full_columns['distance_3d']))
+        for suffix in ('a', 'b'):
+            self.assertEqual(max(columns[f'vertical_speed_{suffix}']), max(full_columns[f'vertical_speed_{suffix}']))
+            self.assertEqual(min(columns[f'vertical_speed_{suffix}']), min(full_columns[f'vertical_speed_{suffix}']))
+        self.assertEqual(columns['timestamp'][0], full_columns['timestamp'][0])
+        self.assertEqual(columns['timestamp'][-1], full_columns['timestamp'][-1])
+        self.assertTrue(np.all(np.diff(columns['timestamp']) >= 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""single-flight のテスト"""
+import unittest
+import asyncio
+
+from app.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        """同じキーの同時実行は1回だけ処理し、全員が同じ結果オブジェクトを受け取る"""
+        flights = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b"result"
+
+        async def scenario():
+            results = await asyncio.gather(*(flights.run("key", compute) for _ in range(5)),
+                                           flights.run("other", compute))
+            self.assertNotIn("key", flights)
+            return results
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(result is results[0] for result in results[:5]))
+        self.assertEqual(flights.stats(), {"in_flight": 0, "started": 2, "coalesced": 4})
+
+    def test_exception_is_shared_and_not_cached(self):
+        """例外は待っていた全員に伝わり、完了後の呼び出しでは処理し直す"""
+        flights = SingleFlight()
+        calls = []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("error")
+
+        async def scenario():
+            results = await asyncio.gather(flights.run("key", fail), flights.run("key", fail),
+                                           return_exceptions=True)
+            self.assertTrue(all(isinstance(result, ValueError) for result in results))
+            with self.assertRaises(ValueError):
+                await flights.run("key", fail)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """最初の呼び出し側がキャンセルされても、処理は続行して他の呼び出し側に結果を返す"""
+        flights = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def scenario():
+            first = asyncio.ensure_future(flights.run("key", compute))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(flights.run("key", compute))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            self.assertEqual(await second, 42)
+
+        asyncio.run(scenario())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""トラック時刻インデックスのテスト"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.time_index import TrackTimeIndex
+from app.gpx_processor import filter_by_time_range, get_time_range_info
+
+S = 1_000_000_000
+
+class TestTrackTimeIndex(unittest.TestCase):
+    def setUp(self):
+        # 元の順序では 30秒 の点が先頭にある（昇順でない）
+        self.times = np.array([30, 0, 10, 10, 20], dtype=np.int64) * S
+        self.values = np.array([3.0, 0.0, 1.0, 1.5, 2.0])
+        self.index = TrackTimeIndex(self.times)
+
+    def test_sorted_detection(self):
+        """昇順の時刻列は並び替えずにそのまま使う"""
+        self.assertFalse(self.index.is_sorted)
+        sorted_index = TrackTimeIndex(np.sort(self.times))
+        self.assertTrue(sorted_index.is_sorted)
+        self.assertEqual((self.index.start, self.index.end), (0, 30 * S))
+        self.assertEqual((self.index.first, self.index.last), (30 * S, 20 * S))
+
+    def test_range_positions_keep_original_order(self):
+        """範囲内のポイントの位置を元の順序で返す"""
+        positions = self.index.range_positions(10 * S, 30 * S)
+        np.testing.assert_array_equal(positions, [0, 2, 3, 4])
+
+        mask = (self.times >= 10 * S) & (self.times <= 30 * S)
+        np.testing.assert_array_equal(self.times[positions], self.times[mask])
+        self.assertEqual(len(self.index.range_positions(40 * S, 50 * S)), 0)
+
+    def test_nearest(self):
+        """最も近い時刻のポイントの元の位置を返す"""
+        self.assertEqual(self.index.nearest(-5 * S), 1)
+        self.assertEqual(self.index.nearest(26 * S), 0)
+        self.assertEqual(self.index.nearest(100 * S), 0)
+        self.assertEqual(self.index.nearest(5 * S), 1)  # 等距離なら前の点
+
+    def test_value_at(self):
+        """前後2点の線形補間で値を求める"""
+        self.assertAlmostEqual(self.index.value_at(self.values, 25 * S), 2.5)
+        self.assertEqual(self.index.value_at(self.values, 10 * S), 1.5)
+        self.assertEqual(self.index.value_at(self.values, -1 * S), 0.0)
+        self.assertEqual(self.index.value_at(self.values, 99 * S), 3.0)
+
+    def test_filter_and_time_range_info(self):
+        """filter_by_time_range と get_time_range_info がインデックスを共有できる"""
+        df = pd.DataFrame({
+            'time_utc': pd.to_datetime(self.times + 1_743_811_200 * S, utc=True),
+            'value': self.values,
+        })
+        filtered = filter_by_time_range(df, '2025-04-05 00:00:10', '2025-04-05 00:00:20')
+        self.assertEqual(filtered['value'].tolist(), [1.0, 1.5, 2.0])
+
+        info = get_time_range_info(df, TrackTimeIndex.from_dataframe(df))
+        self.assertEqual(info['track_a'], {"start": '2025-04-05 00:00:30', "end": '2025-04-05 00:00:20'})
+
+if __name__ == '__main__':
+    unittest.main()
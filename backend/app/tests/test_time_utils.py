@@ -6,6 +6,7 @@ from app.utils.time_utils import (
     ensure_utc,
     format_timestamp,
     parse_timestamp,
+    parse_timestamps_ns,
     calculate_time_difference,
     get_time_range
 )
@@ -66,6 +67,25 @@ class TestTimeUtils(unittest.TestCase):
         result3 = parse_timestamp("invalid")
         self.assertIsNone(result3)
 
+    def test_parse_timestamps_ns(self):
+        """タイムスタンプ一括変換のテスト"""
+        # ミリ秒あり・なしが混在する場合
+        timestamps = ["2025-04-04T23:44:14.123Z", "2025-04-04T23:44:15Z"]
+        result = parse_timestamps_ns(timestamps)
+        self.assertEqual(result.dtype.name, 'int64')
+        for ts, ns in zip(timestamps, result):
+            expected = parse_timestamp(ts)
+            self.assertEqual(ns // 1000, int(expected.timestamp()) * 1_000_000 + expected.microsecond)
+        
+        # 空の場合
+        self.assertEqual(len(parse_timestamps_ns([])), 0)
+        
+        # UTC以外や無効なフォーマットの場合
+        with self.assertRaises(ValueError):
+            parse_timestamps_ns(["2025-04-05T08:44:14+09:00"])
+        with self.assertRaises(ValueError):
+            parse_timestamps_ns(["invalidZ"])
+
     def test_calculate_time_difference(self):
         """時間差計算のテスト"""
         # 同じ時刻の場合
@@ -0,0 +1,70 @@
+"""整数時刻による結合エンジンのテスト"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.track_join import join_indices
+
+MS = 1_000_000
+
+class TestJoinIndices(unittest.TestCase):
+    def setUp(self):
+        # A: 1Hz、B: 0.4秒ずれた 2Hz
+        self.time_a = np.array([0, 1000, 2000, 3000], dtype=np.int64) * MS
+        self.time_b = np.array([400, 900, 1400, 1900, 2400, 2900], dtype=np.int64) * MS
+
+    def test_exact_matches_string_key_merge(self):
+        """exact は従来の秒単位の文字列キーによる内部結合と同じ組を返す"""
+        time_a = np.array([0, 0, 1500, 2000, 5000], dtype=np.int64) * MS
+        time_b = np.array([100, 600, 2999, 3000, 4000], dtype=np.int64) * MS
+        pos_a, pos_b = join_indices(time_a, time_b, mode='exact')
+
+        key = lambda t: pd.to_datetime(t, utc=True).strftime('%Y-%m-%d %H:%M:%S')
+        df_a = pd.DataFrame({'key': key(time_a), 'a': np.arange(len(time_a))})
+        df_b = pd.DataFrame({'key': key(time_b), 'b': np.arange(len(time_b))})
+        expected = pd.merge(df_a, df_b, on='key', how='inner')
+
+        np.testing.assert_array_equal(pos_a, expected['a'])
+        np.testing.assert_array_equal(pos_b, expected['b'])
+
+    def test_exact_with_millisecond_resolution(self):
+        """resolution_ms を小さくするとサブ秒の一致のみ結合する"""
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='exact', resolution_ms=1)
+        self.assertEqual(len(pos_a), 0)
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='exact')
+        np.testing.assert_array_equal(pos_a, [0, 0, 1, 1, 2, 2])
+
+    def test_nearest_with_tolerance(self):
+        """nearest は許容差以内で最も近い点を1つだけ結合する"""
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='nearest')
+        np.testing.assert_array_equal(pos_a, [0, 1, 2, 3])
+        np.testing.assert_array_equal(pos_b, [0, 1, 3, 5])
+
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='nearest', tolerance_ms=150)
+        np.testing.assert_array_equal(pos_a, [1, 2, 3])
+        np.testing.assert_array_equal(pos_b, [1, 3, 5])
+
+    def test_previous(self):
+        """previous はその時刻以前で最も新しい点を結合する"""
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='previous')
+        np.testing.assert_array_equal(pos_a, [1, 2, 3])
+        np.testing.assert_array_equal(pos_b, [1, 3, 5])
+
+        pos_a, pos_b = join_indices(self.time_a, self.time_b, mode='previous', tolerance_ms=50)
+        self.assertEqual(len(pos_a), 0)
+
+    def test_unsorted_input_returns_original_positions(self):
+        """昇順でない入力でも元の配列での位置を返す"""
+        order = np.array([2, 0, 3, 1])
+        pos_a, pos_b = join_indices(self.time_a[order], self.time_b, mode='nearest')
+        np.testing.assert_array_equal(self.time_a[order][pos_a], self.time_a)
+        np.testing.assert_array_equal(pos_b, [0, 1, 3, 5])
+
+    def test_invalid_mode(self):
+        """不正な結合方式は ValueError"""
+        with self.assertRaises(ValueError):
+            join_indices(self.time_a, self.time_b, mode='outer')
+
+if __name__ == '__main__':
+    unittest.main()
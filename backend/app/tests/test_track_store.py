@@ -0,0 +1,68 @@
+"""ディスクキャッシュ（TrackStore）のテスト"""
+import unittest
+import os
+import tempfile
+
+import numpy as np
+
+from app.track_store import TrackStore, file_digest
+
+class TestTrackStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp_dir.name
+        self.store = TrackStore(self.cache_dir)
+        self.track = {
+            'lat': np.array([35.0, 35.1, 35.2]),
+            'lon': np.array([135.0, 135.1, 135.2]),
+            'ele': np.array([100.0, 110.0, 120.0]),
+            'time_utc': np.array([0, 1_000_000_000, 2_000_000_000], dtype=np.int64),
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """保存したトラックが mmap 配列として読み込めることを確認"""
+        self.assertIsNone(self.store.load('missing'))
+
+        self.store.save('key', self.track)
+        loaded = self.store.load('key')
+
+        self.assertEqual(set(loaded), set(self.track))
+        for name, values in self.track.items():
+            self.assertIsInstance(loaded[name], np.memmap)
+            self.assertEqual(loaded[name].dtype, values.dtype)
+            np.testing.assert_array_equal(loaded[name], values)
+
+        # 読み取り専用で開かれる
+        with self.assertRaises(ValueError):
+            loaded['lat'][0] = 0.0
+
+    def test_shared_between_instances(self):
+        """別インスタンス（再起動後・別ワーカー）からも読み込める"""
+        self.store.save('key', self.track)
+        other = TrackStore(self.cache_dir)
+        np.testing.assert_array_equal(other.load('key')['time_utc'], self.track['time_utc'])
+
+    def test_clear(self):
+        """キャッシュの削除（書き込み途中の一時ディレクトリは件数に含めない）"""
+        self.store.save('a', self.track)
+        self.store.save('b', self.track)
+        tempfile.mkdtemp(prefix='.c.', dir=self.cache_dir)
+        self.assertEqual(self.store.clear(), 2)
+        self.assertIsNone(self.store.load('a'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_file_digest(self):
+        """ファイル内容が同じならハッシュも同じ"""
+        path_a = os.path.join(self.cache_dir, 'a.gpx')
+        path_b = os.path.join(self.cache_dir, 'b.gpx')
+        for path in (path_a, path_b):
+            with open(path, 'wb') as f:
+                f.write(b'<gpx></gpx>')
+        self.assertEqual(file_digest(path_a), file_digest(path_b))
+        self.assertEqual(len(file_digest(path_a)), 64)
+
+if __name__ == '__main__':
+    unittest.main()
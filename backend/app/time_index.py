@@ -0,0 +1,143 @@
+"""トラックの時刻列に対する二分探索インデックス"""
+from typing import Optional
+
+import numpy as np
+
+
+class TrackTimeIndex:
+    """
+    UTCエポックナノ秒 (int64) の時刻列を昇順に保持し、二分探索で検索するインデックス
+
+    時刻列が昇順でない場合は安定ソートした並び順を保持し、検索結果は
+    元の配列での位置で返す。時間範囲の選択・最も近い時刻の検索・
+    時刻 t における値の補間はいずれも O(log n) で行える。
+    """
+
+    def __init__(self, time_ns: np.ndarray, is_sorted: Optional[bool] = None):
+        """
+        Parameters:
+        -----------
+        time_ns : numpy.ndarray
+            UTCエポックナノ秒 (int64) の配列（元の順序）
+        is_sorted : bool, optional
+            昇順であることが分かっている場合は True を指定して確認を省略する
+        """
+        time_ns = np.asarray(time_ns, dtype=np.int64)
+        if is_sorted is None:
+            is_sorted = bool(np.all(time_ns[1:] >= time_ns[:-1]))
+
+        self._original = time_ns
+        if is_sorted:
+            self.order = None
+            self.times = time_ns
+        else:
+            self.order = np.argsort(time_ns, kind='stable')
+            self.times = time_ns[self.order]
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'TrackTimeIndex':
+        """time_utc 列 (datetime64[ns, UTC]) を持つDataFrameからインデックスを作成"""
+        return cls(df['time_utc'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def is_sorted(self) -> bool:
+        return self.order is None
+
+    @property
+    def first(self) -> int:
+        """元の順序で最初のポイントの時刻"""
+        return int(self._original[0])
+
+    @property
+    def last(self) -> int:
+        """元の順序で最後のポイントの時刻"""
+        return int(self._original[-1])
+
+    @property
+    def start(self) -> int:
+        """最も早い時刻"""
+        return int(self.times[0])
+
+    @property
+    def end(self) -> int:
+        """最も遅い時刻"""
+        return int(self.times[-1])
+
+    def _to_original(self, positions):
+        return positions if self.order is None else self.order[positions]
+
+    def range_slice(self, start_ns: int, end_ns: int) -> slice:
+        """昇順の時刻列で start_ns 以上 end_ns 以下となる区間"""
+        lo = int(np.searchsorted(self.times, start_ns, side='left'))
+        hi = int(np.searchsorted(self.times, end_ns, side='right'))
+        return slice(lo, max(lo, hi))
+
+    def range_positions(self, start_ns: int, end_ns: int):
+        """
+        start_ns 以上 end_ns 以下のポイントの元の配列での位置
+
+        昇順の場合はスライス、そうでない場合は元の順序に並べた位置の配列を返す。
+        """
+        window = self.range_slice(start_ns, end_ns)
+        if self.order is None:
+            return window
+        return np.sort(self.order[window])
+
+    def nearest(self, time_ns: int) -> int:
+        """time_ns に最も近い時刻のポイントの元の配列での位置（等距離の場合は前の点）"""
+        i = int(np.searchsorted(self.times, time_ns, side='left'))
+        if i == len(self.times):
+            i -= 1
+        elif i > 0 and time_ns - self.times[i - 1] <= self.times[i] - time_ns:
+            i -= 1
+        return int(self._to_original(i))
+
+    def bracket(self, time_ns: np.ndarray):
+        """
+        各時刻を挟む前後2点の位置と補間比率をまとめて求める（value_at の配列版）
+
+        Returns:
+        --------
+        tuple of numpy.ndarray
+            (left, right, ratio, span)。left / right は元の配列での位置、
+            ratio は left からの比率 (0-1)、span は前後2点の時刻差（ナノ秒）。
+            範囲外の時刻は端の点を left / right の両方とし、span は0となる。
+        """
+        time_ns = np.asarray(time_ns, dtype=np.int64)
+        n = len(self.times)
+        right = np.searchsorted(self.times, time_ns, side='right')
+        left = np.clip(right - 1, 0, n - 1)
+        right = np.clip(right, 0, n - 1)
+        # 最後の点と同時刻の場合は前後とも最後の点
+        right = np.where(self.times[left] == time_ns, left, right)
+
+        t0 = self.times[left]
+        span = self.times[right] - t0
+        ratio = np.zeros(len(time_ns), dtype=np.float64)
+        np.divide(time_ns - t0, span, out=ratio, where=span > 0)
+        return self._to_original(left), self._to_original(right), ratio, span
+
+    def value_at(self, values: np.ndarray, time_ns: int) -> float:
+        """
+        時刻 time_ns における values の値を前後2点の線形補間で求める
+
+        values は元の順序の配列。範囲外の時刻は端の値、同時刻の点が
+        複数ある場合は後ろの点の値を使う。
+        """
+        values = np.asarray(values)
+        n = len(self.times)
+        i = int(np.searchsorted(self.times, time_ns, side='right'))
+        if i == 0:
+            return float(values[self._to_original(0)])
+        if i == n:
+            return float(values[self._to_original(n - 1)])
+
+        t0, t1 = self.times[i - 1], self.times[i]
+        v0 = float(values[self._to_original(i - 1)])
+        v1 = float(values[self._to_original(i)])
+        if t0 == time_ns:
+            return v0
+        return v0 + (v1 - v0) * (time_ns - t0) / (t1 - t0)
@@ -0,0 +1,112 @@
+"""2つのトラックを整数時刻（エポックナノ秒）で突き合わせる結合エンジン"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.time_index import TrackTimeIndex
+
+NS_PER_MS = 1_000_000
+
+# 結合方式
+JOIN_EXACT = "exact"        # 同じ時刻（resolution_ms 単位に切り捨て）同士を結合
+JOIN_NEAREST = "nearest"    # Aの各点に最も近いBの点を結合
+JOIN_PREVIOUS = "previous"  # Aの各点の時刻以前で最も新しいBの点を結合
+JOIN_MODES = (JOIN_EXACT, JOIN_NEAREST, JOIN_PREVIOUS)
+
+# exact の既定の時刻単位（従来の '%Y-%m-%d %H:%M:%S' 文字列キーと同じ1秒単位）
+DEFAULT_RESOLUTION_MS = 1000
+
+
+def _exact_pairs(time_a: np.ndarray, time_b: np.ndarray, resolution_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    # 同じキーを持つ点同士はすべての組み合わせを出力する（内部結合と同じ）
+    resolution_ns = max(1, int(resolution_ms)) * NS_PER_MS
+    key_a = time_a // resolution_ns
+    key_b = time_b // resolution_ns
+    lo = np.searchsorted(key_b, key_a, side='left')
+    hi = np.searchsorted(key_b, key_a, side='right')
+    counts = hi - lo
+
+    total = int(counts.sum())
+    pos_a = np.repeat(np.arange(len(time_a)), counts)
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    pos_b = np.repeat(lo, counts) + (np.arange(total) - run_start)
+    return pos_a, pos_b
+
+
+def _nearest_pairs(time_a: np.ndarray, time_b: np.ndarray, tolerance_ns: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    right = np.clip(np.searchsorted(time_b, time_a, side='left'), 0, len(time_b) - 1)
+    left = np.clip(right - 1, 0, len(time_b) - 1)
+    # 等距離の場合は前の点を使う
+    use_left = np.abs(time_a - time_b[left]) <= np.abs(time_b[right] - time_a)
+    pos_b = np.where(use_left, left, right)
+    pos_a = np.arange(len(time_a))
+
+    if tolerance_ns is not None:
+        keep = np.abs(time_b[pos_b] - time_a) <= tolerance_ns
+        pos_a, pos_b = pos_a[keep], pos_b[keep]
+    return pos_a, pos_b
+
+
+def _previous_pairs(time_a: np.ndarray, time_b: np.ndarray, tolerance_ns: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    pos_b = np.searchsorted(time_b, time_a, side='right') - 1
+    keep = pos_b >= 0
+    if tolerance_ns is not None:
+        keep &= time_a - time_b[np.maximum(pos_b, 0)] <= tolerance_ns
+    return np.flatnonzero(keep), pos_b[keep]
+
+
+def join_indices(time_a: np.ndarray, time_b: np.ndarray, mode: str = JOIN_EXACT,
+                 tolerance_ms: Optional[float] = None,
+                 resolution_ms: int = DEFAULT_RESOLUTION_MS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    2つのトラックの時刻列を突き合わせ、対応する点の位置の組を返す
+
+    両方の時刻列を昇順に並べ、二分探索でまとめて対応付けるため、
+    文字列キーを作らずに O((n + m) log m) で結合できる。
+
+    Parameters:
+    -----------
+    time_a, time_b : numpy.ndarray
+        UTCエポックナノ秒 (int64) の配列（昇順でなくてもよい）
+    mode : str
+        'exact'    : resolution_ms 単位に切り捨てた時刻が一致する点同士（多対多）
+        'nearest'  : Aの各点について最も近いBの点（tolerance_ms 以内）
+        'previous' : Aの各点について、その時刻以前で最も新しいBの点（tolerance_ms 以内）
+    tolerance_ms : float, optional
+        nearest / previous で許容する時刻差（ミリ秒）。None の場合は無制限
+    resolution_ms : int
+        exact で比較する時刻の単位（ミリ秒）。既定は1秒
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (pos_a, pos_b) 元の配列での位置。Aの時刻順（同時刻はBの時刻順）に並ぶ
+
+    Raises:
+    -------
+    ValueError
+        mode が不正な場合
+    """
+    if mode not in JOIN_MODES:
+        raise ValueError(f"不正な結合方式です: {mode} (指定可能: {', '.join(JOIN_MODES)})")
+
+    index_a = TrackTimeIndex(time_a)
+    index_b = TrackTimeIndex(time_b)
+    if len(index_a) == 0 or len(index_b) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    tolerance_ns = None if tolerance_ms is None else int(round(tolerance_ms * NS_PER_MS))
+    if mode == JOIN_EXACT:
+        pos_a, pos_b = _exact_pairs(index_a.times, index_b.times, resolution_ms)
+    elif mode == JOIN_NEAREST:
+        pos_a, pos_b = _nearest_pairs(index_a.times, index_b.times, tolerance_ns)
+    else:
+        pos_a, pos_b = _previous_pairs(index_a.times, index_b.times, tolerance_ns)
+
+    # 昇順に並べた位置を元の配列での位置に戻す
+    if index_a.order is not None:
+        pos_a = index_a.order[pos_a]
+    if index_b.order is not None:
+        pos_b = index_b.order[pos_b]
+    return pos_a, pos_b
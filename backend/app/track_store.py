@@ -0,0 +1,107 @@
+"""解析済みトラックを列ごとのバイナリファイルとしてディスクに保存する永続キャッシュ"""
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# キャッシュディレクトリ（環境変数で変更可能）
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GPX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gpx_track_cache")
+)
+
+# ハッシュ計算時の読み込みサイズ
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """ファイル内容のSHA-256ハッシュ（16進文字列）を計算"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class TrackStore:
+    """
+    トラックの列配列をディスクに保存・読み込みするキャッシュ
+
+    1トラックを1ディレクトリとし、列ごとに .npy ファイルを保存する。
+    読み込み時は mmap で開くため、XML解析を行わずに配列を共有できる。
+    書き込みは一時ディレクトリに行ってからリネームするため、
+    複数ワーカーから同時にアクセスしても壊れたエントリは見えない。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.enabled = True
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"ディスクキャッシュを無効化します ({cache_dir}): {e}")
+            self.enabled = False
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """キャッシュ済みのトラックを読み取り専用の mmap 配列として取得"""
+        if not self.enabled:
+            return None
+
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+
+        try:
+            return {
+                name[:-len('.npy')]: np.load(os.path.join(entry_dir, name), mmap_mode='r')
+                for name in os.listdir(entry_dir)
+                if name.endswith('.npy')
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"ディスクキャッシュの読み込みに失敗 ({key}): {e}")
+            return None
+
+    def save(self, key: str, track: Dict[str, np.ndarray]) -> None:
+        """トラックの列配列を保存（既に存在する場合は何もしない）"""
+        if not self.enabled:
+            return
+
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        try:
+            for name, values in track.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(values))
+            os.rename(tmp_dir, entry_dir)
+            logger.info(f"トラックをディスクキャッシュに保存: {entry_dir}")
+        except OSError as e:
+            # 他のワーカーが先に保存した場合もここに来る
+            if not os.path.isdir(entry_dir):
+                logger.warning(f"ディスクキャッシュの保存に失敗 ({key}): {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def clear(self) -> int:
+        """
+        すべてのキャッシュエントリを削除し、削除した件数を返す
+
+        書き込み途中の一時ディレクトリ（'.' で始まる名前）も削除するが、件数には含めない。
+        """
+        if not self.enabled:
+            return 0
+
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            if not name.startswith('.'):
+                removed += 1
+        return removed
@@ -14,6 +14,7 @@ from .time_utils import (
     ensure_utc,
     format_timestamp,
     parse_timestamp,
+    parse_timestamps_ns,
     calculate_time_difference,
     get_time_range
 )
@@ -29,6 +30,7 @@ __all__ = [
     'ensure_utc',
     'format_timestamp',
     'parse_timestamp',
+    'parse_timestamps_ns',
     'calculate_time_difference',
     'get_time_range'
 ] 
\ No newline at end of file
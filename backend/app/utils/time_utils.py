@@ -1,6 +1,8 @@
 """時間処理のためのユーティリティ関数"""
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
 
 def ensure_utc(dt: datetime) -> datetime:
     """
@@ -30,6 +32,24 @@ def parse_timestamp(timestamp: str) -> Optional[datetime]:
         except ValueError:
             return None
 
+def parse_timestamps_ns(timestamps: Sequence[str]) -> np.ndarray:
+    """
+    ISO 8601形式 (UTC, 末尾Z) の文字列を一括でエポックナノ秒 (int64) の配列に変換
+
+    parse_timestamp と同じく '...SS.fffZ' と '...SSZ' の両形式に対応する。
+    変換できない文字列が含まれる場合は ValueError を送出する。
+    """
+    values = np.asarray(timestamps, dtype=str)
+    if values.size == 0:
+        return np.empty(0, dtype=np.int64)
+    
+    if not np.char.endswith(values, 'Z').all():
+        raise ValueError("UTC (末尾Z) 以外のタイムスタンプが含まれています")
+    
+    # 末尾のZを除いたナイーブなUTC時刻としてNumPyで一括変換
+    naive = np.char.rstrip(values, 'Z')
+    return naive.astype('datetime64[ns]').view(np.int64)
+
 def calculate_time_difference(time1: datetime, time2: datetime) -> float:
     """
     2つの時刻の差を秒単位で計算
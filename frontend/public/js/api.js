@@ -45,8 +45,83 @@ const API = {
         }
     },
     
+    // バイナリ形式（列ごとの型付き配列）のメディアタイプ
+    BINARY_MEDIA_TYPE: 'application/vnd.gpx-columns',
+    
+    // バイナリ形式のレスポンスをデコードする
+    // 先頭12バイト: マジック 'GPXC', バージョン(uint32), ヘッダー長(uint32)、続いてJSONヘッダー。
+    // 各列はヘッダーの offset から count 個のリトルエンディアンの値で、8バイト境界に揃っているためコピーせずに参照できる
+    decodeColumns(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== 'GPXC') {
+            throw new Error(`不正なバイナリ形式です: ${magic}`);
+        }
+        const version = view.getUint32(4, true);
+        if (version !== 1) {
+            throw new Error(`未対応のバイナリ形式のバージョンです: ${version}`);
+        }
+        const headerLength = view.getUint32(8, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+        
+        const arrayTypes = {
+            float32: Float32Array,
+            float64: Float64Array,
+            int64: BigInt64Array
+        };
+        const columns = {};
+        for (const column of header.columns) {
+            columns[column.name] = new arrayTypes[column.dtype](buffer, column.offset, header.count);
+        }
+        header.columns = columns;
+        return header;
+    },
+    
+    // クエリパラメータ付きで GET し、JSON を返す（null・空文字の値は送らない）
+    async getJson(path, query) {
+        const params = new URLSearchParams();
+        Object.entries(query).forEach(([key, value]) => {
+            if (value != null && value !== '') params.append(key, value);
+        });
+        
+        const response = await fetch(`${path}?${params}`);
+        if (!response.ok) {
+            let errorText = '';
+            try {
+                const errorData = await response.json();
+                errorText = errorData.detail || `サーバーエラー (${response.status})`;
+            } catch (jsonError) {
+                errorText = `サーバーエラー (${response.status})`;
+            }
+            throw new Error(errorText);
+        }
+        return response.json();
+    },
+    
+    // 詳細テーブルの1ページ分の行を取得
+    // query には /api/process と同じ処理パラメータ (file_a_path, file_b_path, start_time, end_time など) と
+    // offset, limit, sort, order, window_start, window_end を指定する
+    async fetchTablePage(query) {
+        return this.getJson('/api/table', query);
+    },
+    
+    // タイムスライダーやグラフの概観用に、時間窓の min / max / mean の集計を取得
+    // query には /api/process と同じ処理パラメータと window_start, window_end, width（バケット数の上限、通常は描画幅のピクセル数）を指定する
+    async fetchOverview(query) {
+        return this.getJson('/api/overview', query);
+    },
+    
+    // 時間窓のサマリー（高度差・3D距離の最大・最小・平均とその時刻）を取得
+    // query には /api/process と同じ処理パラメータと window_start, window_end を指定する
+    async fetchRangeSummary(query) {
+        return this.getJson('/api/summary', query);
+    },
+    
     // 指定した時間範囲でデータを処理
-    async processData(fileAPath, fileBPath, startTime, endTime) {
+    // options.views には返すビュー ('visualization', 'table' のカンマ区切り) を指定できる
+    // options.maxPoints を指定すると、点数がそれを超える場合に形を保ったまま間引いた点を返す (レスポンスの lod を参照)
+    // options.binary が true の場合はバイナリ形式で受け取り、列ごとの型付き配列 (columns) を返す
+    async processData(fileAPath, fileBPath, startTime, endTime, options = {}) {
         try {
             console.log('データ処理開始:', {
                 fileAPath, 
@@ -60,6 +135,8 @@ const API = {
             formData.append('file_b_path', fileBPath);
             if (startTime) formData.append('start_time', startTime);
             if (endTime) formData.append('end_time', endTime);
+            if (options.views) formData.append('views', options.views);
+            if (options.maxPoints) formData.append('max_points', options.maxPoints);
             
             // FormDataの内容をログ出力（デバッグ用）
             for (let pair of formData.entries()) {
@@ -71,7 +148,8 @@ const API = {
             
             const response = await fetch(url, {
                 method: 'POST',
-                body: formData
+                body: formData,
+                headers: options.binary ? { 'Accept': this.BINARY_MEDIA_TYPE } : {}
             });
             
             console.log('処理レスポンス:', response.status, response.statusText);
@@ -88,6 +166,12 @@ const API = {
                 throw new Error(errorText);
             }
             
+            if (options.binary) {
+                const columnsResult = this.decodeColumns(await response.arrayBuffer());
+                console.log('データ処理成功（バイナリ）:', columnsResult.count, 'データポイント');
+                return columnsResult;
+            }
+            
             const result = await response.json();
             console.log('データ処理成功:', result ? '結果あり' : '結果なし', Object.keys(result));
             
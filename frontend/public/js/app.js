@@ -81,6 +81,9 @@ function setupEventListeners() {
         }
         console.log('FormDataの内容', formDataLog);
         
+        // 詳細テーブルの取得に使う処理パラメータ（処理リクエストと同じ値）
+        let tableQuery = null;
+        
         // アップロードリクエスト
         console.log('アップロードリクエスト送信開始: /api/upload');
         fetch('/api/upload', {
@@ -147,6 +150,8 @@ function setupEventListeners() {
             const processFormData = new FormData();
             processFormData.append('file_a_path', uploadResult.file_a_path);
             processFormData.append('file_b_path', uploadResult.file_b_path);
+            // 詳細テーブルは /api/table からページ単位で取得するため、visualization_data だけを要求する
+            processFormData.append('views', 'visualization');
 
             // 時刻データを追加 (元に戻す)
             const timeRange = uploadResult.time_range && uploadResult.time_range.time_range;
@@ -160,6 +165,13 @@ function setupEventListeners() {
                 console.log('警告: /api/upload から時刻範囲が返されませんでした。処理リクエストに時刻範囲を含めません。');
             }
 
+            tableQuery = {
+                file_a_path: uploadResult.file_a_path,
+                file_b_path: uploadResult.file_b_path,
+                start_time: processFormData.get('start_time'),
+                end_time: processFormData.get('end_time')
+            };
+
             console.log('処理リクエスト送信開始: /api/process');
             
             return fetch('/api/process', {
@@ -192,8 +204,6 @@ function setupEventListeners() {
             // 詳細なデバッグ情報を追加
             console.log('visualization_dataの型:', typeof processResult.visualization_data);
             console.log('visualization_dataの内容:', processResult.visualization_data);
-            console.log('table_dataの型:', typeof processResult.table_data);
-            console.log('table_dataの内容:', JSON.stringify(processResult.table_data, null, 2));
             console.log('summaryの型:', typeof processResult.summary);
             console.log('summaryの内容:', JSON.stringify(processResult.summary, null, 2));
 
@@ -220,14 +230,16 @@ function setupEventListeners() {
             try {
                 Visualization.setupMapAndViz(
                     'map-container', // マップコンテナのID
-                    visualizationData, // 変換済みのvisualization_data
-                    processResult.table_data
+                    visualizationData // 変換済みのvisualization_data（テーブルは /api/table からページ単位で取得）
                 );
                 document.getElementById('map-container').classList.add('map-initialized');
                 console.log('ビジュアライゼーションのセットアップ完了。');
 
                 // サマリー表示
                 displaySummary(processResult.summary);
+                
+                // 詳細テーブルの最初のページを表示
+                updateDataTable(tableQuery);
             } catch (error) {
                 console.error("Visualization setup failed:", error);
                 console.log("エラー: ビジュアライゼーションのセットアップに失敗しました。", error.message);
@@ -264,7 +276,8 @@ function setupEventListeners() {
                 result.file_a_path,
                 result.file_b_path,
                 result.time_range ? result.time_range.start : null,
-                result.time_range ? result.time_range.end : null
+                result.time_range ? result.time_range.end : null,
+                { views: 'visualization' }
             );
 
             console.log('処理結果:', processResult);
@@ -294,14 +307,21 @@ function setupEventListeners() {
             try {
                 Visualization.setupMapAndViz(
                     'map-container', // マップコンテナのID
-                    visualizationData, // 変換済みのvisualization_data
-                    processResult.table_data
+                    visualizationData // 変換済みのvisualization_data（テーブルは /api/table からページ単位で取得）
                 );
                 document.getElementById('map-container').classList.add('map-initialized');
                 console.log('ビジュアライゼーションのセットアップ完了。');
 
                 // サマリー表示
                 displaySummary(processResult.summary);
+                
+                // 詳細テーブルの最初のページを表示
+                updateDataTable({
+                    file_a_path: result.file_a_path,
+                    file_b_path: result.file_b_path,
+                    start_time: result.time_range ? result.time_range.start : null,
+                    end_time: result.time_range ? result.time_range.end : null
+                });
             } catch (error) {
                 console.error("Visualization setup failed:", error);
                 console.log("エラー: ビジュアライゼーションのセットアップに失敗しました。", error.message);
@@ -383,85 +403,86 @@ function updateTimeRange(data) {
     if (selectedEndTimeEl) selectedEndTimeEl.textContent = formatDateTime(data.endTime);
 }
 
-function updateDataTable(vizData) {
+// 詳細テーブルの1ページの行数
+const TABLE_PAGE_SIZE = 100;
+// 表示中のテーブルのページ ({ query, offset, total })
+let tableState = null;
+// ページの取得中かどうか（再生中に同じページを重複して取得しない）
+let tableLoading = false;
+
+// 詳細テーブルの表示するページだけを /api/table から取得して描画する
+// query には /api/process と同じ処理パラメータを指定する（10秒平均などはサーバーで計算済み）
+async function updateDataTable(query, offset = 0) {
     const tableBody = document.getElementById('table-body');
-    if (!tableBody) return;
-    
-    // テーブルをクリア
-    tableBody.innerHTML = '';
+    if (!tableBody || !query || tableLoading) return;
     
-    // 新しいデータでテーブルを構築
-    vizData.forEach((item, index) => {
-        const row = document.createElement('tr');
-        
-        // UTCからJSTに変換して表示（+9時間）
-        const timestampJST = new Date(item.timestamp);
-        timestampJST.setTime(timestampJST.getTime() + (9 * 60 * 60 * 1000));
-        const timeStr = timestampJST.toTimeString().split(' ')[0];
-        
-        // アイテムAとBの値を取得（存在しない場合は'-'を表示）
-        const itemA = item.a || { height: '-', verticalSpeed: '-', horizontalSpeed: '-', speed3D: '-', verticalAccel: '-', horizontalAccel: '-', accel3D: '-' };
-        const itemB = item.b || { height: '-', verticalSpeed: '-', horizontalSpeed: '-', speed3D: '-', verticalAccel: '-', horizontalAccel: '-', accel3D: '-' };
-        
-        // 高度差を計算（両方存在する場合のみ）
-        let heightDiff = '-';
-        if (itemA.height !== '-' && itemB.height !== '-') {
-            heightDiff = (itemA.height - itemB.height).toFixed(2);
-        }
-        
-        // 3D距離を表示
-        const distance3D = item.distance3D !== undefined ? item.distance3D.toFixed(2) : '-';
-        
-        // 10秒平均垂直速度の計算
-        const avgVerticalSpeedA = calculateAverageVerticalSpeed(vizData, index, 'a', 10);
-        const avgVerticalSpeedB = calculateAverageVerticalSpeed(vizData, index, 'b', 10);
+    tableLoading = true;
+    try {
+        const page = await API.fetchTablePage({ ...query, offset, limit: TABLE_PAGE_SIZE });
+        tableState = { query, offset: page.offset, total: page.total };
         
-        // テーブルの列を現在の設計に合わせて作成
-        row.innerHTML = `
-            <td>${timeStr}</td>
-            <td>${typeof itemA.height === 'number' ? itemA.height.toFixed(2) : itemA.height}</td>
-            <td>${typeof itemB.height === 'number' ? itemB.height.toFixed(2) : itemB.height}</td>
-            <td>${heightDiff}</td>
-            <td>${typeof itemA.verticalSpeed === 'number' ? itemA.verticalSpeed.toFixed(2) : itemA.verticalSpeed}</td>
-            <td>${typeof itemB.verticalSpeed === 'number' ? itemB.verticalSpeed.toFixed(2) : itemB.verticalSpeed}</td>
-            <td>${avgVerticalSpeedA !== null ? avgVerticalSpeedA.toFixed(2) : '-'}</td>
-            <td>${avgVerticalSpeedB !== null ? avgVerticalSpeedB.toFixed(2) : '-'}</td>
-            <td>${typeof itemA.verticalAccel === 'number' ? itemA.verticalAccel.toFixed(2) : itemA.verticalAccel}</td>
-            <td>${typeof itemB.verticalAccel === 'number' ? itemB.verticalAccel.toFixed(2) : itemB.verticalAccel}</td>
-            <td>${distance3D}</td>
-        `;
+        tableBody.innerHTML = '';
+        const getValue = (val, precision) => (val != null && !isNaN(val)) ? val.toFixed(precision) : '-';
+        page.rows.forEach(row => {
+            const tr = document.createElement('tr');
+            tr.innerHTML = `
+                <td>${Visualization.formatTime(row.timestamp)}</td>
+                <td>${getValue(row.ele_a_ft, 1)}</td>
+                <td>${getValue(row.ele_b_ft, 1)}</td>
+                <td>${getValue(row.height_diff_ft, 1)}</td>
+                <td>${getValue(row.vertical_speed_a, 3)}</td>
+                <td>${getValue(row.vertical_speed_b, 3)}</td>
+                <td>${getValue(row.avg_10sec_vertical_speed_a, 3)}</td>
+                <td>${getValue(row.avg_10sec_vertical_speed_b, 3)}</td>
+                <td>${getValue(row.vertical_accel_a, 3)}</td>
+                <td>${getValue(row.vertical_accel_b, 3)}</td>
+                <td>${getValue(row.distance_3d, 3)}</td>
+            `;
+            tr.setAttribute('data-index', row.index);
+            tr.addEventListener('click', () => {
+                Visualization.jumpToTimeIndex(row.index);
+            });
+            tableBody.appendChild(tr);
+        });
         
-        tableBody.appendChild(row);
-    });
+        updateTablePager();
+        Visualization.highlightTableRow(Visualization.currentTimeIndex);
+    } catch (error) {
+        console.error('テーブルの取得エラー:', error);
+        showError('テーブルの取得中にエラーが発生しました: ' + error.message);
+    } finally {
+        tableLoading = false;
+    }
 }
 
-// 過去n秒間の垂直速度平均を計算する関数
-function calculateAverageVerticalSpeed(vizData, currentIndex, track, seconds) {
-    // 現在の位置からn秒前のデータポイントを見つける
-    const currentTime = vizData[currentIndex].timestamp;
-    const targetTime = currentTime - (seconds * 1000); // n秒前の時間
-    
-    let startIndex = currentIndex;
-    // n秒前のデータポイントを探す
-    while (startIndex > 0 && vizData[startIndex].timestamp > targetTime) {
-        startIndex--;
-    }
+// テーブルのページ切り替えの表示を更新
+function updateTablePager() {
+    const pager = document.getElementById('table-pager');
+    if (!pager || !tableState) return;
     
-    // 平均を計算するためのデータを収集
-    let sum = 0;
-    let count = 0;
+    const { query, offset, total } = tableState;
+    pager.classList.toggle('hidden', total <= TABLE_PAGE_SIZE);
+    document.getElementById('table-page-info').textContent =
+        total > 0 ? `${offset + 1} - ${Math.min(offset + TABLE_PAGE_SIZE, total)} / ${total}` : '';
     
-    for (let i = startIndex; i <= currentIndex; i++) {
-        const item = vizData[i][track];
-        if (item && typeof item.verticalSpeed === 'number') {
-            sum += item.verticalSpeed;
-            count++;
-        }
-    }
-    
-    return count > 0 ? sum / count : null;
+    const prev = document.getElementById('table-prev');
+    const next = document.getElementById('table-next');
+    prev.disabled = offset <= 0;
+    next.disabled = offset + TABLE_PAGE_SIZE >= total;
+    prev.onclick = () => updateDataTable(query, Math.max(0, offset - TABLE_PAGE_SIZE));
+    next.onclick = () => updateDataTable(query, offset + TABLE_PAGE_SIZE);
 }
 
+// 再生などで表示中のページにない時点へ移動した場合は、その行を含むページを取得する
+// （テーブルは時刻順で、行の index は visualization_data のインデックスと一致する）
+Visualization.onTableRowMissing = index => {
+    if (!tableState) return;
+    const offset = Math.floor(index / TABLE_PAGE_SIZE) * TABLE_PAGE_SIZE;
+    if (offset !== tableState.offset) {
+        updateDataTable(tableState.query, offset);
+    }
+};
+
 // アプリケーションの初期化
 function initApp() {
     console.log('App initialization started');
@@ -526,10 +547,6 @@ function handleFileUpload(files) {
                             updateTimeRange(response.timeRange);
                         }
                         
-                        // テーブルデータを更新
-                        if (response.tableData) {
-                            updateDataTable(response.tableData);
-                        }
                     } catch (error) {
                         console.error('Error setting visualization data:', error);
                         showError('データの可視化中にエラーが発生しました');
@@ -19,6 +19,7 @@ const Visualization = {
     trackBInfo: null,
     originalData: null,
     tableData: null,
+    onTableRowMissing: null, // 表示中のテーブルのページにない行へ移動したときに呼ばれる (index) => void
     lastInfoData: null,
     lastHighlightedIndex: null,
     lastTimelinePercentage: null,
@@ -251,8 +252,11 @@ const Visualization = {
             console.log('Rendering tracks...');
             this.renderTracks();
 
-            console.log('Populating table...');
-            this.populateTable(tableData);
+            // tableData を渡さない場合、テーブルは呼び出し側が /api/table からページ単位で描画する
+            if (tableData) {
+                console.log('Populating table...');
+                this.populateTable(tableData);
+            }
 
             console.log('Adjusting map size and bounds...');
             requestAnimationFrame(() => {
@@ -565,9 +569,10 @@ const Visualization = {
             const tr = document.createElement('tr');
             const getValue = (val, precision = null) => (val != null && !isNaN(val)) ? (precision !== null ? val.toFixed(precision) : val) : '-';
 
-            // 10秒平均垂直速度を計算
-            const avgVSpeedA = this.calculateAverageVerticalSpeed(this.visualizationData, index, 'a', 10);
-            const avgVSpeedB = this.calculateAverageVerticalSpeed(this.visualizationData, index, 'b', 10);
+            // 10秒平均垂直速度（サーバーで計算済みの値）
+            const point = this.visualizationData[index];
+            const avgVSpeedA = point.track_a?.speeds?.avg_10sec_vertical;
+            const avgVSpeedB = point.track_b?.speeds?.avg_10sec_vertical;
 
             // 時刻をJSTに変換して表示
             const timeStr = this.formatTime(this.visualizationData[index].timestamp);
@@ -826,6 +831,9 @@ const Visualization = {
                 behavior: 'smooth',
                 block: 'nearest'
             });
+        } else if (typeof this.onTableRowMissing === 'function') {
+            // 表示中のページにない行は、そのページの取得を呼び出し側に任せる
+            this.onTableRowMissing(index);
         }
     },
 